@@ -1,22 +1,37 @@
 import os
+import time
+import asyncio
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any
 
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, or_, select, func
 
 from constants import SCORES_COLS, FINAL_SCORE_COLS, WHOLE_GAME_SCORE_COLS
 from datetime import datetime
-from database import SessionLocal, MatchRating, CachedMatch, LatestMatch, init_db, get_db, engine
-from dota.api import fetch_dota_data_from_api
-from dota.calculate_scores import calculate_subjective_weighted_scores, calculate_statistics_scores
+from database import SessionLocal, MatchRating, CachedMatch, LatestMatch, JobRun, init_db, get_db, engine, bulk_upsert
+from dota.api import PRO_MATCHES, explorer_query, fetch_dota_data_from_api, http_cache, match_query
+from dota.calculate_scores import calculate_subjective_weighted_scores, calculate_statistics_scores, \
+    calculate_static_score, rescore_recency
+from dota.calcs import create_title
+from dota.etags import cache_generation, etag_matches, invalidate_generation, make_etag
 from dota.get_and_score_func import clean_df_and_fill_nas, calculate_all_game_statistics
-from dota.utils import format_days_ago_pretty
+from dota.ratings import get_ratings, invalidate_ratings
+from dota.scheduler import ScheduledJob, run_periodically, wait_until_idle
+from dota.series import apply_game_numbers, index_series_games, prune_series_games
+from dota.teams import get_teams
+from dota.score_cache import split_cached_matches, save_match_statistics, merge_cached_matches, load_match_statistics, \
+    replay_parsed, statistics_cached_ids
+from dota.utils import time_ago
 
 # Initialize logging
 logger = logging.getLogger(__name__)
@@ -24,7 +39,28 @@ logger = logging.getLogger(__name__)
 # Initialize database tables
 init_db()
 
-app = FastAPI(title="Dota Game Finder API")
+# How often the cached_matches refresh runs, and how often each worker checks whether it is due
+REFRESH_EVERY_MINUTES = float(os.getenv("REFRESH_EVERY_MINUTES", "15"))
+REFRESH_CHECK_SECONDS = float(os.getenv("REFRESH_CHECK_SECONDS", "60"))
+REFRESH_SCHEDULER_ENABLED = os.getenv("REFRESH_SCHEDULER_ENABLED", "true").lower() == "true"
+# How often cached final scores are aged, no fetching involved
+RESCORE_EVERY_MINUTES = float(os.getenv("RESCORE_EVERY_MINUTES", "60"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fill the team registry before the first scoring run needs it
+    asyncio.ensure_future(_run_in_pipeline(_warm_team_registry))
+    schedulers = []
+    if REFRESH_SCHEDULER_ENABLED:
+        schedulers = [asyncio.create_task(run_periodically(job, _run_in_pipeline, REFRESH_CHECK_SECONDS))
+                      for job in (cache_refresh_job, cache_rescore_job)]
+    yield
+    for scheduler in schedulers:
+        scheduler.cancel()
+
+
+app = FastAPI(title="Dota Game Finder API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -43,6 +79,38 @@ app.add_middleware(
 )
 
 
+# Bounded pool for fetching and scoring (and the scheduled jobs) so the event loop stays free for other requests
+# Cheap DB reads and rating writes use the default threadpool instead, so they don't queue behind scoring runs
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+# key -> future of the computation currently running for that key
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+async def _run_in_pipeline(fn, *args):
+    """Run a blocking function in the pipeline executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pipeline_executor, functools.partial(fn, *args))
+
+
+async def _run_coalesced(key: str, fn, *args):
+    """Run fn in the pipeline executor, callers asking for the same key while it runs share its result."""
+    future = _in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_run_in_pipeline(fn, *args))
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # shield so one caller disconnecting doesn't cancel the computation for the others
+    return await asyncio.shield(future)
+
+
+def _warm_team_registry() -> None:
+    try:
+        get_teams()
+    except Exception:
+        logger.exception("warming the team registry failed, the first scoring run will retry")
+
+
 class RateMatchRequest(BaseModel):
     match_id: int
     score: int
@@ -62,16 +130,32 @@ async def index():
     """
 
 
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint to verify the API and database are running."""
+def _ping_db() -> str:
     try:
         # Test database connection
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
-        db_status = "connected"
+        return "connected"
     except Exception as e:
-        db_status = f"error: {str(e)}"
+        return f"error: {str(e)}"
+
+
+def _cache_refresh_status() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return cache_refresh_job.status(db)
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint to verify the API and database are running."""
+    # Uses the default threadpool rather than the pipeline executor, so health stays responsive while scoring runs
+    db_status = await run_in_threadpool(_ping_db)
+    cache_refresh = await run_in_threadpool(_cache_refresh_status)
     # Masked DB URL for verification (no password)
     masked_db_url = None
     try:
@@ -85,6 +169,8 @@ async def health_check():
         "status": "healthy",
         "database": db_status,
         "db_url": masked_db_url,
+        "cache_refresh": cache_refresh,
+        "http_cache": http_cache.stats(),
     }
 
 def _mask_url(url: str) -> str:
@@ -103,46 +189,88 @@ def _mask_url(url: str) -> str:
     return url
 
 
+def _score_matches(df: pd.DataFrame, db: Session, now: datetime = None) -> pd.DataFrame:
+    """
+    Clean and score explorer rows, only calculating statistics for matches missing from the statistics cache.
+    Cached and new matches count days_ago from the same `now`.
+    """
+    now = now or datetime.now()
+    df = clean_df_and_fill_nas(df)
+    df['watched'] = False
+    # Game numbers come from every game of the series seen so far, not just the games in this fetch
+    game_numbers = index_series_games(db, df)
+    df_cached, df_new = split_cached_matches(db, df, now)
+    df_cached = apply_game_numbers(df_cached, game_numbers)
+    if not df_new.empty:
+        df_new = calculate_all_game_statistics(df_new, now=now)
+        df_new = apply_game_numbers(df_new, game_numbers)
+        df_new = calculate_statistics_scores(df_new)
+        save_match_statistics(db, df_new)
+    return merge_cached_matches(df_cached, df_new)
+
+
+LATEST_MATCHES_COLS = ['match_id', 'title', 'days_ago', 'days_ago_pretty', 'final_score', 'first_fight_at', 'tournament',
+                       'radiant_team_name', 'dire_team_name', 'duration_min']
+
+
+def _save_to_latest_matches(df: pd.DataFrame, db: Session, rated_matches: Dict[str, Any]) -> int:
+    """Replace the latest_matches snapshot with the rows returned by /api/matches, in one bulk upsert."""
+    df_sel = df.reindex(columns=LATEST_MATCHES_COLS)
+    df_sel = df_sel[df_sel['match_id'].notna()].copy()
+    match_ids = df_sel['match_id'].astype(str)
+    df_sel['user_score'] = match_ids.map(lambda mid: getattr(rated_matches.get(mid), 'score', None))
+    df_sel['user_title'] = match_ids.map(lambda mid: getattr(rated_matches.get(mid), 'title', None))
+    saved = bulk_upsert(db, LatestMatch, df_sel.to_dict('records'))
+    db.query(LatestMatch).filter(LatestMatch.match_id.notin_(match_ids.tolist())).delete(synchronize_session=False)
+    db.commit()
+    return saved
+
+
+def _compute_matches() -> List[Dict[str, Any]]:
+    """Fetch, score and decorate the latest matches, runs in the pipeline executor."""
+    db = SessionLocal()
+    try:
+        df = fetch_dota_data_from_api()
+        now = datetime.now()
+        df = _score_matches(df, db, now)
+        df = calculate_subjective_weighted_scores(df, now)
+
+        # The explorer join can return a match twice, keep the best scored row
+        df = df.drop_duplicates('match_id')
+
+        # Select top 100, titles are only built for these, and add user ratings for just those matches
+        df_scores = create_title(df.head(100).copy())[SCORES_COLS].copy()
+        rated_matches = get_ratings(db, df_scores['match_id'])
+        df_scores['user_score'] = df_scores['match_id'].map(lambda mid: getattr(rated_matches.get(str(mid)), 'score', None))
+        df_scores['user_title'] = df_scores['match_id'].map(lambda mid: getattr(rated_matches.get(str(mid)), 'title', ''))
+        _save_to_latest_matches(df_scores, db, rated_matches)
+    finally:
+        db.close()
+    
+    return [
+        {
+            "match_id": str(row['match_id']),
+            "title": row.get('title'),
+            "days_ago": float(row['days_ago']) if pd.notna(row['days_ago']) else None,
+            "days_ago_pretty": row.get('days_ago_pretty'),
+            "final_score": float(row['final_score']) if pd.notna(row['final_score']) else None,
+            "first_fight_at": row.get('first_fight_at') if pd.notna(row.get('first_fight_at')) else None,
+            "tournament": row.get('tournament'),
+            "radiant_team_name": row.get('radiant_team_name'),
+            "dire_team_name": row.get('dire_team_name'),
+            "duration_min": int(row['duration_min']) if pd.notna(row['duration_min']) else None,
+            "user_score": int(row['user_score']) if pd.notna(row['user_score']) else None,
+            "user_title": row.get('user_title'),
+        }
+        for _, row in df_scores.iterrows()
+    ]
+
+
 @app.get("/api/matches")
 async def get_matches() -> List[Dict[str, Any]]:
     try:
-
-        df = fetch_dota_data_from_api()
-        df = clean_df_and_fill_nas(df)
-        df['watched'] = False
-        df = calculate_all_game_statistics(df)
-        df = calculate_statistics_scores(df)
-        df = calculate_subjective_weighted_scores(df)
-
-        # Add user ratings from database
-        db = SessionLocal()
-        try:
-            rated_matches = {str(r.match_id): r for r in db.query(MatchRating).all()}
-            df['user_score'] = df['match_id'].map(lambda mid: getattr(rated_matches.get(str(mid)), 'score', None))
-            df['user_title'] = df['match_id'].map(lambda mid: getattr(rated_matches.get(str(mid)), 'title', ''))
-        finally:
-            db.close()
-
-        # Select columns and return top 100
-        df_scores = df[SCORES_COLS + ['user_score', 'user_title']].head(100)
-        
-        return [
-            {
-                "match_id": str(row['match_id']),
-                "title": row.get('title'),
-                "days_ago": float(row['days_ago']) if pd.notna(row['days_ago']) else None,
-                "days_ago_pretty": row.get('days_ago_pretty'),
-                "final_score": float(row['final_score']) if pd.notna(row['final_score']) else None,
-                "first_fight_at": row.get('first_fight_at') if pd.notna(row.get('first_fight_at')) else None,
-                "tournament": row.get('tournament'),
-                "radiant_team_name": row.get('radiant_team_name'),
-                "dire_team_name": row.get('dire_team_name'),
-                "duration_min": int(row['duration_min']) if pd.notna(row['duration_min']) else None,
-                "user_score": int(row['user_score']) if pd.notna(row['user_score']) else None,
-                "user_title": row.get('user_title'),
-            }
-            for _, row in df_scores.iterrows()
-        ]
+        # Simultaneous requests share one fetch + scoring run
+        return await _run_coalesced("matches", _compute_matches)
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -155,87 +283,117 @@ async def recalculate():
     return {"status": "success"}
 
 
+SECONDS_PER_DAY = 24 * 60 * 60
+CACHED_MATCHES_COLS = ['match_id', 'title', 'start_time', 'final_score', 'static_score', 'tournament',
+                       'radiant_team_name', 'dire_team_name', 'duration_min']
+# Matches show up in the explorer a while after they start and their replays are parsed later still, refreshes look
+# back this far past the watermark, skip the matches already cached and rescore the ones cached unparsed
+WATERMARK_OVERLAP_SECONDS = 6 * 60 * 60
+# Rows per explorer page, a refresh pages back until it reaches the watermark
+REFRESH_LIMIT = 1000
+QUERY_CHUNK_SIZE = 500
+
+
+def _refresh_since(watermark, cutoff: int) -> int:
+    # Start of the matches to fetch, the whole window on the first refresh
+    return cutoff if watermark is None else max(cutoff, watermark - WATERMARK_OVERLAP_SECONDS)
+
+
+def _refresh_query(since: int, before: int = None, inclusive: bool = True) -> str:
+    """Explorer query for one page of the matches started after `since`, older than `before` when given."""
+    conditions = PRO_MATCHES + [f"matches.start_time > {int(since)}"]
+    if before is not None:
+        conditions.append(f"matches.start_time {'<=' if inclusive else '<'} {int(before)}")
+    return explorer_query(conditions, limit=REFRESH_LIMIT)
+
+
+def _fetch_since(since: int) -> pd.DataFrame:
+    """
+    Fetch every match started after `since`, newest first in pages of REFRESH_LIMIT rows, so a refresh after an
+    outage with more new matches than one page doesn't skip the older ones.
+    """
+    pages, seen = [], set()
+    before, inclusive = None, True
+    while True:
+        page = fetch_dota_data_from_api(_refresh_query(since, before, inclusive))
+        if page.empty:
+            break
+        match_ids = page['match_id'].astype(str)
+        # Pages overlap on the start_time they were split at
+        pages.append(page[~match_ids.isin(seen)])
+        seen.update(match_ids)
+        if len(page) < REFRESH_LIMIT:
+            break
+        oldest = int(pd.to_numeric(page['start_time']).min())
+        # The next page repeats the oldest second in case its matches were cut by the limit, unless the whole page
+        # was that second
+        inclusive = before is None or oldest < before
+        before = oldest
+    if not pages:
+        return pd.DataFrame()
+    return pd.concat(pages, ignore_index=True)
+
+
+def _drop_cached(df: pd.DataFrame, session: Session) -> pd.DataFrame:
+    """
+    Drop explorer rows whose match is already in cached_matches, before anything is decoded or scored.
+    Matches cached before their replay was parsed are kept once it is, so they are rescored with the replay data.
+    """
+    match_ids = df['match_id'].astype(str)
+    unique_ids = match_ids.unique().tolist()
+    cached = set()
+    for start in range(0, len(unique_ids), QUERY_CHUNK_SIZE):
+        cached.update(m for (m,) in session.query(CachedMatch.match_id)
+                      .filter(CachedMatch.match_id.in_(unique_ids[start:start + QUERY_CHUNK_SIZE])))
+    is_cached = match_ids.isin(cached)
+    # Statistics are only cached for parsed matches, a cached match without them was scored unparsed
+    scored_unparsed = is_cached & ~match_ids.isin(statistics_cached_ids(session, cached)) & replay_parsed(df)
+    return df[~is_cached | scored_unparsed]
+
+
+def _cache_new_matches(df: pd.DataFrame, session: Session) -> int:
+    """Score explorer rows and upsert them into cached_matches, the caller commits."""
+    if df.empty:
+        return 0
+    now = datetime.now()
+    df = _score_matches(df, session, now)
+    df = calculate_subjective_weighted_scores(df, now)
+    df = calculate_static_score(df)
+    df = create_title(df)
+
+    # Select columns
+    df_sel = df.reindex(columns=CACHED_MATCHES_COLS)
+    df_sel = df_sel[df_sel['match_id'].notna()]
+    # Skip matches with "???" in the title
+    df_sel = df_sel[~df_sel['title'].fillna('').astype(str).str.contains('???', regex=False)]
+    return bulk_upsert(session, CachedMatch, df_sel.to_dict('records'))
+
+
 def _refresh_cached_matches(days_limit: int = 100) -> int:
-    """Fetch latest matches, keep last N days, upsert into cached_matches, prune old rows."""
+    """Fetch and score the matches newer than the refresh watermark, upsert into cached_matches, prune old rows."""
     session = SessionLocal()
-    upserted = 0
     try:
-        df = fetch_dota_data_from_api()
-        df = clean_df_and_fill_nas(df)
-        df['watched'] = False
-        df = calculate_all_game_statistics(df)
-        df = calculate_statistics_scores(df)
-
-        # Filter to recent window
-        try:
-            df['days_ago'] = pd.to_numeric(df.get('days_ago'), errors='coerce')
-            df = df[(df['days_ago'] >= 0) & (df['days_ago'] <= days_limit)]
-        except Exception:
-            pass
-
-        try:
-            df['days_ago_pretty'] = df.apply(lambda r: format_days_ago_pretty(r.get('days_ago'), r.get('date')), axis=1)
-        except Exception:
-            pass
-
-        # Select columns
-        cols = ['match_id', 'title', 'days_ago', 'days_ago_pretty', 'final_score', 'tournament', 'radiant_team_name', 'dire_team_name', 'duration_min']
-        missing = [c for c in cols if c not in df.columns]
-        for c in missing:
-            df[c] = None
-        df_sel = df[cols].copy()
-
-        # Upsert and prune
-        for _, row in df_sel.iterrows():
-            mid = str(row['match_id']) if pd.notna(row['match_id']) else None
-            if not mid:
-                continue
-            
-            # Skip matches with "???" in the title
-            title = row['title'] if pd.notna(row['title']) else ''
-            if '???' in str(title):
-                continue
-            
-            try:
-                existing = session.query(CachedMatch).filter(CachedMatch.match_id == mid).first()
-                if existing:
-                    existing.title = row['title'] if pd.notna(row['title']) else existing.title
-                    existing.final_score = float(row['final_score']) if pd.notna(row['final_score']) else existing.final_score
-                    existing.days_ago = float(row['days_ago']) if pd.notna(row['days_ago']) else existing.days_ago
-                    existing.days_ago_pretty = row['days_ago_pretty'] if pd.notna(row['days_ago_pretty']) else existing.days_ago_pretty
-                    existing.tournament = row['tournament'] if pd.notna(row['tournament']) else existing.tournament
-                    existing.radiant_team_name = row['radiant_team_name'] if pd.notna(row['radiant_team_name']) else existing.radiant_team_name
-                    existing.dire_team_name = row['dire_team_name'] if pd.notna(row['dire_team_name']) else existing.dire_team_name
-                    existing.duration_min = int(row['duration_min']) if pd.notna(row['duration_min']) else existing.duration_min
-                else:
-                    session.add(CachedMatch(
-                        match_id=mid,
-                        title=row['title'] if pd.notna(row['title']) else None,
-                        final_score=float(row['final_score']) if pd.notna(row['final_score']) else None,
-                        days_ago=float(row['days_ago']) if pd.notna(row['days_ago']) else None,
-                        days_ago_pretty=row['days_ago_pretty'] if pd.notna(row['days_ago_pretty']) else None,
-                        tournament=row['tournament'] if pd.notna(row['tournament']) else None,
-                        radiant_team_name=row['radiant_team_name'] if pd.notna(row['radiant_team_name']) else None,
-                        dire_team_name=row['dire_team_name'] if pd.notna(row['dire_team_name']) else None,
-                        duration_min=int(row['duration_min']) if pd.notna(row['duration_min']) else None,
-                    ))
-                # Flush this row to detect conflicts early
-                session.flush()
-                upserted += 1
-            except Exception as e:
-                # Skip this row if there's a duplicate key error or other issue
-                session.rollback()
-                print(f"Warning: Skipping match {mid} due to error: {e}")
-                # Continue processing other rows
-                continue
-
-        # Prune rows older than window
-        try:
-            session.query(CachedMatch).filter(CachedMatch.days_ago > days_limit).delete()
-        except Exception:
-            pass
-
+        cutoff = int(time.time()) - days_limit * SECONDS_PER_DAY
+        watermark, _ = cache_refresh_job.watermark(session)
+        if watermark is not None and session.query(CachedMatch.id).first() is None:
+            # The cache was emptied, fill the whole window again
+            watermark = None
+        df = _fetch_since(_refresh_since(watermark, cutoff))
+
+        upserted = 0
+        if not df.empty:
+            start_times = pd.to_numeric(df['start_time'], errors='coerce')
+            newest = df.loc[start_times.idxmax()]
+            upserted = _cache_new_matches(_drop_cached(df[start_times >= cutoff], session), session)
+            cache_refresh_job.advance_watermark(session, newest['start_time'], newest['match_id'])
+
+        # Prune rows older than window, a range delete on the start_time index
+        session.query(CachedMatch).filter(
+            or_(CachedMatch.start_time < cutoff, CachedMatch.start_time.is_(None))
+        ).delete(synchronize_session=False)
+        prune_series_games(session, cutoff)
         session.commit()
+        invalidate_generation()
         return upserted
     except Exception:
         session.rollback()
@@ -244,142 +402,229 @@ def _refresh_cached_matches(days_limit: int = 100) -> int:
         session.close()
 
 
+def _rescore_cached_matches(session: Session, now: datetime = None) -> int:
+    """Recalculate final_score of cached matches as they age, only rows whose score changed are written."""
+    rows = (
+        session.query(CachedMatch.id, CachedMatch.start_time, CachedMatch.static_score, CachedMatch.final_score)
+        .filter(CachedMatch.static_score.isnot(None), CachedMatch.start_time.isnot(None))
+        .all()
+    )
+    if not rows:
+        return 0
+    df = pd.DataFrame(rows, columns=['id', 'start_time', 'static_score', 'old_final_score'])
+    df = rescore_recency(df, now)
+    changed = df[df['final_score'] != df['old_final_score']]
+    session.bulk_update_mappings(CachedMatch, changed[['id', 'final_score']].to_dict('records'))
+    return len(changed)
+
+
+def _read_cached_matches(limit: int) -> List[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        # Top rows straight from the (final_score, start_time) index
+        rows = (
+            db.query(CachedMatch)
+            .filter(CachedMatch.final_score.isnot(None))
+            .order_by(CachedMatch.final_score.desc(), CachedMatch.start_time.desc())
+            .limit(limit)
+            .all()
+        )
+
+        # Map to dicts with expected fields, days ago is derived from start_time so it never goes stale
+        # Legacy rows without start_time keep their stored values
+        days_ago, pretty = time_ago(pd.to_datetime(pd.Series([r.start_time for r in rows], dtype=float), unit='s'))
+        base = []
+        for r, d, p in zip(rows, days_ago, pretty):
+            has_date = r.start_time is not None
+            base.append({
+                "match_id": r.match_id,
+                "title": r.title,
+                "days_ago": int(d) if has_date else r.days_ago,
+                "days_ago_pretty": p if has_date else r.days_ago_pretty,
+                "final_score": r.final_score,
+                "first_fight_at": None,
+                "tournament": r.tournament,
+                "radiant_team_name": r.radiant_team_name,
+                "dire_team_name": r.dire_team_name,
+                "duration_min": r.duration_min,
+            })
+
+        # Add user ratings for the returned page
+        rated_matches = get_ratings(db, [item["match_id"] for item in base])
+        for item in base:
+            rid = str(item["match_id"]) if item.get("match_id") is not None else None
+            rating = rated_matches.get(rid) if rid is not None else None
+            item["user_score"] = getattr(rating, "score", None)
+            item["user_title"] = getattr(rating, "title", "")
+        return base
+    finally:
+        db.close()
+
+
+def _rescore_cached_matches_job() -> int:
+    session = SessionLocal()
+    try:
+        rescored = _rescore_cached_matches(session)
+        session.commit()
+        invalidate_generation()
+        return rescored
+    finally:
+        session.close()
+
+
+# Kept warm by the refresh scheduler (see lifespan), the job_runs lock row keeps it to one worker at a time
+# The refresh only fetches what is new since its watermark, the rescore ages days_ago_score of everything cached
+cache_refresh_job = ScheduledJob("refresh_cached_matches", functools.partial(_refresh_cached_matches, 100),
+                                 REFRESH_EVERY_MINUTES / 60)
+cache_rescore_job = ScheduledJob("rescore_cached_matches", _rescore_cached_matches_job, RESCORE_EVERY_MINUTES / 60)
+
+
+# How long a request for an empty cache waits for another worker's refresh
+REFRESH_WAIT_SECONDS = 120
+
+# Browsers and the CDN serve these for max-age, then revalidate in the background with the ETag
+MATCHES_CACHED_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=900"
+RATINGS_CACHE_CONTROL = "public, max-age=5, stale-while-revalidate=60"
+
+
+def _load_cache_generation() -> str:
+    """Last refresh and rescore of cached_matches and the latest rating, read with Core selects, no ORM objects."""
+    with engine.connect() as conn:
+        jobs = conn.execute(select(JobRun.key, JobRun.last_finished_at)
+                            .where(JobRun.key.in_([cache_refresh_job.key, cache_rescore_job.key]))).all()
+        ratings = conn.execute(select(func.count(MatchRating.id), func.max(MatchRating.updated_at))).one()
+    return repr((sorted(tuple(job) for job in jobs), tuple(ratings)))
+
+
+async def _etag(request: Request, *parts) -> str:
+    # Computed before the body is read, a write in between gives a stale ETag (one extra 200), never a stale body
+    # Default threadpool like /api/health, so a 304 doesn't wait behind scoring runs
+    # A generation written by another worker also drops the ratings cache, its user_score may be from before it
+    generation = await run_in_threadpool(cache_generation, _load_cache_generation, on_change=invalidate_ratings)
+    return make_etag(generation, request.url.path, request.url.query, *parts)
+
+
+def _cached_response(etag: str, cache_control: str, body=None):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=body, headers=headers)
+
+
 @app.get("/api/matches_cached")
-async def get_matches_cached(limit: int = 100, background_tasks: BackgroundTasks = None) -> List[Dict[str, Any]]:
+async def get_matches_cached(request: Request, limit: int = 100) -> List[Dict[str, Any]]:
     try:
-        db = SessionLocal()
-        try:
-            # Fetch cached matches ordered by final_score desc, handling NULLs
-            rows = (
-                db.query(CachedMatch)
-                .order_by(CachedMatch.final_score.desc().nulls_last())
-                .limit(limit)
-                .all()
-            )
-
-            # Map to dicts with expected fields
-            base = [
-                {
-                    "match_id": r.match_id,
-                    "title": r.title,
-                    "days_ago": r.days_ago,
-                    "days_ago_pretty": r.days_ago_pretty,
-                    "final_score": r.final_score,
-                    "first_fight_at": None,
-                    "tournament": r.tournament,
-                    "radiant_team_name": r.radiant_team_name,
-                    "dire_team_name": r.dire_team_name,
-                    "duration_min": r.duration_min,
-                }
-                for r in rows
-            ]
-
-            # Add user ratings from database
-            rated_matches = {str(r.match_id): r for r in db.query(MatchRating).all()}
-            for item in base:
-                rid = str(item["match_id"]) if item.get("match_id") is not None else None
-                rating = rated_matches.get(rid) if rid is not None else None
-                item["user_score"] = getattr(rating, "score", None)
-                item["user_title"] = getattr(rating, "title", "")
-
-            # Fire-and-forget refresh to keep cache warm (last 100 days)
-            if background_tasks is not None:
-                background_tasks.add_task(_refresh_cached_matches, 100)
-
-            # If cache empty, fall back to live fetch synchronously
-            if not base:
-                try:
-                    _refresh_cached_matches(100)
-                    rows = (
-                        db.query(CachedMatch)
-                        .order_by(CachedMatch.final_score.desc().nulls_last())
-                        .limit(limit)
-                        .all()
-                    )
-                    base = [
-                        {
-                            "match_id": r.match_id,
-                            "title": r.title,
-                            "days_ago": r.days_ago,
-                            "days_ago_pretty": r.days_ago_pretty,
-                            "final_score": r.final_score,
-                            "first_fight_at": None,
-                            "tournament": r.tournament,
-                            "radiant_team_name": r.radiant_team_name,
-                            "dire_team_name": r.dire_team_name,
-                            "duration_min": r.duration_min,
-                            "user_score": getattr(rated_matches.get(str(r.match_id)), "score", None),
-                            "user_title": getattr(rated_matches.get(str(r.match_id)), "title", ""),
-                        }
-                        for r in rows
-                    ]
-                except Exception:
-                    pass
-
-            return base
-        finally:
-            db.close()
+        # days_ago_pretty counts hours for the last day, the hour is part of the representation
+        etag = await _etag(request, int(time.time() // 3600))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return _cached_response(etag, MATCHES_CACHED_CACHE_CONTROL)
+        base = await run_in_threadpool(_read_cached_matches, limit)
+
+        # If cache empty, fall back to live fetch
+        if not base:
+            try:
+                # Only one refresh runs at a time in this process, overlapping callers wait for it
+                ran = await _run_coalesced("refresh_cached_matches", cache_refresh_job.run, True)
+                if not ran:
+                    # Another worker holds the lock, read what its refresh wrote
+                    await wait_until_idle(cache_refresh_job, run_in_threadpool, REFRESH_WAIT_SECONDS)
+                invalidate_generation()
+                etag = await _etag(request, int(time.time() // 3600))
+                base = await run_in_threadpool(_read_cached_matches, limit)
+            except Exception:
+                # Still answers with the empty cache, but a failing first refresh shows up in the logs
+                logger.exception("refreshing the empty match cache failed")
+
+        return _cached_response(etag, MATCHES_CACHED_CACHE_CONTROL, base)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _resolve_match_title(match_id: str, db: Session):
+    """
+    Title of a match, from the stored match tables when possible.
+    Only a match we have never scored costs an explorer request, for that match and its series.
+    """
+    for model in (CachedMatch, LatestMatch):
+        title = db.query(model.title).filter(model.match_id == match_id).scalar()
+        if title:
+            return title
+    statistics = load_match_statistics(db, [match_id]).get(match_id)
+    if statistics and 'game_num' in statistics:
+        return create_title(pd.DataFrame([statistics]))['title'].iloc[0]
+
+    df = fetch_dota_data_from_api(match_query(match_id))
+    if df.empty:
+        return None
+    df = _score_matches(df, db)
+    row = df.loc[df['match_id'].astype(str) == match_id]
+    if row.empty:
+        return None
+    return create_title(row.copy())['title'].iloc[0]
+
+
+def _rate_match(request: RateMatchRequest, db: Session):
+    match_id = str(request.match_id)
+
+    try:
+        derived_title = _resolve_match_title(match_id, db)
+    except Exception:
+        logger.exception(f"could not resolve title for match {match_id}")
+        derived_title = None
+
+    # Check if rating exists
+    rating = db.query(MatchRating).filter(MatchRating.match_id == match_id).first()
+
+    if rating:
+        # Update existing rating
+        rating.score = request.score
+        if derived_title:
+            rating.title = derived_title
+    else:
+        # Create new rating
+        rating = MatchRating(
+            match_id=match_id,
+            title=derived_title or "",
+            score=request.score
+        )
+        db.add(rating)
+
+    db.commit()
+    invalidate_ratings(match_id)
+    invalidate_generation()
+
+
 @app.post("/api/rate_match")
 async def rate_match(request: RateMatchRequest, db: Session = Depends(get_db)):
     try:
-        match_id = str(request.match_id)
-
-        # Derive the current match title from the computed dataset
-        try:
-            df = fetch_dota_data_from_api()
-            df = clean_df_and_fill_nas(df)
-            df['watched'] = False
-            df = calculate_all_game_statistics(df)
-            # Find the row with this match_id
-            row = df.loc[df['match_id'] == int(request.match_id)]
-            derived_title = None
-            if not row.empty:
-                derived_title = row.iloc[0].get('title')
-        except Exception:
-            derived_title = None
-
-        # Check if rating exists
-        rating = db.query(MatchRating).filter(MatchRating.match_id == match_id).first()
-
-        if rating:
-            # Update existing rating
-            rating.score = request.score
-            if derived_title:
-                rating.title = derived_title
-        else:
-            # Create new rating
-            rating = MatchRating(
-                match_id=match_id,
-                title=derived_title or "",
-                score=request.score
-            )
-            db.add(rating)
-
-        db.commit()
+        await run_in_threadpool(_rate_match, request, db)
         return {"status": "success"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _list_ratings(limit: int, db: Session) -> List[Dict[str, Any]]:
+    qs = db.query(MatchRating).order_by(MatchRating.created_at.desc()).limit(limit).all()
+    return [
+        {
+            "match_id": r.match_id,
+            "title": r.title,
+            "score": r.score,
+            "created_at": r.created_at.isoformat(),
+            "updated_at": r.updated_at.isoformat() if r.updated_at else None,
+        }
+        for r in qs
+    ]
+
+
 @app.get("/api/ratings")
-async def list_ratings(limit: int = 50, db: Session = Depends(get_db)):
+async def list_ratings(request: Request, limit: int = 50, db: Session = Depends(get_db)):
     try:
-        qs = db.query(MatchRating).order_by(MatchRating.created_at.desc()).limit(limit).all()
-        return [
-            {
-                "match_id": r.match_id,
-                "title": r.title,
-                "score": r.score,
-                "created_at": r.created_at.isoformat(),
-                "updated_at": r.updated_at.isoformat() if r.updated_at else None,
-            }
-            for r in qs
-        ]
+        etag = await _etag(request)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return _cached_response(etag, RATINGS_CACHE_CONTROL)
+        return _cached_response(etag, RATINGS_CACHE_CONTROL, await run_in_threadpool(_list_ratings, limit, db))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
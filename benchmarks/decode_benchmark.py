@@ -0,0 +1,65 @@
+"""
+Times parsing the nested explorer columns of a 4000 row historic file,
+ast.literal_eval per row (the old calcs path) against dota.decode.
+python benchmarks/decode_benchmark.py [historic.csv]
+Without a file, 4000 synthetic rows shaped like the explorer output are used.
+"""
+import ast
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dota.decode import decode_gold_adv, decode_objectives, decode_teamfights  # noqa: E402
+
+ROWS = 4000
+NESTED_COLS = ['teamfights', 'objectives', 'radiant_gold_adv']
+
+
+def _synthetic_row(rng):
+    minutes = rng.randint(25, 60)
+    players = [{'deaths': rng.randint(0, 2), 'buybacks': 0, 'damage': rng.randint(0, 9000), 'healing': 0,
+                'gold_delta': rng.randint(-500, 900), 'xp_delta': rng.randint(0, 900),
+                'ability_uses': {'ability_a': 2, 'ability_b': 1}, 'item_uses': {'item_blink': 1},
+                'killed': {}, 'deaths_pos': {'120': {'130': 1}}} for _ in range(10)]
+    teamfights = []
+    for _ in range(rng.randint(3, 20)):
+        start = rng.randint(300, minutes * 60)
+        teamfights.append({'start': start, 'end': start + rng.randint(15, 60), 'last_death': start + 10,
+                           'deaths': rng.randint(3, 9), 'players': players})
+    objectives = [{'time': rng.randint(0, minutes * 60), 'type': rng.choice(
+        ['CHAT_MESSAGE_FIRSTBLOOD', 'building_kill', 'CHAT_MESSAGE_ROSHAN_KILL', 'CHAT_MESSAGE_AEGIS']),
+                   'key': 'npc_dota_goodguys_tower1_mid', 'slot': 1, 'player_slot': 129} for _ in range(40)]
+    gold = [rng.randint(-20000, 20000) for _ in range(minutes)]
+    # str() like the csv files hold them
+    return {'teamfights': str(teamfights), 'objectives': str(objectives), 'radiant_gold_adv': str(gold)}
+
+
+def load(path=None):
+    if path:
+        return pd.read_csv(path, usecols=NESTED_COLS, nrows=ROWS)
+    rng = random.Random(0)
+    return pd.DataFrame([_synthetic_row(rng) for _ in range(ROWS)])
+
+
+def literal_eval_per_row(df):
+    for col in NESTED_COLS:
+        [ast.literal_eval(v) if isinstance(v, str) else v for v in df[col]]
+
+
+def decode(df):
+    decode_teamfights(df['teamfights'])
+    decode_objectives(df['objectives'])
+    decode_gold_adv(df['radiant_gold_adv'])
+
+
+if __name__ == '__main__':
+    df = load(sys.argv[1] if len(sys.argv) > 1 else None)
+    for name, fn in [('ast.literal_eval per row', literal_eval_per_row), ('dota.decode', decode)]:
+        start = time.perf_counter()
+        fn(df)
+        print(f'{name}: {time.perf_counter() - start:.2f}s for {len(df)} rows')
@@ -0,0 +1,94 @@
+"""
+Memory of the scored match frame for a 4000 match batch, the object/int64 columns and titles for every row
+(the old calcs path) against the compact frame of dota.match_frame.
+python benchmarks/match_frame_benchmark.py
+Synthetic rows shaped like the explorer output are used, teams are passed in so nothing is fetched.
+"""
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import dota.calcs as calcs  # noqa: E402
+from dota.calculate_scores import calculate_statistics_scores, calculate_subjective_weighted_scores  # noqa: E402
+
+ROWS = 4000
+TEAMS = 300
+LEAGUES = 40
+# Raw explorer columns, the same in both frames
+NESTED_COLS = ['teamfights', 'objectives', 'radiant_gold_adv']
+
+
+def _synthetic_row(rng, match_id):
+    minutes = rng.randint(25, 60)
+    teamfights = []
+    for _ in range(rng.randint(3, 12)):
+        start = rng.randint(300, minutes * 60)
+        teamfights.append({'start': start, 'end': start + rng.randint(15, 60), 'deaths': rng.randint(3, 9)})
+    objectives = [{'time': rng.randint(0, minutes * 60), 'type': rng.choice(
+        ['CHAT_MESSAGE_FIRSTBLOOD', 'building_kill', 'CHAT_MESSAGE_ROSHAN_KILL', 'CHAT_MESSAGE_AEGIS'])}
+        for _ in range(20)]
+    league = rng.randrange(LEAGUES)
+    return {
+        'match_id': match_id,
+        'start_time': 1_750_000_000 + match_id * 600,
+        'duration': minutes * 60,
+        'radiant_score': rng.randint(5, 50),
+        'dire_score': rng.randint(5, 50),
+        'radiant_win': rng.random() < 0.5,
+        'first_blood_time': rng.randint(0, 300),
+        'leagueid': 17000 + league,
+        'name': f'League {league} presented by Sponsor {league}',
+        'tier': rng.choice(['professional', 'premium']),
+        'series_id': 900_000 + match_id // 3,
+        'series_type': 1,
+        'radiant_team_id': rng.randrange(TEAMS),
+        'dire_team_id': rng.randrange(TEAMS),
+        'tower_status_radiant': rng.randint(0, 2047),
+        'tower_status_dire': rng.randint(0, 2047),
+        'barracks_status_radiant': rng.choice([0, 3, 48, 63]),
+        'barracks_status_dire': rng.choice([0, 3, 48, 63]),
+        'teamfights': str(teamfights),
+        'objectives': str(objectives),
+        'radiant_gold_adv': str([rng.randint(-20000, 20000) for _ in range(minutes)]),
+    }
+
+
+def load():
+    rng = random.Random(0)
+    df = pd.DataFrame([_synthetic_row(rng, n) for n in range(ROWS)])
+    df['date'] = pd.to_datetime(df['start_time'], unit='s')
+    df_teams = pd.DataFrame({'team_id': range(TEAMS), 'name': [f'Team {n}' for n in range(TEAMS)],
+                             'rating': range(TEAMS, 0, -1)})
+    return df, df_teams
+
+
+def old_create_title(df):
+    df[['radiant_team_name', 'dire_team_name', 'tournament']] = \
+        df[['radiant_team_name', 'dire_team_name', 'tournament']].fillna('???')
+    df['tournament'] = df['tournament'].str.split('presented').str[0].str.split('powered').str[0].str.strip()
+    df['title'] = df['radiant_team_name'] + ' vs ' + df['dire_team_name'] + ' game ' + df['game_num'].astype(
+        int).astype(str) + ' ' + df['tournament']
+    return df
+
+
+def score(df, df_teams):
+    df = calcs.calculate_all_game_statistics(df.copy(), df_teams.copy())
+    return calculate_subjective_weighted_scores(calculate_statistics_scores(df))
+
+
+def megabytes(df, exclude=()):
+    return df.drop(columns=list(exclude)).memory_usage(deep=True).sum() / 1e6
+
+
+if __name__ == '__main__':
+    df, df_teams = load()
+    compact = score(df, df_teams)
+    calcs.clean_names, calcs.compact_match_frame = old_create_title, lambda d: d
+    old = score(df, df_teams)
+    for name, frame in [('object columns, titles for every row', old), ('dota.match_frame', compact)]:
+        print(f'{name}: {megabytes(frame, NESTED_COLS):.2f} MB without the raw nested columns, '
+              f'{megabytes(frame):.2f} MB in total, for {len(frame)} matches')
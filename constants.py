@@ -8,8 +8,27 @@ TEAM_ABBR = {
     'evil geniuses': 'eg'
 }
 
+# Objective types counted into one column each, miniboss is tormentor
+KNOWN_OBJECTIVES = [
+    'CHAT_MESSAGE_COURIER_LOST',
+    'CHAT_MESSAGE_FIRSTBLOOD',
+    'building_kill',
+    'CHAT_MESSAGE_ROSHAN_KILL',
+    'CHAT_MESSAGE_AEGIS_STOLEN',
+    'CHAT_MESSAGE_AEGIS',
+    'CHAT_MESSAGE_DENIED_AEGIS',
+    'CHAT_MESSAGE_MINIBOSS_KILL',
+]
+
 # Score configuration
 FINAL_SCORE_COLS = ['interesting_score', 'days_ago_score', 'good_team_playing_score', 'aegis_steals_score']
+# increase weight of interestingness score
+FINAL_SCORE_WEIGHTS = {
+    'interesting_score': 3,
+    'days_ago_score': 1,
+    'good_team_playing_score': 1,
+    'aegis_steals_score': 0.1,
+}
 WHOLE_GAME_SCORE_COLS = [
     'swing_score', 
     'fight_%_of_game_score', 
@@ -29,3 +48,37 @@ SCORES_COLS = [
     'dire_team_name',
     'duration_min'
 ]
+
+
+# Statistics cache configuration
+# Bump when the statistics/score calculations change so cached statistics get recalculated
+SCORING_VERSION = 3
+# Per-match columns that don't depend on the current time, stored in the match_statistics table
+STATISTICS_CACHE_COLS = [
+    'tournament',
+    'radiant_team_name',
+    'dire_team_name',
+    'radiant_team_rank',
+    'dire_team_rank',
+    'game_num',
+    'total_kills',
+    'duration_min',
+    'first_fight_at',
+    'first_fight_secs',
+    'fight_%_of_game',
+    'avg_fight_length',
+    'min_in_lead',
+    'swing',
+    'lead_is_small',
+    'win_team_barracks_lost',
+    'win_team_barracks_dif',
+    'boring',
+    'fight_%_of_game_score',
+    'min_in_lead_score',
+    'duration_min_score',
+    'lead_is_small_score',
+    'swing_score',
+    'barracks_comeback_score',
+    'aegis_steals_score',
+    'good_team_playing_score',
+]
@@ -19,12 +19,17 @@ SCORES_CSV_FILE = f'{LOCAL_TEX_DIR}/scores.csv'
 YOUTUBE_CSV_FILE = f'{TEXT_DIR}/scores_and_urls.csv'
 HISTORIC_FILE = f'{TEXT_DIR}/historic.csv'
 LATEST_HISTORIC_FILE = f'{LOCAL_TEX_DIR}/last_6_months.csv'
+# Parquet match stores partitioned by month (dota/match_store.py), replace the two csv files above
+HISTORIC_STORE_DIR = f'{TEXT_DIR}/historic'
+LATEST_HISTORIC_STORE_DIR = f'{LOCAL_TEX_DIR}/last_6_months'
 ALREADY_WATCHED_FILE = f'{TEXT_DIR}/already_watched.txt'
 LAST_GOT_HIGHLIGHT_VIDEOS = f'{LOCAL_TEX_DIR}/last_got_highlight_videos.txt'
 LAST_RUN_FILE = f'{LOCAL_TEX_DIR}/last_run.json'
 HIGHLIGHT_VIDEOS = f'{TEXT_DIR}/highlight_videos.csv'
 SCORES_NO_HIGHLIGHTS = f'{TEXT_DIR}/scores_no_highlights.csv'
 TEAM_NAMES_FILE = f'{LOCAL_TEX_DIR}/team_names.csv'
+# OpenDota responses cached on disk (dota/http_cache.py)
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", f'{LOCAL_TEX_DIR}/http_cache')
 DATE_STR_FORMAT = '%Y-%m-%d:%H:%M:%S'
 # Just using highlights score, but just been watching whole games
 redo_historic_scores = os.getenv("REDO_HISTORIC_SCORES", "False")
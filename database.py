@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, text
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, DateTime, Text, UniqueConstraint, Index, \
+    func, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 # Load environment variables from .env if present (for local dev)
@@ -22,6 +24,13 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def utc_now():
+    # Naive UTC, the DateTime columns are stored without a timezone. Used for every stored timestamp (row defaults,
+    # job leases, team registry TTL) so they all compare in one convention
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class MatchRating(Base):
     __tablename__ = "match_ratings"
     
@@ -29,23 +38,30 @@ class MatchRating(Base):
     match_id = Column(String, unique=True, index=True, nullable=False)
     title = Column(String, nullable=False)
     score = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now)
+    updated_at = Column(DateTime, default=utc_now, onupdate=utc_now)
 
 class CachedMatch(Base):
     __tablename__ = "cached_matches"
+    # /api/matches_cached reads the top rows in (final_score, start_time) order straight from this index
+    __table_args__ = (Index("ix_cached_matches_final_score_start_time", "final_score", "start_time"),)
 
     id = Column(Integer, primary_key=True, index=True)
     match_id = Column(String, unique=True, index=True, nullable=False)
     title = Column(String, nullable=True)
     final_score = Column(Float, nullable=True)
+    # final_score without the recency part, lets final_score be rescored as matches age
+    static_score = Column(Float, nullable=True)
+    # OpenDota unix start time, days ago is derived from it when reading
+    start_time = Column(BigInteger, index=True, nullable=True)
+    # Legacy, no longer written, both are derived from start_time when reading
     days_ago = Column(Float, nullable=True)
     days_ago_pretty = Column(String, nullable=True)
     tournament = Column(String, nullable=True)
     radiant_team_name = Column(String, nullable=True)
     dire_team_name = Column(String, nullable=True)
     duration_min = Column(Integer, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now)
 
 
 class LatestMatch(Base):
@@ -64,7 +80,73 @@ class LatestMatch(Base):
     duration_min = Column(Integer, nullable=True)
     user_score = Column(Integer, nullable=True)
     user_title = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now)
+
+class MatchStatistics(Base):
+    # Per-match statistics and scores, only valid for the scoring config they were calculated with
+    __tablename__ = "match_statistics"
+    __table_args__ = (UniqueConstraint("match_id", "config_hash", name="uq_match_statistics_match_config"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    match_id = Column(String, index=True, nullable=False)
+    config_hash = Column(String, nullable=False)
+    statistics = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=utc_now)
+
+class JobRun(Base):
+    # One row per scheduled job, doubles as the lock that keeps several workers from running the job at once
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True, nullable=False)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_duration_seconds = Column(Float, nullable=True)
+    last_error = Column(Text, nullable=True)
+    # Newest match the job has processed, for jobs that only fetch what is new (see ScheduledJob.watermark)
+    watermark_start_time = Column(BigInteger, nullable=True)
+    watermark_match_id = Column(String, nullable=True)
+
+class SeriesGame(Base):
+    # Every series game seen so far, game numbers stay right when a series spans several fetches (see dota/series.py)
+    __tablename__ = "series_games"
+
+    id = Column(Integer, primary_key=True, index=True)
+    match_id = Column(String, unique=True, index=True, nullable=False)
+    series_id = Column(BigInteger, index=True, nullable=False)
+    series_type = Column(Integer, nullable=True)
+    start_time = Column(BigInteger, nullable=True)
+
+
+class Team(Base):
+    # OpenDota /teams snapshot, refreshed in the background once older than dota.teams.TEAMS_TTL_HOURS
+    __tablename__ = "teams"
+
+    id = Column(Integer, primary_key=True, index=True)
+    team_id = Column(BigInteger, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=True)
+    rating = Column(Float, nullable=True)
+    rank = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+
+
+def add_missing_columns(bind=engine):
+    # create_all only creates missing tables, add the columns and indexes added to existing tables since (migration-lite)
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        with bind.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
 
 # Create tables
 def init_db():
@@ -72,6 +154,7 @@ def init_db():
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
         Base.metadata.create_all(bind=engine)
+        add_missing_columns()
         # Ensure 'title' is NOT NULL in Postgres (migration-lite)
         try:
             if engine.dialect.name == "postgresql":
@@ -85,6 +168,73 @@ def init_db():
         print(f"Error initializing database: {e}")
         raise
 
+# Most rows per INSERT ... ON CONFLICT statement
+UPSERT_CHUNK_SIZE = 500
+# Bound parameters per statement, SQLite before 3.32 allows 999, Postgres 65535
+MAX_BIND_PARAMETERS = {"sqlite": 900, "postgresql": 30000}
+
+
+def upsert_chunk_size(dialect_name, n_columns, max_rows=UPSERT_CHUNK_SIZE):
+    # Rows per statement so that rows x columns stays under the parameter limit of the dialect
+    max_parameters = MAX_BIND_PARAMETERS.get(dialect_name, MAX_BIND_PARAMETERS["sqlite"])
+    return max(1, min(max_rows, max_parameters // max(1, n_columns)))
+
+
+def _coerce_value(column, value):
+    # pandas hands over NaN/NA and numpy scalars, the DB drivers want None and plain python types
+    if value is None:
+        return None
+    try:
+        if value != value:
+            return None
+    except (TypeError, ValueError):
+        return None
+    python_type = column.type.python_type
+    if python_type in (int, float, str):
+        return python_type(value)
+    return value
+
+
+def bulk_upsert(session, model, rows, conflict_cols=("match_id",), chunk_size=None):
+    """
+    Insert or update rows with one INSERT ... ON CONFLICT (conflict_cols) DO UPDATE statement per chunk.
+    Like the per-row upserts it replaces, a None value never overwrites an existing value.
+    Rows with the same key are deduplicated, the last one wins. The caller commits.
+    :param session: SQLAlchemy session
+    :param model: mapped class, must have a unique constraint on conflict_cols
+    :param rows: list of dicts of column name -> value, unknown keys are ignored
+    :param chunk_size: rows per statement, defaults to upsert_chunk_size of the columns written
+    :return: number of rows written
+    """
+    dialect_name = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = model.__table__
+    columns = {c.name: c for c in table.columns if c.name != "id"}
+    # Every row of a multi-row VALUES needs the same keys
+    used_cols = [c for c in columns if any(c in row for row in rows)]
+    deduped = {}
+    for row in rows:
+        record = {c: _coerce_value(columns[c], row.get(c)) for c in used_cols}
+        key = tuple(record.get(c) for c in conflict_cols)
+        if None in key:
+            continue
+        deduped[key] = record
+    records = list(deduped.values())
+    update_cols = [c for c in used_cols if c not in conflict_cols]
+    chunk_size = chunk_size or upsert_chunk_size(dialect_name, len(used_cols))
+    for start in range(0, len(records), chunk_size):
+        stmt = insert(table).values(records[start:start + chunk_size])
+        if update_cols:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(conflict_cols),
+                set_={c: func.coalesce(stmt.excluded[c], table.c[c]) for c in update_cols},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_cols))
+        session.execute(stmt)
+    return len(records)
+
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
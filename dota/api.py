@@ -1,20 +1,43 @@
+import os
 from logging import getLogger
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from constants_old import TEAM_NAMES_FILE, HISTORIC_FILE, LATEST_HISTORIC_FILE
+from constants_old import TEAM_NAMES_FILE, HISTORIC_FILE, HISTORIC_STORE_DIR, LATEST_HISTORIC_FILE, \
+    LATEST_HISTORIC_STORE_DIR, HTTP_CACHE_DIR
+from dota.explorer_stream import NESTED_FIELDS, read_explorer_frame
+from dota.http_cache import ResponseCache
+from dota.match_store import MatchStore, import_csv_if_empty
 
 logger = getLogger(__name__)
 
+OPENDOTA_BASE_URL = os.getenv("OPENDOTA_BASE_URL", "https://api.opendota.com/api")
+# OpenDota answers 429 when rate limited, 5xx when the explorer database is overloaded
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 45
 
-def get_team_names_and_ranks_from_api():
-    # https://docs.opendota.com#tag/teams
-    # ?page=1
-    teams_url = 'https://api.opendota.com/api/teams'
-    logger.info("fetching team names and ranks")
-    r = requests.get(teams_url)
-    teams_raw = r.json()
+
+def _create_session(retries=3, backoff_factor=0.5):
+    # One pooled session for all OpenDota calls, retries 429/5xx with backoff (urllib3 adds jitter)
+    # The API handlers run them on the pipeline executor, off the event loop
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff_factor, backoff_jitter=backoff_factor,
+                  status_forcelist=sorted(RETRY_STATUS_CODES), allowed_methods=["GET"],
+                  respect_retry_after_header=True, raise_on_status=False)
+    session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=10))
+    session.mount("http://", HTTPAdapter(max_retries=retry, pool_maxsize=10))
+    return session
+
+
+session = _create_session()
+# Explorer and teams responses, shared by the API, the refresh job and the scripts (hit/miss counts in stats())
+http_cache = ResponseCache(HTTP_CACHE_DIR)
+
+
+def _teams_to_df(teams_raw):
     df_teams = pd.DataFrame(teams_raw)
     df_teams = df_teams.sort_values(by='rating', ascending=False)
     # match_id seems to be null for teams that do not exist anymore (example optic gaming)
@@ -22,61 +45,117 @@ def get_team_names_and_ranks_from_api():
     return df_teams
 
 
+def get_team_names_and_ranks_from_api():
+    # https://docs.opendota.com#tag/teams
+    # ?page=1
+    teams_url = f'{OPENDOTA_BASE_URL}/teams'
+    logger.info("fetching team names and ranks")
+    teams_raw = http_cache.json(session, teams_url, timeout=REQUEST_TIMEOUT)
+    return _teams_to_df(teams_raw)
+
+
 def get_team_names_and_ranks_from_api_and_save_locally():
     df_teams = get_team_names_and_ranks_from_api()
     df_teams.to_csv(TEAM_NAMES_FILE, index=False, header=True)
 
 
-DEFAULT_QUERY = f"""SELECT * 
-    FROM matches
-    JOIN leagues using(leagueid)
-    WHERE name not like '%Division II%'
-    AND leagues.TIER in ('professional','premium') 
-    ORDER BY matches.start_time DESC
-    LIMIT 1000"""
+# Explorer columns read by each pipeline stage, queries select only these instead of every matches column
+# (chat, cosmetics, picks_bans, ... are large and never read)
+PIPELINE_COLUMNS = {
+    'clean_df_and_fill_nas': ['match_id', 'start_time', 'series_type', 'name'],
+    'index_series_games': ['match_id', 'series_id', 'series_type', 'start_time'],
+    'get_team_names_and_ranks': ['radiant_team_id', 'dire_team_id'],
+    'calc_teamfight_stats': ['teamfights', 'duration'],
+    'calc_gold_adv_stats': ['radiant_gold_adv', 'radiant_win'],
+    'calculate_all_game_statistics': ['objectives', 'barracks_status_radiant', 'barracks_status_dire'],
+}
+LEAGUE_COLUMNS = {'name', 'tier'}
+# Computed by the explorer database so the raw columns don't have to be sent, round() is half away from zero and
+# returns numeric (sent as a string) so it is cast back
+DERIVED_COLUMNS = {
+    'total_kills': 'matches.radiant_score + matches.dire_score',
+    'duration_min': 'CAST(round(matches.duration / 60.0) AS integer)',
+}
+PRO_MATCHES = ["leagues.name not like '%Division II%'", "leagues.tier in ('professional','premium')"]
+
+
+def pipeline_columns():
+    # Union of PIPELINE_COLUMNS in first seen order
+    return list(dict.fromkeys(col for cols in PIPELINE_COLUMNS.values() for col in cols))
+
+
+def explorer_query(conditions=PRO_MATCHES, limit=None, columns=None):
+    """
+    Explorer query over matches joined with their league, selecting only the columns the pipeline reads
+    :param conditions: SQL conditions, ANDed
+    :param columns: matches/leagues columns, defaults to pipeline_columns(), DERIVED_COLUMNS are always added
+    """
+    columns = columns or pipeline_columns()
+    select = [f"leagues.{col}" if col in LEAGUE_COLUMNS else f"matches.{col}" for col in columns]
+    select += [f"{expr} AS {col}" for col, expr in DERIVED_COLUMNS.items()]
+    sql_query = "SELECT " + ",\n    ".join(select) + "\n    FROM matches\n    JOIN leagues using(leagueid)"
+    if conditions:
+        sql_query += "\n    WHERE " + "\n    AND ".join(conditions)
+    sql_query += "\n    ORDER BY matches.start_time DESC"
+    if limit:
+        sql_query += f"\n    LIMIT {int(limit)}"
+    return sql_query
+
+
+DEFAULT_QUERY = explorer_query(limit=1000)
+
+
+def match_query(match_id):
+    """
+    Explorer query for one match, plus the other games of its series so the game number in the title is right
+    :param match_id: OpenDota match id
+    """
+    match_id = int(match_id)
+    return explorer_query([f"""(matches.match_id = {match_id}
+    OR (matches.series_id != 0
+        AND matches.series_id = (SELECT series_id FROM matches WHERE match_id = {match_id})))"""])
+
+
+def _explorer_rows(sql_query):
+    return http_cache.json(session, f"{OPENDOTA_BASE_URL}/explorer", {'sql': sql_query}, REQUEST_TIMEOUT)['rows']
+
+
+def _explorer_frame(sql_query, nested_fields=NESTED_FIELDS):
+    # The body is parsed in chunks as it is read from the cache file, it never sits in memory whole
+    return read_explorer_frame(
+        http_cache.chunks(session, f"{OPENDOTA_BASE_URL}/explorer", {'sql': sql_query}, REQUEST_TIMEOUT),
+        nested_fields)
 
 
-def fetch_dota_data_from_api(sql_query=DEFAULT_QUERY):
-    # fetches data from opendota API and update the rolling 6 month file
-    url = f"""https://api.opendota.com/api/explorer?sql={sql_query}"""
-    r = requests.get(url, timeout=45)
-    if r.status_code != 200:
-        logger.error(r.text)
-    matches = r.json()['rows']
-    df = pd.DataFrame(matches)
-    return df
+def fetch_dota_data_from_api(sql_query=DEFAULT_QUERY, stream=True, nested_fields=NESTED_FIELDS):
+    """
+    :param stream: build the frame from the response in chunks (see dota.explorer_stream), nested columns hold
+        JSON text, otherwise the rows are parsed whole and hold python lists/dicts
+    :param nested_fields: fields of the nested columns kept while streaming, only the ones scoring reads by default.
+        Pass {} to keep everything, for frames written to a MatchStore
+    """
+    if stream:
+        return _explorer_frame(sql_query, nested_fields)
+    return pd.DataFrame(_explorer_rows(sql_query))
 
 
 def fetch_dota_data_from_api_and_save_locally(sql_query=DEFAULT_QUERY):
-    # fetches data from opendota API and update the rolling 6 month file
-    df_new = fetch_dota_data_from_api(sql_query)
-    df_raw = pd.read_csv(LATEST_HISTORIC_FILE)
-    df = pd.concat([df_new, df_raw])
-    df = df.drop_duplicates('match_id')
-    df = df[df['start_time'] >= (pd.Timestamp.now() - pd.DateOffset(months=4)).timestamp()]
-    df.to_csv(LATEST_HISTORIC_FILE, index=False, header=True)
+    # fetches data from opendota API and update the rolling 6 month file, with the nested columns whole
+    df_new = fetch_dota_data_from_api(sql_query, nested_fields={})
+    store = MatchStore(LATEST_HISTORIC_STORE_DIR)
+    import_csv_if_empty(store, LATEST_HISTORIC_FILE)
+    store.append(df_new)
+    store.drop_before((pd.Timestamp.now() - pd.DateOffset(months=4)).timestamp())
 
 
 def update_historic_file():
-    df_raw = pd.read_csv(HISTORIC_FILE)
-    latest_timestamp = df_raw["start_time"].max()
-    sql_query = f"""SELECT * 
-    FROM matches
-    JOIN leagues using(leagueid)
-    WHERE name not like '%Division II%'
-    AND leagues.TIER in ('professional','premium')
-    AND matches.start_time > {latest_timestamp} 
-    ORDER BY matches.start_time DESC
-    LIMIT 4000"""
-    url = f"""https://api.opendota.com/api/explorer?sql={sql_query}"""
-    r = requests.get(url, timeout=45)
-    if r.status_code != 200:
-        logger.error(r.text)
-    matches = r.json()['rows']
-    if not matches:
+    store = MatchStore(HISTORIC_STORE_DIR)
+    import_csv_if_empty(store, HISTORIC_FILE)
+    latest_timestamp = store.max_start_time() or 0
+    sql_query = explorer_query(PRO_MATCHES + [f"matches.start_time > {latest_timestamp}"], limit=4000)
+    # The store keeps the nested columns whole, not just the fields scoring reads
+    df = fetch_dota_data_from_api(sql_query, nested_fields={})
+    if df.empty:
         logger.info("no new matches found, not updating historic file")
         return
-    df_new = pd.DataFrame(matches)
-    df = pd.concat([df_new, df_raw])
-    df = df.drop_duplicates('match_id')
-    df.to_csv(HISTORIC_FILE, index=False, header=True)
+    store.append(df)
@@ -0,0 +1,158 @@
+import itertools
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+logger = getLogger(__name__)
+
+# Gold lead (absolute) below which a game is considered close
+SMALL_LEAD = 5000
+# Ignore the first few minutes of the game when counting how long the lead was small
+LEAD_IS_SMALL_SKIP_MINUTES = 5
+# Swings are only looked for after the laning stage, over a 10-minute window
+SWING_SKIP_MINUTES = 10
+SWING_WINDOW_MINUTES = 10
+
+
+def pack_ragged(series_list):
+    """
+    Pack a list of per-game minute series into one flat array plus an offsets array.
+    Game i occupies values[offsets[i]:offsets[i + 1]]
+    :param series_list: list of lists (empty list for games without data)
+    :return: (values, offsets)
+    """
+    lengths = np.fromiter((len(s) for s in series_list), dtype=np.int64, count=len(series_list))
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter(itertools.chain.from_iterable(series_list), dtype=np.float64, count=int(offsets[-1]))
+    return values, offsets
+
+
+def _segment_ids(offsets):
+    # game index for every value in the flat array
+    lengths = np.diff(offsets)
+    return np.repeat(np.arange(len(lengths)), lengths)
+
+
+def _positions_in_game(offsets):
+    # minute index within its own game for every value in the flat array
+    lengths = np.diff(offsets)
+    return np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths)
+
+
+def _radiant_win_flags(radiant_win):
+    # radiant_win can be None/NaN when OpenDota hasn't parsed the game yet, those games are treated
+    # as "not winning the entire game", same as calc_min_in_lead
+    valid = np.array([isinstance(v, (bool, np.bool_, int, np.integer)) for v in radiant_win], dtype=bool)
+    won = np.array([bool(v) if ok else False for v, ok in zip(radiant_win, valid)], dtype=bool)
+    return won, valid
+
+
+def batch_min_in_lead(values, offsets, radiant_win):
+    # Number of minutes the winning team was in the lead before they won, see calc_min_in_lead
+    n_games = len(offsets) - 1
+    lengths = np.diff(offsets)
+    min_in_lead = np.zeros(n_games, dtype=np.int64)
+    if values.size == 0:
+        return min_in_lead
+    changes = np.diff(np.sign(values)) != 0
+    # A difference between the last minute of one game and the first minute of the next is not a sign change
+    boundaries = offsets[1:-1]
+    boundaries = boundaries[(boundaries > 0) & (boundaries < values.size)]
+    changes[boundaries - 1] = False
+    change_idx = np.flatnonzero(changes)
+    game_of_change = np.searchsorted(offsets, change_idx, side='right') - 1
+    last_change = np.full(n_games, -1, dtype=np.int64)
+    np.maximum.at(last_change, game_of_change, change_idx)
+
+    has_change = last_change >= 0
+    last_diff_idx = offsets[:-1] + lengths - 2
+    min_in_lead[has_change] = last_diff_idx[has_change] - last_change[has_change]
+
+    # No sign change means one team was ahead the whole game, count all minutes if that team won
+    no_change = ~has_change & (lengths > 0)
+    final_adv = np.zeros(n_games)
+    final_adv[lengths > 0] = values[offsets[1:][lengths > 0] - 1]
+    won, valid = _radiant_win_flags(radiant_win)
+    winning_entire_game = valid & ((won & (final_adv > 0)) | (~won & (final_adv < 0)))
+    min_in_lead[no_change & winning_entire_game] = lengths[no_change & winning_entire_game] - 1
+    return min_in_lead
+
+
+def batch_lead_is_small(values, offsets):
+    # Percentage of minutes where the lead was less than 5000 gold, see calc_gold_lead_is_small
+    n_games = len(offsets) - 1
+    lengths = np.diff(offsets)
+    small = (np.abs(values) < SMALL_LEAD) & (_positions_in_game(offsets) >= LEAD_IS_SMALL_SKIP_MINUTES)
+    counts = np.bincount(_segment_ids(offsets), weights=small, minlength=n_games)
+    return np.divide(counts, lengths, out=np.zeros(n_games), where=lengths > 0)
+
+
+def _window_extremes(values, block_ids, fn):
+    # Running min/max from the start of each block (prefix) and to the end of each block (suffix)
+    prefix = getattr(pd.Series(values).groupby(block_ids, sort=False), fn)().to_numpy()
+    suffix = getattr(pd.Series(values[::-1]).groupby(block_ids[::-1], sort=False), fn)().to_numpy()[::-1]
+    return prefix, suffix
+
+
+def batch_max_gold_swing(values, offsets, window=SWING_WINDOW_MINUTES, skip_first_x_minutes=SWING_SKIP_MINUTES):
+    """
+    Largest change from a 5000+ lead to any value in the following `window` minutes, see calc_max_gold_swing.
+    Uses the van Herk/Gil-Werman trick: every game is cut into blocks of `window` minutes and a window
+    starting inside one block always ends inside the same or the next block, so its min/max is the min/max of
+    the first block's suffix and the next block's prefix. That keeps the whole batch O(number of minutes)
+    :param values: flat radiant_gold_adv values, from pack_ragged
+    :param offsets: offsets of every game into values, from pack_ragged
+    :param window: number of minutes to look ahead, None to look until the end of the game (whole-game swing)
+    :param skip_first_x_minutes: minutes at the start of the game that can't start a swing
+    :return: array with the max swing of every game
+    """
+    n_games = len(offsets) - 1
+    lengths = np.diff(offsets)
+    max_swing = np.zeros(n_games, dtype=np.int64)
+    if values.size == 0:
+        return max_swing
+    game_ids = _segment_ids(offsets)
+    game_end = np.repeat(offsets[1:] - 1, lengths)
+    idx = np.arange(values.size)
+    pos = _positions_in_game(offsets)
+
+    block_starts = (pos == 0) if window is None else (pos % window == 0)
+    block_ids = np.cumsum(block_starts) - 1
+    prefix_min, suffix_min = _window_extremes(values, block_ids, 'cummin')
+    prefix_max, suffix_max = _window_extremes(values, block_ids, 'cummax')
+
+    eligible = (pos >= skip_first_x_minutes) & (idx < game_end) & (np.abs(values) >= SMALL_LEAD)
+    # The window after minute j is [j + 1, j + window], cut off at the end of the game
+    left = idx[eligible] + 1
+    right = game_end[eligible] if window is None else np.minimum(idx[eligible] + window, game_end[eligible])
+    # When both ends are in the same block the window runs until the end of that block, so the suffix is enough
+    same_block = block_ids[left] == block_ids[right]
+    fwd_min = np.where(same_block, suffix_min[left], np.minimum(suffix_min[left], prefix_min[right]))
+    fwd_max = np.where(same_block, suffix_max[left], np.maximum(suffix_max[left], prefix_max[right]))
+
+    lead = values[eligible]
+    # A lead that turns into a deficit only counts until the gold is even
+    swing = np.where(lead > 0, lead - np.maximum(fwd_min, 0), lead - np.minimum(fwd_max, 0))
+    np.maximum.at(max_swing, game_ids[eligible], np.abs(swing).astype(np.int64))
+    return max_swing
+
+
+def gold_adv_statistics(values, offsets, radiant_win, swing_window=SWING_WINDOW_MINUTES,
+                        swing_skip_minutes=SWING_SKIP_MINUTES):
+    """
+    Compute min_in_lead, lead_is_small and swing for every game at once.
+    Games without any gold data get 0 for every statistic, same as the per-row functions
+    :param values: flat radiant_gold_adv values, from pack_ragged
+    :param offsets: offsets of every game into values, from pack_ragged
+    :param radiant_win: radiant_win for every game
+    :param swing_window: see batch_max_gold_swing
+    :param swing_skip_minutes: see batch_max_gold_swing
+    :return: dict of column name -> array with one value per game
+    """
+    return {
+        'min_in_lead': batch_min_in_lead(values, offsets, radiant_win),
+        'lead_is_small': batch_lead_is_small(values, offsets),
+        'swing': batch_max_gold_swing(values, offsets, swing_window, swing_skip_minutes),
+    }
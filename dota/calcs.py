@@ -1,14 +1,16 @@
-import ast
-import json
-from collections import Counter
-from datetime import datetime
 from logging import getLogger
 
 import numpy as np
 import pandas as pd
 
+from constants import KNOWN_OBJECTIVES
 from constants_old import TEAM_NAMES_FILE
-from dota.api import get_team_names_and_ranks_from_api
+from dota.decode import decode_gold_adv, decode_objectives, decode_teamfights
+from dota.match_frame import clean_names, compact_match_frame
+from dota.utils import time_ago
+from dota.teams import get_teams, teams_from_df, teams_frame
+from dota.batch_stats import pack_ragged, gold_adv_statistics, batch_max_gold_swing, SWING_WINDOW_MINUTES, \
+    SWING_SKIP_MINUTES
 
 logger = getLogger(__name__)
 
@@ -39,95 +41,71 @@ def calc_min_in_lead(df, i, radiant_gold_adv):
     return df
 
 
-def calc_max_gold_swing(df, i, radiant_gold_adv):
+def calc_max_gold_swing(df, i, radiant_gold_adv, window=SWING_WINDOW_MINUTES,
+                        skip_first_x_minutes=SWING_SKIP_MINUTES):
     # want to find the largest change in values from max value to any value after that
     # We choose a 10-minute window because it's not interesting if a team is up then another team slowly gets the lead after?
-    # improvement - also check the swing over the entire game, see what that gives
-    max_swing = 0
-    skip_first_x_minutes = 10
-    for j in range(skip_first_x_minutes, len(radiant_gold_adv) - 1):
-        # Find max net worth change that has occurred in the past 10 minutes
-        # Set value to 11 instead of 10 because of indexing
-        max_window = 11
-        indices_left = len(radiant_gold_adv[j + 1:]) + 1
-        window = indices_left if indices_left < max_window else max_window
-        val = radiant_gold_adv[j]
-        if abs(val) < 5000:
-            continue
-        if val > 0:
-            min_val = min(radiant_gold_adv[j + 1:j + window])
-            if min_val < 0:
-                min_val = 0
-            swing = val - min_val
-            # dif = val - min(radiant_gold_adv[j + 1:j + max_window])
-        else:
-            try:
-                max_val = max(radiant_gold_adv[j + 1:j + window])
-            except:
-                a = 1
-            if max_val > 0:
-                max_val = 0
-            swing = val - max_val
-
-        if abs(swing) > max_swing:
-            max_swing = abs(swing)
-    df.loc[i, 'swing'] = max_swing
+    # window=None checks the swing over the entire game
+    values, offsets = pack_ragged([radiant_gold_adv])
+    df.loc[i, 'swing'] = batch_max_gold_swing(values, offsets, window, skip_first_x_minutes)[0]
     return df
 
 
 def calc_game_num(df):
-    df.sort_values('date').groupby('series_id')
+    # Game number within the series of the matches in df, the API numbers them from the series index (dota/series.py)
+    # Matches outside a series (series_id 0) are game 1
     df['game_num'] = df.groupby('series_id')['date'].rank('min')
+    df.loc[df['series_id'] == 0, 'game_num'] = 1
     return df
 
 
-def calc_teamfight_stats(df, i):
-    # looks like this - [{'start': 2060, 'end': 2133, 'last_death': 2118, 'deaths': 8, ...
-    # or is NaN
-    teamfights = df.loc[i, 'teamfights']
-    if type(teamfights) == str:
-        # convert to list
-        teamfights = ast.literal_eval(teamfights)
-    if (type(teamfights) != list) and pd.isna(teamfights):
-        df.loc[i, 'first_fight_at'] = "30"
-        df.loc[i, 'fight_%_of_game'] = "0"
-        df.loc[i, 'avg_fight_length'] = "0"
-        return df
-    # num_teamfights = len(teamfights)
-    secs_of_fighting = 0
-    first_fight_at_in_secs = 100000
-    for fight in teamfights:
-        secs_of_fighting += fight['end'] - fight['start']
-        if fight['start'] < first_fight_at_in_secs:
-            first_fight_at_in_secs = fight['start']
-    # df['first_fight_at'] = df['first_fight_at'].astype('string')
+def teamfights_table(df, teamfights=None):
+    """
+    Long-form table of the teamfights of all matches, one row per fight
+    :param teamfights: decoded Teamfights of df (see dota/decode.py), decoded from df['teamfights'] when None
+    :return: DataFrame with match_idx (position of the match in df), match_id, start, end, deaths, length
+    """
+    if teamfights is None:
+        teamfights = decode_teamfights(df['teamfights'])
+    counts = np.diff(teamfights.offsets)
+    return pd.DataFrame({
+        'match_idx': np.repeat(np.arange(len(df)), counts),
+        'match_id': np.repeat(df['match_id'].to_numpy(), counts),
+        'start': teamfights.start,
+        'end': teamfights.end,
+        'deaths': teamfights.deaths,
+        'length': teamfights.end - teamfights.start,
+    })
+
+
+def calc_teamfight_stats(df, fights):
+    # fights is the teamfights_table of df, the stats of all matches come from one groupby
+    # Matches without teamfight data (or without fights) get no first fight and 0 for the fight stats
+    agg = fights.groupby('match_idx').agg(first_fight_secs=('start', 'min'), secs_of_fighting=('length', 'sum'),
+                                          num_teamfights=('start', 'size'))
+    agg = agg.reindex(range(len(df)))
+    first_fight_secs = agg['first_fight_secs'].to_numpy(dtype=float)
+    secs_of_fighting = agg['secs_of_fighting'].fillna(0).to_numpy(dtype=float)
+    num_teamfights = agg['num_teamfights'].fillna(0).to_numpy(dtype=float)
+    df['first_fight_secs'] = first_fight_secs
+    first_fight = pd.Series(first_fight_secs, index=df.index)
+    df['first_fight_at'] = ((first_fight // 60).astype('Int64').astype(str) + ':' +
+                            (first_fight % 60).astype('Int64').astype(str)).where(first_fight.notna(), None)
     # Only count since the first fight time because that's the time I will start watching
-    df.loc[i, 'first_fight_at'] = str(str(first_fight_at_in_secs // 60) + ':' + str(first_fight_at_in_secs % 60))
-    df.loc[i, 'fight_%_of_game'] = secs_of_fighting / (df.loc[i, 'duration'] - first_fight_at_in_secs)
-    num_teamfights = len(teamfights) if len(teamfights) > 0 else 1
-    df.loc[i, 'avg_fight_length'] = secs_of_fighting / num_teamfights
+    watched_secs = df['duration'].to_numpy(dtype=float) - np.nan_to_num(first_fight_secs)
+    df['fight_%_of_game'] = np.divide(secs_of_fighting, watched_secs, out=np.zeros(len(df)),
+                                      where=(num_teamfights > 0) & (watched_secs > 0))
+    df['avg_fight_length'] = np.divide(secs_of_fighting, num_teamfights, out=np.zeros(len(df)),
+                                       where=num_teamfights > 0)
     return df
 
 
-def calc_time_ago(df):
+def calc_time_ago(df, now=None):
     df['start_time'] = df['start_time'].fillna(0)
     df['date'] = pd.to_datetime(df['start_time'], unit='s')
     # Not accounting for UTC
-    # Improvement, remove the time_ago column completely and just use days_ago, then add the string on the frontend
-    df2 = pd.DataFrame()
-    df2['dif'] = datetime.now() - df['date']
-    df2['time_ago'] = None
-    df2['days_ago'] = None
-    df2.loc[df2['dif'].dt.days < 7, 'time_ago'] = df2['dif'].dt.days.astype(str) + ' days ago'
-    df2.loc[df2['dif'].dt.days < 7, 'days_ago'] = df2['dif'].dt.days.astype(str)
-    df2.loc[df2['dif'].dt.days == 0, 'time_ago'] = (df2['dif'].dt.seconds / 3600).astype(int).astype(str) + ' hours ago'
-    df2.loc[df2['dif'].dt.days == 0, 'days_ago'] = (df2['dif'].dt.seconds / 3600).astype(int).astype(str)
-    df2.loc[df2['dif'].dt.days >= 7, 'time_ago'] = (df2['dif'].dt.days / 7).astype(int).astype(str) + ' weeks ago'
-    df2.loc[df2['dif'].dt.days >= 7, 'days_ago'] = (df2['dif'].dt.days).astype(int).astype(str)
-    df2['months_ago'] = ((df2['dif']) / np.timedelta64(4, 'W')).astype(int)
-    df2.loc[df2['months_ago'] > 0, 'time_ago'] = df2['months_ago'].astype(str) + ' months ago'
-    df2.loc[df2['months_ago'] > 0, 'days_ago'] = df2['months_ago'].astype(str)
-    df['time_ago'] = df2['time_ago']
+    # time_ago is the legacy name of days_ago_pretty, kept for the highlight scripts
+    df['days_ago'], df['time_ago'] = time_ago(df['date'], now)
     return df
 
 
@@ -160,29 +138,20 @@ def calc_time_ago(df):
 
 
 def get_team_names_and_ranks(df, df_teams=None):
-    if df_teams is None:
-        df_teams = get_team_names_and_ranks_from_api()
-    df_teams["rank"] = df_teams.index + 1
-    df = df.merge(df_teams[['team_id', 'name', 'rank']], how='left', left_on='radiant_team_id', right_on='team_id')
-    df = df.merge(df_teams[['team_id', 'name', 'rank']], how='left', left_on='dire_team_id', right_on='team_id')
-    # df = df.rename(columns={"name_x": "radiant_team_name", "rank_x": "radiant_team_rank", "name_y": "dire_team_name",
-    #                         "rank_y": "dire_team_rank"})
-    df = df.rename(columns={"rank_x": "radiant_team_rank",
-                            "rank_y": "dire_team_rank"})
-    df['radiant_team_name'] = df['name_x']
-    df['dire_team_name'] = df['name_y']
-    df = df.drop(columns=['name_x', 'name_y', 'team_id_x', 'team_id_y'])
+    # Looked up in the team registry (dota/teams.py) unless the caller already fetched df_teams from the API
+    teams = get_teams() if df_teams is None else teams_from_df(df_teams)
+    lookup = teams_frame(teams)
+    df = df.reset_index(drop=True)
+    for side in ('radiant', 'dire'):
+        df[f'{side}_team_name'] = df[f'{side}_team_id'].map(lookup['name'])
+        df[f'{side}_team_rank'] = df[f'{side}_team_id'].map(lookup['rank'])
     return df
 
 
 def create_title(df):
-    # Remove text after 'presented' and/or 'powered'
-    df[['radiant_team_name', 'dire_team_name', 'tournament']] = \
-        df[['radiant_team_name', 'dire_team_name', 'tournament']].fillna('???')
-    df['game_num'] = df['game_num'].fillna(-1)
-    df['tournament'] = df['tournament'].str.split('presented').str[0].str.split('powered').str[0].str.strip()
-    df['title'] = df['radiant_team_name'] + ' vs ' + df['dire_team_name'] + ' game ' + df['game_num'].astype(
-        int).astype(str) + ' ' + df['tournament']
+    # Only built for the rows that are returned or stored, the names are cleaned by clean_names when scoring
+    df['title'] = (df['radiant_team_name'].astype(str) + ' vs ' + df['dire_team_name'].astype(str) + ' game '
+                   + df['game_num'].astype(int).astype(str) + ' ' + df['tournament'].astype(str))
     return df
 
 
@@ -203,62 +172,73 @@ def calc_gold_lead_is_small(df, i, radiant_gold_adv):
     return df
 
 
-def add_total_objectives_cols(df, i):
-    row = df.loc[i]
-    if type(row["objectives"]) == str:
-        objectives = ast.literal_eval(row["objectives"])
-    else:
-        objectives = row["objectives"]
-    # catches the case where objectives is NaN
-    if type(objectives) == list:
-        totals = Counter(d['type'] for d in objectives)
-        # TODO: Not checking if a new objective exists, want to know if the data has changed
-        for k, v in totals.items():
-            df.loc[i, k] = v
+def objectives_table(df, objectives=None):
+    """
+    Long-form table of the objectives of all matches, one row per objective
+    :param objectives: decoded Objectives of df (see dota/decode.py), decoded from df['objectives'] when None
+    :return: DataFrame with match_idx (position of the match in df), match_id, type
+    """
+    if objectives is None:
+        objectives = decode_objectives(df['objectives'])
+    counts = np.diff(objectives.offsets)
+    return pd.DataFrame({
+        'match_idx': np.repeat(np.arange(len(df)), counts),
+        'match_id': np.repeat(df['match_id'].to_numpy(), counts),
+        'type': pd.Categorical.from_codes(objectives.codes, objectives.categories),
+    })
+
+
+def add_total_objectives_cols(df, objectives):
+    # objectives is the objectives_table of df, pivoted into one count column per KNOWN_OBJECTIVES type
+    unknown = sorted(set(objectives['type'].dropna().unique()) - set(KNOWN_OBJECTIVES))
+    if unknown:
+        # The data has changed, these are not counted until they are added to KNOWN_OBJECTIVES
+        logger.warning(f"unknown objective types {unknown}")
+    # Position of each type in KNOWN_OBJECTIVES, -1 for unknown and missing types
+    codes = pd.Index(KNOWN_OBJECTIVES).get_indexer(objectives['type'].astype(object))
+    known = codes >= 0
+    counts = np.zeros((len(df), len(KNOWN_OBJECTIVES)), dtype=np.int64)
+    np.add.at(counts, (objectives['match_idx'].to_numpy()[known], codes[known]), 1)
+    df[KNOWN_OBJECTIVES] = counts
+    return df
+
+
+def calc_gold_adv_stats(df, swing_window=SWING_WINDOW_MINUTES, swing_skip_minutes=SWING_SKIP_MINUTES):
+    # Computes min_in_lead, swing and lead_is_small for all games at once instead of row by row
+    gold_adv = decode_gold_adv(df['radiant_gold_adv'])
+    stats = gold_adv_statistics(gold_adv.values, gold_adv.offsets, df['radiant_win'].tolist(), swing_window,
+                                swing_skip_minutes)
+    df['min_in_lead'] = np.where(gold_adv.missing, 100, stats['min_in_lead'])
+    df['swing'] = np.where(gold_adv.missing, 0, stats['swing'])
+    df['lead_is_small'] = np.where(gold_adv.missing, 0, stats['lead_is_small'])
     return df
 
 
-def calculate_all_game_statistics(df):
-    df['total_kills'] = df['radiant_score'] + df['dire_score']
-    df['duration_min'] = (df['duration'] / 60).round()
+def _derived(df, col, compute):
+    if col not in df.columns:
+        return compute()
+    return df[col].fillna(compute()) if df[col].isna().any() else df[col]
+
+
+def calculate_all_game_statistics(df, df_teams=None, now=None):
+    # Selected by the explorer query (dota.api.DERIVED_COLUMNS), computed here for rows stored before that
+    df['total_kills'] = _derived(df, 'total_kills', lambda: df['radiant_score'] + df['dire_score'])
+    # Half away from zero like the SQL round()
+    df['duration_min'] = _derived(df, 'duration_min', lambda: np.floor(df['duration'] / 60 + 0.5))
     df = df.rename(columns={"name": "tournament"})
-    df = get_team_names_and_ranks(df)
-    df = calc_time_ago(df)
+    df = get_team_names_and_ranks(df, df_teams)
+    df = calc_time_ago(df, now)
     df = calc_game_num(df)
-    df = create_title(df)
-    df['days_ago'] = (df['date'] - datetime.now()).dt.days
-    df[['swing', 'fight_%_of_game', 'lead_is_small', 'avg_fight_length']] = None
-
-    for i, row in df.iterrows():
-        # radiant_gold_adv = df.loc[i, 'radiant_gold_adv']
-        teamfights = df.loc[i, 'teamfights']
-        df = add_total_objectives_cols(df, i)
-        if teamfights is None:
-            df.loc[i, 'first_fight_at'] = 10000
-            df.loc[i, 'fight_%_of_game'] = 0
-            df.loc[i, 'avg_fight_length'] = 0
-        else:
-            df = calc_teamfight_stats(df, i)
-        radiant_gold_adv = df.loc[i, 'radiant_gold_adv']
-        # if np.na or (None or [])
-        if (type(radiant_gold_adv) != list and pd.isna(radiant_gold_adv)) or (not radiant_gold_adv):
-            df.loc[i, 'min_in_lead'] = 100
-            df.loc[i, 'swing'] = 0
-            df.loc[i, 'lead_is_small'] = 0
-
-        else:
-            radiant_gold_adv = df.loc[i, 'radiant_gold_adv']
-            if type(radiant_gold_adv) == str:
-                try:
-                    radiant_gold_adv = ast.literal_eval(df.loc[i, 'radiant_gold_adv'])
-                except:
-                    radiant_gold_adv = json.loads(df.loc[i, 'radiant_gold_adv'])
-            df = calc_min_in_lead(df, i, radiant_gold_adv)
-            df = calc_max_gold_swing(df, i, radiant_gold_adv)
-            df = calc_gold_lead_is_small(df, i, radiant_gold_adv)
+    df['game_num'] = df['game_num'].fillna(-1)
+    df = clean_names(df)
+
+    # Nested columns are parsed once for all matches
+    df = calc_teamfight_stats(df, teamfights_table(df))
+    df = add_total_objectives_cols(df, objectives_table(df))
+    df = calc_gold_adv_stats(df)
     df['swing'] = df['swing'].astype(int)
     df['lead_is_small'] = df['lead_is_small'].astype(float).round(2)
     df['min_in_lead'] = df['min_in_lead'].astype(int).round(2)
-    df['fight_%_of_game'] = df['fight_%_of_game'].astype(float).round(2)
-    df['avg_fight_length'] = df['avg_fight_length'].astype(float).round(2)
-    return df
+    df['fight_%_of_game'] = df['fight_%_of_game'].round(2)
+    df['avg_fight_length'] = df['avg_fight_length'].round(2)
+    return compact_match_frame(df)
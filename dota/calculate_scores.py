@@ -1,109 +1,122 @@
+
 import numpy as np
 import pandas as pd
 
-from constants import FINAL_SCORE_COLS, TEAMS_I_LIKE, WHOLE_GAME_SCORE_COLS
-from dota.score import linear_map
-from dota.utils import format_days_ago_pretty
+from constants import FINAL_SCORE_WEIGHTS, TEAMS_I_LIKE, WHOLE_GAME_SCORE_COLS
+from dota.match_frame import NAME_COLS, contains_any
+from dota.score import AnyPositive, Linear, LinearMap, Max, Min, Override, Select, Weighted, compile_scores
+from dota.utils import time_ago
 
 
-def calculate_statistics_scores(df):
-    col = 'days_ago'
-    df = linear_map(df, col, f'{col}_score', -100, 0, 0, 1)
+Range = LinearMap.Range
 
-    col = 'fight_%_of_game'
-    df[col] = df[col].astype(float)
-    df = linear_map(df, col, f'{col}_score', 0.05, 0.25, 0, 1)
-    df.loc[df[col] > 0.25, f'{col}_score'] = 1
-    df.loc[df[col] < 0.05, f'{col}_score'] = 0
-    df[f'{col}_score'] = df[f'{col}_score'].round(2)
+# Older than 100 days scores 0
+RECENCY_SCORE = Linear('days_ago', [Range(-100, 0, 0, 1)], decimals=None)
 
+# Scores of a match's statistics, stored in the statistics cache with the spec as part of its key
+STATISTICS_SCORES = [
+    ('days_ago_score', RECENCY_SCORE),
+    ('fight_%_of_game_score', Linear('fight_%_of_game', [Range(0.05, 0.25, 0, 1)])),
     # Number of minutes winning team had a gold advantage towards end of game
     # Improvement, should be taking into account how long the game is as well. Not as interesting if the game is 20 minutes
     # Should include as a percentage as well
-    col = 'min_in_lead'
-    df = linear_map(df, col, f'{col}_score', 5, 10, 1, 0)
-    df.loc[df[col] > 10, f'{col}_score'] = 0
-    df.loc[df[col] < 5, f'{col}_score'] = 1
-    df[f'{col}_score'] = df[f'{col}_score'].round(2)
-
-    col = 'duration_min'
-    df = linear_map(df, col, f'{col}_score', 45, 65, 0, 0.9)
-    df.loc[df[col] < 45, f'{col}_score'] = 0
-    df.loc[df[col] > 65, f'{col}_score'] = 1
-    df[f'{col}_score'] = df[f'{col}_score'].round(2)
+    ('min_in_lead_score', Linear('min_in_lead', [Range(5, 10, 1, 0)])),
+    ('duration_min_score', Linear('duration_min', [Range(45, 65, 0, 0.9)], above=1)),
+    ('lead_is_small_score', Linear('lead_is_small', [Range(0.5, 1, 0, 1)])),
+    ('swing_score', Linear('swing', [Range(7000, 12000, 0, 1)])),
+    # improvement, use objectives to calculate an objectives_score instead, so we can ignore the little buildings in the base
+    ('barracks_comeback_score', Linear('win_team_barracks_dif', [Range(-36, 63, 0.8, 0)], below=1)),
+    ('barracks_comeback_score', Override('barracks_comeback_score', 'megacreeps', value=1)),
+    # Add 0.1 to score if there's an aegis steal or deny
+    ('aegis_steals_score', AnyPositive(['CHAT_MESSAGE_AEGIS_STOLEN', 'CHAT_MESSAGE_DENIED_AEGIS'])),
+    # If 2 top tier teams are playing score=1
+    # If 2 good teams are playing score=0.75
+    # If 1 top tier is playing score=0.75
+    # If 1 good team playing score=0.5
+    # if no good teams score=0
+    # Aurora gaming at 13 currently
+    ('_worst_team_rank', Max(['radiant_team_rank', 'dire_team_rank'])),
+    ('_best_team_rank', Min(['radiant_team_rank', 'dire_team_rank'])),
+    ('good_team_playing_score', Select([
+        ('_worst_team_rank', 6, 1.0),
+        ('_worst_team_rank', 14, 0.75),
+        ('_best_team_rank', 6, 0.75),
+        ('_best_team_rank', 14, 0.5),
+    ])),
+    # manually override teams mmr and score highly if I simply like the teams
+    ('good_team_playing_score', Override('good_team_playing_score', 'team_i_like', value=1)),
+]
 
-    col = 'lead_is_small'
-    df.loc[df[col] == 1, col] = 0
-    df = linear_map(df, col, f'{col}_score', 0.5, 1, 0, 1)
-    df.loc[df[col] < 0.5, f'{col}_score'] = 0
-    df[f'{col}_score'] = df[f'{col}_score'].round(2)
+WEIGHTED_SCORES = [
+    # Game is interesting if it is over 63 minutes, it is close, there is a comeback
+    # Do OR operation of these
+    ('interesting_score', Max(['lead_is_small_score', 'min_in_lead_score', 'swing_score', 'barracks_comeback_score'])),
+    ('final_score_total', Weighted(FINAL_SCORE_WEIGHTS)),
+    ('final_score', Weighted({'final_score_total': 1}, divisor=sum(FINAL_SCORE_WEIGHTS.values()), factor=100,
+                             decimals=0)),
+    ('final_score', Override('final_score', 'unknown_team', factor=0.5)),
+    ('whole_game_score', Max(WHOLE_GAME_SCORE_COLS, decimals=2)),
+]
 
-    col = 'swing'
-    df = linear_map(df, col, f'{col}_score', 7000, 12000, 0, 1)
-    df.loc[df[col] < 7000, f'{col}_score'] = 0
-    df.loc[df[col] > 12000, f'{col}_score'] = 1
-    df[f'{col}_score'] = df[f'{col}_score'].round(2)
+_recency_scores = compile_scores([('days_ago_score', RECENCY_SCORE)])
+_statistics_scores = compile_scores(STATISTICS_SCORES)
+_weighted_scores = compile_scores(WEIGHTED_SCORES)
 
-    # improvement, use objectives to calculate an objectives_score instead, so we can ignore the little buildings in the base
+
+def calculate_recency_scores(df):
+    # Scores that depend on the current time, recalculated for matches loaded from the statistics cache
+    return _recency_scores.apply(df)
+
+
+def calculate_days_ago(df, now=None):
+    # Whole days since start_time, negative like calc_time_ago, so recency can be recalculated without the statistics
+    df['date'] = pd.to_datetime(df['start_time'], unit='s')
+    df['days_ago'] = time_ago(df['date'], now)[0]
+    return df
+
+
+def calculate_static_score(df):
+    # Weighted part of final_score that doesn't change with time, stored so the ranking can be rescored for recency
+    df['static_score'] = df['final_score_total'] - df['days_ago_score'] * FINAL_SCORE_WEIGHTS['days_ago_score']
+    return df
+
+
+def rescore_recency(df, now=None):
+    """
+    Recalculate days_ago, days_ago_score and final_score from start_time and static_score.
+    Matches the final_score of calculate_subjective_weighted_scores for matches with known team names.
+    """
+    df = calculate_days_ago(df, now)
+    df = calculate_recency_scores(df)
+    total = df['static_score'] + df['days_ago_score'] * FINAL_SCORE_WEIGHTS['days_ago_score']
+    df['final_score'] = (total / sum(FINAL_SCORE_WEIGHTS.values()) * 100).round(0)
+    return df
+
+
+def calculate_statistics_scores(df):
+    col = 'fight_%_of_game'
+    df[col] = df[col].astype(float)
+    col = 'lead_is_small'
+    df.loc[df[col] == 1, col] = 0
     df['win_team_barracks_lost'] = 63 - np.where(df['radiant_win'] == True, df['barracks_status_radiant'],
                                                  df['barracks_status_dire'])
     df['win_team_barracks_dif'] = np.where(df['radiant_win'] == True,
                                            df['barracks_status_radiant'] - df['barracks_status_dire'],
                                            df['barracks_status_dire'] - df['barracks_status_radiant'])
-    score_col = 'barracks_comeback_score'
-    df = linear_map(df, 'win_team_barracks_dif', score_col, -36, 63, 0.8, 0)
-    df.loc[df['win_team_barracks_dif'] < -36, score_col] = 1
-    df.loc[df['win_team_barracks_lost'] == 63, score_col] = 1  # megacreeps comeback
-    df[score_col] = df[score_col].round(2)
-
     df['boring'] = (df['lead_is_small'] < 0.7) & (df['swing'] < 5000)
     # df = df[~df['boring']]
-    df["aegis_steals_score"] = 0
-    # Add 0.1 to score if there's an aegis steal or deny
-    df["aegis_steals_score"] = (df["CHAT_MESSAGE_AEGIS_STOLEN"] + df["CHAT_MESSAGE_DENIED_AEGIS"] > 0).astype(float)
-
-    # If 2 top tier teams are playing score=1
-    # If 2 good teams are playing score=0.75
-    # If 1 top tier is playing score=0.75
-    # If 1 good team playing score=0.5
-    # if no good teams score=0
-    # Aurora gaming at 13 currently
-    mx = df[["radiant_team_rank", "dire_team_rank"]].max(axis=1)
-    mn = df[["radiant_team_rank", "dire_team_rank"]].min(axis=1)
-    df["good_team_playing_score"] = np.select(
-        [mx < 6, mx < 14, mn < 6, mn < 14],
-        [1.0, 0.75, 0.75, 0.5],
-        default=0.0
+    return _statistics_scores.apply(
+        df,
+        megacreeps=df['win_team_barracks_lost'] == 63,
+        team_i_like=np.logical_or.reduce([contains_any(df[col], TEAMS_I_LIKE) for col in NAME_COLS]),
     )
-    df["good_team_playing_score"] = df["good_team_playing_score"].round(2)
-    # manually override teams mmr and score highly if I simply like the teams
-    # from constants import TEAMS_I_LIKE
 
-    df.loc[df["title"].str.contains('|'.join(TEAMS_I_LIKE, ), case=False), f'good_team_playing_score'] = 1
-    return df
 
-def calculate_subjective_weighted_scores(df):
-    df['interesting_score'] = df[['lead_is_small_score', 'min_in_lead_score', 'swing_score',
-                                    'barracks_comeback_score']].max(axis=1)
-    weights = {c: 1 for c in FINAL_SCORE_COLS}
-    weights['interesting_score'] = 3
-    weights['aegis_steals_score'] = 0.1
-    df[FINAL_SCORE_COLS] = df[FINAL_SCORE_COLS].apply(pd.to_numeric, errors='coerce')
-    df['final_score_total'] = df[FINAL_SCORE_COLS].mul(pd.Series(weights)).sum(axis=1)
-    df['final_score_total'] = df['final_score_total'].astype('float')
-    df['final_score'] = (df['final_score_total'] / sum(weights.values()) * 100).round(0)
-    df[WHOLE_GAME_SCORE_COLS] = df[WHOLE_GAME_SCORE_COLS].apply(pd.to_numeric, errors='coerce')
-    df['whole_game_score'] = df[WHOLE_GAME_SCORE_COLS].max(axis=1).round(2)
-    mask = (df[['radiant_team_name', 'dire_team_name']] == '???').any(axis=1)
-    if mask.any():
-        df.loc[(df[['radiant_team_name', 'dire_team_name']] == '???').any(axis=1), ['final_score']] = \
-            df[['final_score']] / 2
+def calculate_subjective_weighted_scores(df, now=None):
+    unknown_team = (df[['radiant_team_name', 'dire_team_name']] == '???').any(axis=1)
+    df = _weighted_scores.apply(df, unknown_team=unknown_team)
     # Pretty format for days-ago
-
-    try:
-        df['days_ago_pretty'] = df.apply(lambda r: format_days_ago_pretty(r.get('days_ago'), r.get('date')), axis=1)
-    except Exception:
-        df['days_ago_pretty'] = None
+    df['days_ago_pretty'] = time_ago(df['date'], now)[1] if 'date' in df.columns else None
 
     df = df.sort_values('final_score', ascending=False)
     return df
\ No newline at end of file
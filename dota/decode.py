@@ -0,0 +1,152 @@
+import ast
+import json
+import re
+from collections import namedtuple
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:  # optional, json from the standard library is used without it
+    _loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+
+logger = getLogger(__name__)
+
+# The csv files hold str() of python lists, which is JSON apart from the quotes and these literals
+_PYTHON_LITERALS = re.compile(r"\b(True|False|None)\b")
+_JSON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+# Flat per-fight/per-objective arrays for all matches, the values of match n are [offsets[n]:offsets[n + 1]]
+# missing marks matches without the field, they have no values
+Teamfights = namedtuple('Teamfights', ['start', 'end', 'deaths', 'offsets', 'missing'])
+Objectives = namedtuple('Objectives', ['codes', 'categories', 'offsets', 'missing'])
+GoldAdv = namedtuple('GoldAdv', ['values', 'offsets', 'missing'])
+
+
+def _is_missing(v):
+    return v is None or (not isinstance(v, (str, list, dict)) and pd.isna(v))
+
+
+def _python_literal_to_json(s):
+    return _PYTHON_LITERALS.sub(lambda m: _JSON_LITERALS[m.group()], s.replace("'", '"'))
+
+
+def _parse_one(v):
+    try:
+        return _loads(v)
+    except _JSONDecodeError:
+        pass
+    try:
+        return _loads(_python_literal_to_json(v))
+    except _JSONDecodeError:
+        # Strings containing quotes don't survive the quote swap
+        return ast.literal_eval(v)
+
+
+def _loads_all(strings):
+    # One parser call for all the values, None when any of them isn't a single valid value
+    try:
+        results = _loads('[' + ','.join(strings) + ']')
+    except _JSONDecodeError:
+        return None
+    return results if len(results) == len(strings) else None
+
+
+def _parse_literals(strings):
+    # Only the values that aren't JSON get the python literal rewrite, it would change JSON strings holding
+    # quotes or the words True/False/None
+    results = [None] * len(strings)
+    failed = []
+    for n, v in enumerate(strings):
+        try:
+            results[n] = _loads(v)
+        except _JSONDecodeError:
+            failed.append(n)
+    rewritten = _loads_all([_python_literal_to_json(strings[n]) for n in failed]) if failed else []
+    if rewritten is None:
+        rewritten = [_parse_one(strings[n]) for n in failed]
+    for n, result in zip(failed, rewritten):
+        results[n] = result
+    return results
+
+
+def parse_nested_column(values):
+    """
+    Parse a column of JSON or python literal strings once, in bulk.
+    Already parsed values (from the explorer API) are passed through.
+    :param values: iterable of str, list, dict or missing values
+    :return: list of parsed values, None for missing values
+    """
+    values = list(values)
+    parsed = [None if _is_missing(v) else v for v in values]
+    to_parse = [n for n, v in enumerate(parsed) if isinstance(v, str)]
+    if not to_parse:
+        return parsed
+    strings = [parsed[n] for n in to_parse]
+    # JSON (streamed explorer frames) parses in one call, the csv files' python literals fall back
+    results = _loads_all(strings)
+    if results is None:
+        results = _parse_literals(strings)
+    for n, result in zip(to_parse, results):
+        parsed[n] = result
+    return parsed
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def ragged_row(offsets, n):
+    # Slice of the flat arrays holding the values of match n
+    return slice(offsets[n], offsets[n + 1])
+
+
+def decode_gold_adv(values):
+    """
+    :return: GoldAdv, games with no gold data (missing or []) are marked missing
+    """
+    parsed = parse_nested_column(values)
+    missing = np.array([not g for g in parsed], dtype=bool)
+    lists = [g or [] for g in parsed]
+    flat = np.fromiter((x for g in lists for x in g), dtype=np.float64)
+    return GoldAdv(flat, _offsets([len(g) for g in lists]), missing)
+
+
+def decode_teamfights(values):
+    """
+    :return: Teamfights with int64 start/end/deaths arrays of every fight
+    """
+    parsed = parse_nested_column(values)
+    missing = np.array([not isinstance(t, list) for t in parsed], dtype=bool)
+    fights = [f for t in parsed if isinstance(t, list) for f in t]
+    return Teamfights(
+        np.fromiter((f['start'] for f in fights), dtype=np.int64, count=len(fights)),
+        np.fromiter((f['end'] for f in fights), dtype=np.int64, count=len(fights)),
+        np.fromiter((f.get('deaths') or 0 for f in fights), dtype=np.int64, count=len(fights)),
+        _offsets([len(t) if isinstance(t, list) else 0 for t in parsed]),
+        missing,
+    )
+
+
+def decode_objectives(values, categories=None):
+    """
+    :param categories: objective types to encode, defaults to the types that appear
+    :return: Objectives with the type of every objective as codes into categories, -1 for types not in categories
+    """
+    parsed = parse_nested_column(values)
+    missing = np.array([not isinstance(o, list) for o in parsed], dtype=bool)
+    types = pd.Categorical([d['type'] for o in parsed if isinstance(o, list) for d in o], categories=categories)
+    return Objectives(
+        types.codes,
+        list(types.categories),
+        _offsets([len(o) if isinstance(o, list) else 0 for o in parsed]),
+        missing,
+    )
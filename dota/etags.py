@@ -0,0 +1,62 @@
+import hashlib
+import threading
+import time
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# Writes in this process invalidate the generation, the TTL just bounds how long other workers' writes go unseen
+GENERATION_TTL_SECONDS = 10
+
+# (expires_at, generation)
+_generation = None
+# Last generation loaded, kept through invalidate_generation so a reload can tell whether it changed
+_loaded = None
+_lock = threading.Lock()
+
+
+def cache_generation(load, on_change=None):
+    """
+    Identifier of the current state of the cached tables, reloaded at most every GENERATION_TTL_SECONDS
+    :param load: callable returning a str that changes whenever the tables change
+    :param on_change: called when a reload finds a different generation, before it is returned, to drop in-process
+        caches of the same tables so a body built for the new ETag doesn't come from them
+    """
+    global _generation, _loaded
+    now = time.monotonic()
+    with _lock:
+        if _generation is not None and _generation[0] > now:
+            return _generation[1]
+    generation = load()
+    with _lock:
+        changed = _loaded is not None and generation != _loaded
+        _generation = (now + GENERATION_TTL_SECONDS, generation)
+        _loaded = generation
+    if changed and on_change is not None:
+        logger.debug("cache generation changed")
+        on_change()
+    return generation
+
+
+def invalidate_generation():
+    # Call after writing to the cached tables so the next request gets a new ETag
+    global _generation
+    with _lock:
+        _generation = None
+
+
+def make_etag(*parts):
+    # Strong ETag, the same parts always give the same representation
+    return '"' + hashlib.sha256(repr(parts).encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    :param if_none_match: If-None-Match request header, a list of ETags or *
+    :return: True if the client already has the representation with this ETag
+    """
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, W/ prefixes (added by some proxies when compressing) are ignored
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
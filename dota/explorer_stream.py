@@ -0,0 +1,170 @@
+import codecs
+import json
+from array import array
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+
+    def _dumps(v):
+        return orjson.dumps(v).decode()
+except ImportError:  # optional, json from the standard library is used without it
+    def _dumps(v):
+        return json.dumps(v, separators=(',', ':'))
+
+logger = getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Fields of the nested explorer columns that dota.decode reads, the rest (teamfight players, objective slots, ...)
+# is dropped while streaming
+NESTED_FIELDS = {
+    'teamfights': ('start', 'end', 'deaths'),
+    'objectives': ('type',),
+}
+# Ints above this lose precision in the float64 buffer, such columns are kept as python objects
+_MAX_EXACT_INT = 2 ** 53
+
+
+class _Column:
+    """
+    Values of one column as they are streamed, numbers go into a float64 buffer until a value that isn't one
+    shows up, from then on everything goes into a list
+    """
+
+    def __init__(self, missing_rows=0):
+        self.numbers = array('d', [np.nan] * missing_rows)
+        self.objects = None
+        self.has_float = False
+        self.has_missing = missing_rows > 0
+
+    def __len__(self):
+        return len(self.numbers) if self.objects is None else len(self.objects)
+
+    def append(self, v):
+        if self.objects is not None:
+            self.objects.append(v)
+        elif v is None:
+            self.numbers.append(np.nan)
+            self.has_missing = True
+        elif type(v) is float:
+            self.numbers.append(v)
+            self.has_float = True
+        elif type(v) is int and -_MAX_EXACT_INT <= v <= _MAX_EXACT_INT:
+            self.numbers.append(v)
+        else:
+            self.objects = [None if x != x else (x if self.has_float else int(x)) for x in self.numbers]
+            self.numbers = None
+            self.objects.append(v)
+
+    def to_series(self):
+        if self.objects is not None:
+            return pd.Series(self.objects)
+        # Same dtypes pd.DataFrame(rows) infers, int64 unless a value is missing or a float
+        values = np.frombuffer(self.numbers, dtype=np.float64)
+        return pd.Series(values if self.has_float or self.has_missing else values.astype(np.int64))
+
+
+class _JsonStream:
+    # Incremental reader over chunks of a JSON document, only the undecoded tail of the body is buffered
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def _fill(self):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            chunk = b''
+        text = self.text.decode(chunk, final=self.exhausted) if isinstance(chunk, bytes) else chunk
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+
+    def peek(self):
+        # Next non whitespace character, None at the end of the document
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.exhausted:
+                return None
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} in the explorer response, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.exhausted:
+                    self.pos = end
+                    return v
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self._fill()
+
+
+def _trim(v, fields):
+    if not isinstance(v, list):
+        return v
+    return [{k: f.get(k) for k in fields} if isinstance(f, dict) else f for f in v]
+
+
+def read_explorer_frame(chunks, nested_fields=NESTED_FIELDS):
+    """
+    Build the DataFrame of an explorer response while it is downloaded, row by row into column buffers.
+    Nested values (teamfights, objectives, gold advantage) are kept as compact JSON text, dota.decode parses them.
+    :param chunks: iterable of bytes (or str) making up the response body
+    :param nested_fields: column -> fields kept of each nested item, the other fields are dropped
+    :return: DataFrame like pd.DataFrame(response['rows'])
+    """
+    stream = _JsonStream(chunks)
+    stream.expect('{')
+    # Skip the keys before rows (command, rowCount, ...), the ones after it are never read
+    while True:
+        if stream.peek() in ('}', None):
+            raise KeyError('rows')
+        if stream.peek() == ',':
+            stream.pos += 1
+            continue
+        key = stream.value()
+        stream.expect(':')
+        if key == 'rows':
+            break
+        stream.value()
+
+    stream.expect('[')
+    columns = {}
+    rows = 0
+    while stream.peek() != ']':
+        if stream.peek() == ',':
+            stream.pos += 1
+            continue
+        for col, v in stream.value().items():
+            if isinstance(v, (list, dict)):
+                v = _dumps(_trim(v, nested_fields[col]) if col in nested_fields else v)
+            column = columns.get(col)
+            if column is None:
+                column = columns[col] = _Column(rows)
+            column.append(v)
+        rows += 1
+        for column in columns.values():
+            if len(column) < rows:
+                column.append(None)
+    logger.debug(f"streamed {rows} explorer rows")
+    return pd.DataFrame({col: column.to_series() for col, column in columns.items()})
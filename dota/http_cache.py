@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from logging import getLogger
+from urllib.parse import urlsplit
+
+logger = getLogger(__name__)
+
+# Seconds a stored response is served without asking OpenDota, by API path
+ENDPOINT_TTLS = {
+    '/explorer': 60,
+    # Under dota.teams.TEAMS_TTL_HOURS so a registry refresh sees a recent snapshot
+    '/teams': 60 * 60,
+}
+DEFAULT_TTL = 60
+MAX_CACHE_BYTES = int(os.getenv("HTTP_CACHE_MAX_MB", "200")) * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+_LINE_BREAK = re.compile(r'\s*\n\s*')
+
+
+def _normalize(value):
+    # Line breaks and indentation don't change an explorer query, the same SQL laid out differently shares one entry
+    # Other whitespace is kept as is, it may be inside a string literal
+    return _LINE_BREAK.sub(' ', str(value).strip())
+
+
+def cache_key(url, params=None):
+    normalized = sorted((k, _normalize(v)) for k, v in (params or {}).items())
+    return hashlib.sha256(json.dumps([url, normalized]).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    On disk cache of GET responses, one body file and one metadata file per URL and params.
+    Fresh entries (younger than the TTL of their endpoint) are served from disk, stale ones are revalidated with
+    If-None-Match/If-Modified-Since when OpenDota sent an ETag/Last-Modified. The least recently used entries are
+    removed once the bodies take more than max_bytes.
+    """
+
+    def __init__(self, root, ttls=None, default_ttl=DEFAULT_TTL, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def _ttl(self, url):
+        path = urlsplit(url).path
+        return next((ttl for endpoint, ttl in self.ttls.items() if path.endswith(endpoint)), self.default_ttl)
+
+    def _paths(self, key):
+        return os.path.join(self.root, f'{key}.body'), os.path.join(self.root, f'{key}.json')
+
+    def _load_meta(self, key):
+        try:
+            with open(self._paths(key)[1]) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _open_body(self, key):
+        # Touching the body marks it recently used for eviction
+        body_path = self._paths(key)[0]
+        try:
+            f = open(body_path, 'rb')
+        except FileNotFoundError:
+            return None
+        os.utime(body_path)
+        return f
+
+    def _store(self, key, url, response):
+        os.makedirs(self.root, exist_ok=True)
+        body_path, meta_path = self._paths(key)
+        tmp = f'{body_path}.{uuid.uuid4().hex}.tmp'
+        # Written to disk as it downloads, the body is never held whole
+        with open(tmp, 'wb') as f:
+            for chunk in response.iter_content(READ_CHUNK_SIZE):
+                f.write(chunk)
+        os.replace(tmp, body_path)
+        self._write_meta(key, {'url': url, 'etag': response.headers.get('ETag'),
+                               'last_modified': response.headers.get('Last-Modified'), 'stored_at': time.time()})
+
+    def _write_meta(self, key, meta):
+        meta_path = self._paths(key)[1]
+        tmp = f'{meta_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith('.body'):
+                try:
+                    st = os.stat(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name[:-len('.body')]))
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                for path in self._paths(key):
+                    os.remove(path)
+            except OSError:
+                # Already removed by another worker, or still open on Windows
+                continue
+            total -= size
+            self._count('evictions')
+
+    def _request(self, session, url, params, timeout, key, revalidate=True):
+        # Opens the body of a fresh, revalidated or newly stored entry, error responses are returned uncached
+        meta = self._load_meta(key) if revalidate else None
+        if meta is not None and time.time() - meta['stored_at'] < self._ttl(url):
+            f = self._open_body(key)
+            if f is not None:
+                self._count('hits')
+                return f
+            meta = None
+        if meta is not None and not os.path.exists(self._paths(key)[0]):
+            # Nothing to revalidate
+            meta = None
+        headers = {}
+        if meta is not None and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta is not None and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        with session.get(url, params=params, timeout=timeout, headers=headers, stream=True) as r:
+            if r.status_code == 304 and revalidate:
+                f = self._open_body(key) if meta is not None else None
+                if f is not None:
+                    self._count('revalidated')
+                    self._write_meta(key, {**meta, 'stored_at': time.time()})
+                    return f
+                # The body was evicted since the metadata was read, fetched again without the conditional headers
+                logger.info(f"cached body of {url} is gone, fetching it again")
+                return self._request(session, url, params, timeout, key, revalidate=False)
+            if r.status_code != 200:
+                logger.error(r.text)
+                return r.content
+            self._count('misses')
+            self._store(key, url, r)
+        # Opened before evicting, an entry bigger than max_bytes is still served once
+        f = self._open_body(key)
+        if f is None:
+            # Evicted by another worker in between, the streamed response is already consumed so it is fetched again
+            # and served uncached
+            logger.info(f"cached body of {url} was evicted before it was read")
+            return session.get(url, params=params, timeout=timeout).content
+        self._evict()
+        return f
+
+    def chunks(self, session, url, params=None, timeout=None):
+        """
+        GET through the cache
+        :param session: requests.Session
+        :return: iterator over the response body in chunks of bytes
+        """
+        body = self._request(session, url, params, timeout, cache_key(url, params))
+        if isinstance(body, bytes):
+            yield body
+            return
+        with body:
+            while chunk := body.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    def json(self, session, url, params=None, timeout=None):
+        return json.loads(b''.join(self.chunks(session, url, params, timeout)))
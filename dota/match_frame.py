@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from constants import KNOWN_OBJECTIVES
+
+# Shown for missing team and tournament names
+UNKNOWN_NAME = '???'
+NAME_COLS = ['radiant_team_name', 'dire_team_name', 'tournament']
+# A few hundred distinct values across thousands of matches, stored once per value
+CATEGORY_COLS = NAME_COLS + ['tier']
+# Small counts and ids, never missing
+INT32_COLS = ['duration', 'radiant_score', 'dire_score', 'total_kills', 'first_blood_time', 'leagueid', 'series_type',
+              'tower_status_radiant', 'tower_status_dire', 'barracks_status_radiant', 'barracks_status_dire',
+              'min_in_lead', 'swing'] + KNOWN_OBJECTIVES
+# Whole numbers that can be missing, exact in float32
+FLOAT32_COLS = ['duration_min', 'first_fight_secs', 'radiant_team_rank', 'dire_team_rank']
+
+
+def compact_match_frame(df):
+    """
+    Dictionary-encode the name columns and narrow the numeric columns of a match frame.
+    Score inputs and scores stay float64 so they round the same way.
+    :return: df
+    """
+    for col in CATEGORY_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in INT32_COLS:
+        if col in df.columns and df[col].dtype.kind in 'iu':
+            df[col] = df[col].astype(np.int32)
+    for col in FLOAT32_COLS:
+        if col in df.columns and df[col].dtype.kind in 'fiu':
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def clean_names(df):
+    # Fill missing names and cut tournament names after 'presented'/'powered', once per distinct name
+    for col in NAME_COLS:
+        names = df[col].astype('category')
+        if UNKNOWN_NAME not in names.cat.categories:
+            names = names.cat.add_categories(UNKNOWN_NAME)
+        df[col] = names.fillna(UNKNOWN_NAME)
+    tournaments = df['tournament'].cat.categories.astype(str)
+    cleaned = tournaments.str.split('presented').str[0].str.split('powered').str[0].str.strip()
+    df['tournament'] = df['tournament'].map(dict(zip(tournaments, cleaned))).astype('category')
+    return df
+
+
+def contains_any(s, words):
+    """
+    Case-insensitive match of any of words, checked once per category for categorical columns
+    :return: bool Series, False for missing values
+    """
+    pattern = '|'.join(words)
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype(str).str.contains(pattern, case=False) & s.notna()
+    hits = np.asarray(s.cat.categories.astype(str).str.contains(pattern, case=False), dtype=bool)
+    # Code -1 (missing) picks the appended False
+    return pd.Series(np.append(hits, False)[s.cat.codes.to_numpy()], index=s.index)
@@ -0,0 +1,206 @@
+import os
+import shutil
+import uuid
+from logging import getLogger
+
+import pandas as pd
+
+from dota.decode import parse_nested_column
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only the local historic match files need it
+    pa = None
+
+logger = getLogger(__name__)
+
+PARTITION_PREFIX = 'month='
+# Struct fields that are always stored as strings, see _stringify_mixed_fields
+STRING_STRUCT_FIELDS = {'key'}
+# Rows per append when importing one of the old CSV files
+CSV_IMPORT_CHUNK_ROWS = 5000
+
+
+def _parse_one_or_keep(v):
+    try:
+        return parse_nested_column([v])[0]
+    except (ValueError, SyntaxError):
+        return v
+
+
+def _parse_nested(values):
+    # The CSV files stored lists as python literals, the explorer API returns them parsed or as JSON text
+    # Parsed in one bulk call, values that don't parse are kept as they are
+    nested = [n for n, v in enumerate(values) if isinstance(v, str) and v[:1] in ('[', '{')]
+    if not nested:
+        return values
+    values = list(values)
+    try:
+        parsed = parse_nested_column([values[n] for n in nested])
+    except (ValueError, SyntaxError):
+        parsed = [_parse_one_or_keep(values[n]) for n in nested]
+    for n, v in zip(nested, parsed):
+        values[n] = v
+    return values
+
+
+def _stringify_mixed_fields(values):
+    # Some explorer struct fields mix types between rows (objectives 'key' is a player slot or a building name),
+    # those are stored as strings so every part file gets the same struct type
+    types = {}
+    for v in values:
+        if isinstance(v, list):
+            for item in v:
+                if isinstance(item, dict):
+                    for k, x in item.items():
+                        if x is not None:
+                            types.setdefault(k, set()).add(float if type(x) is int else type(x))
+    mixed = {k for k, t in types.items() if len(t) > 1} | STRING_STRUCT_FIELDS
+    if not mixed & types.keys():
+        return values
+    return [[{k: str(x) if k in mixed and x is not None else x for k, x in item.items()}
+             if isinstance(item, dict) else item for item in v] if isinstance(v, list) else v for v in values]
+
+
+def _is_missing(v):
+    return v is None or (not isinstance(v, (list, dict)) and pd.isna(v))
+
+
+def _to_arrow_column(values, stored_type=None):
+    """
+    Nested fields become native list/struct columns
+    :param stored_type: type of the column in the files already written, new data is cast to it when possible
+    """
+    values = _stringify_mixed_fields(_parse_nested(values))
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = None
+    if stored_type is not None and (array is None or array.type != stored_type):
+        try:
+            return array.cast(stored_type) if array is not None else pa.array(values, type=stored_type,
+                                                                             from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            if not pa.types.is_string(stored_type):
+                logger.warning(f"column type changed from {stored_type} to {getattr(array, 'type', 'mixed')}")
+    if array is None or (stored_type is not None and pa.types.is_string(stored_type)):
+        # Last resort, the string the CSV used to hold
+        return pa.array([None if _is_missing(v) else str(v) for v in values], type=pa.string())
+    return array
+
+
+def _month(start_time):
+    return pd.to_datetime(start_time, unit='s').dt.strftime('%Y-%m')
+
+
+class MatchStore:
+    """
+    Explorer match rows in a parquet dataset partitioned by month of start_time: <root>/month=2025-01/<part>.parquet
+    Writes only add new part files, rows whose match_id is already stored are skipped.
+    Reads take a column list so scoring only loads the fields it needs.
+    """
+
+    def __init__(self, root):
+        if pa is None:
+            raise ImportError("MatchStore needs pyarrow, pip install pyarrow")
+        self.root = root
+
+    def months(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d[len(PARTITION_PREFIX):] for d in os.listdir(self.root) if d.startswith(PARTITION_PREFIX))
+
+    def _files(self, since=None):
+        since_month = None if since is None else pd.to_datetime(since, unit='s').strftime('%Y-%m')
+        for month in self.months():
+            # Partition pruning, whole months before `since` are never opened
+            if since_month is not None and month < since_month:
+                continue
+            month_dir = os.path.join(self.root, f'{PARTITION_PREFIX}{month}')
+            for name in sorted(os.listdir(month_dir)):
+                if name.endswith('.parquet'):
+                    yield os.path.join(month_dir, name)
+
+    def read(self, columns=None, since=None):
+        """
+        :param columns: columns to load, all columns when None
+        :param since: only rows with start_time >= since (unix seconds)
+        :return: DataFrame, nested columns hold python lists/dicts like the explorer API returns
+        """
+        read_cols = None if columns is None else list(dict.fromkeys(list(columns) + ['start_time']))
+        tables = []
+        for path in self._files(since):
+            available = pq.read_schema(path).names
+            cols = None if read_cols is None else [c for c in read_cols if c in available]
+            tables.append(pq.read_table(path, columns=cols))
+        if not tables:
+            return pd.DataFrame(columns=columns or [])
+        table = pa.concat_tables(tables, promote_options='permissive')
+        if since is not None:
+            table = table.filter(pc.greater_equal(table['start_time'], since))
+        df = table.to_pandas()
+        for name in table.column_names:
+            if pa.types.is_nested(table.schema.field(name).type):
+                df[name] = table[name].to_pylist()
+        return df if columns is None else df.reindex(columns=list(columns))
+
+    def schema(self):
+        # Union of the part file schemas, only reads the parquet footers
+        schemas = [pq.read_schema(path) for path in self._files()]
+        return pa.unify_schemas(schemas, promote_options='permissive') if schemas else pa.schema([])
+
+    def match_ids(self):
+        df = self.read(columns=['match_id'])
+        return set(df['match_id'].dropna().astype('int64'))
+
+    def max_start_time(self):
+        df = self.read(columns=['start_time'])
+        return None if df.empty else df['start_time'].max()
+
+    def append(self, df):
+        """
+        Add new matches, matches already in the store are skipped
+        :return: number of rows written
+        """
+        if df.empty:
+            return 0
+        df = df[df['start_time'].notna() & df['match_id'].notna()]
+        df = df.drop_duplicates('match_id')
+        df = df[~df['match_id'].astype('int64').isin(self.match_ids())]
+        if df.empty:
+            return 0
+        schema = self.schema()
+        stored_types = {name: schema.field(name).type for name in schema.names}
+        for month, df_month in df.groupby(_month(df['start_time'])):
+            table = pa.table({c: _to_arrow_column(df_month[c].tolist(), stored_types.get(c)) for c in df_month.columns})
+            month_dir = os.path.join(self.root, f'{PARTITION_PREFIX}{month}')
+            os.makedirs(month_dir, exist_ok=True)
+            pq.write_table(table, os.path.join(month_dir, f'{uuid.uuid4().hex}.parquet'))
+        logger.info(f"added {len(df)} matches to {self.root}")
+        return len(df)
+
+    def drop_before(self, timestamp):
+        # Removes whole months older than the month of `timestamp`
+        cutoff_month = pd.to_datetime(timestamp, unit='s').strftime('%Y-%m')
+        for month in self.months():
+            if month < cutoff_month:
+                shutil.rmtree(os.path.join(self.root, f'{PARTITION_PREFIX}{month}'))
+
+
+def import_csv_if_empty(store, csv_path, chunk_rows=CSV_IMPORT_CHUNK_ROWS):
+    """
+    One-off migration, fills an empty store from the CSV file it replaces so the old history isn't lost
+    :param store: MatchStore
+    :param csv_path: historic.csv or last_6_months.csv
+    :return: number of rows imported
+    """
+    if store.months() or not os.path.exists(csv_path):
+        return 0
+    logger.info(f"importing {csv_path} into {store.root}")
+    imported = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        imported += store.append(chunk)
+    logger.info(f"imported {imported} matches from {csv_path}")
+    return imported
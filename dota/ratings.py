@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import namedtuple
+from logging import getLogger
+
+from database import MatchRating
+
+logger = getLogger(__name__)
+
+# Ratings only change through /api/rate_match, which invalidates, so the TTL just bounds staleness across workers
+RATINGS_CACHE_TTL_SECONDS = 30
+# Expired entries are dropped once the cache grows past this
+RATINGS_CACHE_MAX_ENTRIES = 10000
+QUERY_CHUNK_SIZE = 500
+
+Rating = namedtuple("Rating", ["score", "title"])
+
+# match_id -> (expires_at, Rating or None), None caches "not rated"
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_ratings(db, match_ids):
+    """
+    Ratings for the given matches only, from the in-process cache or a WHERE match_id IN (...) query
+    :param db: SQLAlchemy session
+    :param match_ids: match ids of the page being returned
+    :return: dict of match_id (str) -> Rating, unrated matches are left out
+    """
+    match_ids = {str(m) for m in match_ids}
+    now = time.monotonic()
+    ratings = {}
+    missing = []
+    with _lock:
+        for match_id in match_ids:
+            entry = _cache.get(match_id)
+            if entry is not None and entry[0] > now:
+                if entry[1] is not None:
+                    ratings[match_id] = entry[1]
+            else:
+                missing.append(match_id)
+    if not missing:
+        return ratings
+
+    fetched = {}
+    for start in range(0, len(missing), QUERY_CHUNK_SIZE):
+        rows = (
+            db.query(MatchRating.match_id, MatchRating.score, MatchRating.title)
+            .filter(MatchRating.match_id.in_(missing[start:start + QUERY_CHUNK_SIZE]))
+            .all()
+        )
+        fetched.update({match_id: Rating(score, title) for match_id, score, title in rows})
+    expires_at = time.monotonic() + RATINGS_CACHE_TTL_SECONDS
+    with _lock:
+        if len(_cache) > RATINGS_CACHE_MAX_ENTRIES:
+            for key in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                del _cache[key]
+        for match_id in missing:
+            _cache[match_id] = (expires_at, fetched.get(match_id))
+    ratings.update(fetched)
+    return ratings
+
+
+def invalidate_ratings(match_id=None):
+    # Drop one match from the cache after its rating changed, or everything when match_id is None
+    with _lock:
+        if match_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(match_id), None)
@@ -6,6 +6,14 @@ from logging import getLogger
 logger = getLogger(__name__)
 
 
+def is_due(last_ran_date, run_every_x_hours, now=None):
+    """
+    :return: (will_run, delta_hours), delta_hours is rounded to 0.1 hours for logging, the check uses the seconds
+    """
+    delta_seconds = ((now or datetime.now()) - last_ran_date).total_seconds()
+    return delta_seconds > run_every_x_hours * 3600, round(delta_seconds / 3600, 1)
+
+
 class RunTracker:
     def __init__(self, filename):
         self.filename = filename
@@ -50,11 +58,7 @@ class RunTracker:
             self.update_file()
             logger.info(f'key not found, running {key}')
             return True
-        utc_now = datetime.now()
-        delta = utc_now - last_ran_date
-        delta_seconds = delta.days * 3600 * 24 + delta.seconds
-        delta_hours = round(delta_seconds / 3600, 1)
-        will_run = delta_hours > run_every_x_hours
+        will_run, delta_hours = is_due(last_ran_date, run_every_x_hours)
         if will_run:
             status = 'running'
             self.last_ran_dict[key] = datetime.now()
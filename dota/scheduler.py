@@ -0,0 +1,170 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import timedelta
+from logging import getLogger
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal, JobRun, utc_now
+from dota.run_tracker import is_due
+
+logger = getLogger(__name__)
+
+
+class ScheduledJob:
+    """
+    A job that runs at most every run_every_x_hours across all workers sharing the database.
+    The job_runs row is the lock: a worker takes it with a conditional UPDATE, which only one worker can win.
+    The lock is a lease, if a worker dies mid-run another one can take it once the lease expires.
+    """
+
+    def __init__(self, key, fn, run_every_x_hours, lease_seconds=30 * 60, session_factory=SessionLocal):
+        self.key = key
+        self.fn = fn
+        self.run_every_x_hours = run_every_x_hours
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+    def _get_row(self, session):
+        row = session.query(JobRun).filter(JobRun.key == self.key).first()
+        if row is not None:
+            return row
+        session.add(JobRun(key=self.key))
+        try:
+            session.commit()
+        except IntegrityError:
+            # Another worker created it first
+            session.rollback()
+        return session.query(JobRun).filter(JobRun.key == self.key).one()
+
+    def try_acquire(self, session, force=False, now=None):
+        """
+        Take the lock if the job is due (or force) and no other worker holds it
+        :return: True if this worker now holds the lock
+        """
+        now = now or utc_now()
+        row = self._get_row(session)
+        last_started_at = row.last_started_at
+        if not force and last_started_at is not None:
+            will_run, delta_hours = is_due(last_started_at, self.run_every_x_hours, now)
+            if not will_run:
+                logger.debug(f'last ran {delta_hours} hours ago, skipping {self.key}')
+                return False
+        # Compare-and-set on last_started_at, two workers that both saw the job as due can't both start it
+        started = JobRun.last_started_at.is_(None) if last_started_at is None \
+            else JobRun.last_started_at == last_started_at
+        acquired = (
+            session.query(JobRun)
+            .filter(JobRun.key == self.key, started,
+                    or_(JobRun.locked_until.is_(None), JobRun.locked_until < now))
+            .update({JobRun.locked_by: self.owner,
+                     JobRun.locked_until: now + timedelta(seconds=self.lease_seconds),
+                     JobRun.last_started_at: now},
+                    synchronize_session=False)
+        )
+        session.commit()
+        return acquired == 1
+
+    def release(self, session, duration_seconds, error=None):
+        session.query(JobRun).filter(JobRun.key == self.key, JobRun.locked_by == self.owner).update(
+            {JobRun.locked_by: None,
+             JobRun.locked_until: None,
+             JobRun.last_finished_at: utc_now(),
+             JobRun.last_duration_seconds: round(duration_seconds, 3),
+             JobRun.last_error: error},
+            synchronize_session=False)
+        session.commit()
+
+    def run(self, force=False):
+        """
+        Run the job if it is due and no other worker is running it
+        :param force: run even if the job ran recently, still skipped while another worker holds the lock
+            (see wait_until_idle)
+        :return: True if this call ran the job
+        """
+        session = self.session_factory()
+        try:
+            if not self.try_acquire(session, force):
+                return False
+            logger.info(f'running {self.key}')
+            start = time.monotonic()
+            error = None
+            try:
+                self.fn()
+            except Exception as e:
+                error = repr(e)
+                logger.exception(f'{self.key} failed')
+            finally:
+                self.release(session, time.monotonic() - start, error)
+            return True
+        finally:
+            session.close()
+
+    def watermark(self, session):
+        """
+        :return: (start_time, match_id) of the newest match the job has processed, (None, None) before its first run
+        """
+        row = self._get_row(session)
+        return row.watermark_start_time, row.watermark_match_id
+
+    def advance_watermark(self, session, start_time, match_id):
+        # Only ever moves forward, the caller commits
+        session.query(JobRun).filter(
+            JobRun.key == self.key,
+            or_(JobRun.watermark_start_time.is_(None), JobRun.watermark_start_time < start_time),
+        ).update({JobRun.watermark_start_time: int(start_time), JobRun.watermark_match_id: str(match_id)},
+                 synchronize_session=False)
+
+    def is_locked(self, now=None):
+        # True while a worker holds the lock and its lease hasn't expired
+        session = self.session_factory()
+        try:
+            locked_until = session.query(JobRun.locked_until).filter(JobRun.key == self.key).scalar()
+        finally:
+            session.close()
+        return locked_until is not None and locked_until > (now or utc_now())
+
+    def status(self, session):
+        row = session.query(JobRun).filter(JobRun.key == self.key).first()
+        if row is None:
+            return {"last_started_at": None, "last_finished_at": None, "last_duration_seconds": None,
+                    "last_error": None, "running": False, "watermark_start_time": None}
+        return {
+            "last_started_at": row.last_started_at.isoformat() if row.last_started_at else None,
+            "last_finished_at": row.last_finished_at.isoformat() if row.last_finished_at else None,
+            "last_duration_seconds": row.last_duration_seconds,
+            "last_error": row.last_error,
+            "running": row.locked_until is not None and row.locked_until > utc_now(),
+            "watermark_start_time": row.watermark_start_time,
+        }
+
+
+async def run_periodically(job, run_blocking, check_every_seconds):
+    """
+    Check every check_every_seconds whether the job is due, until cancelled
+    :param run_blocking: coroutine function running a blocking callable off the event loop
+    """
+    while True:
+        try:
+            await run_blocking(job.run)
+        except Exception:
+            logger.exception(f'could not run {job.key}')
+        await asyncio.sleep(check_every_seconds)
+
+
+async def wait_until_idle(job, run_blocking, timeout_seconds, poll_seconds=1.0):
+    """
+    Wait for the worker holding the job's lock to finish
+    :param run_blocking: coroutine function running a blocking callable off the event loop
+    :return: True if the lock was free or got released within timeout_seconds
+    """
+    deadline = time.monotonic() + timeout_seconds
+    while await run_blocking(job.is_locked):
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll_seconds)
+    return True
@@ -1,4 +1,21 @@
-from scipy.interpolate import interp1d
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+def clamped_linear(x, l, h, nl=0, nh=1, below=None, above=None):
+    """
+    Piecewise-linear transform in one pass over a NumPy array: [l, h] maps linearly onto [nl, nh],
+    values under l become `below` and values over h become `above` (by default clamped to nl and nh).
+    NaN stays NaN.
+    :param x: array-like of numbers
+    :return: float64 array
+    """
+    x = np.asarray(x, dtype=float)
+    y = nl + (x - l) * ((nh - nl) / (h - l))
+    y = np.where(x < l, nl if below is None else below, y)
+    return np.where(x > h, nh if above is None else above, y)
 
 
 class MultiStep:
@@ -56,27 +73,20 @@ class Map:
 
     def apply(self, df, cols):
         # df[cols] = df[cols].copy()
-        m = interp1d([self.l, self.h], [self.nl, self.nh])
         rows = (df[cols] >= self.l) & (df[cols] <= self.h)
-        df.loc[rows, cols] = m(df.loc[rows, cols])
+        df.loc[rows, cols] = clamped_linear(df.loc[rows, cols], self.l, self.h, self.nl, self.nh)
         return df
 
 
 class LinearMap:
-    class Range:
-        def __init__(self, l, h, nl, nh):
-            self.l = l
-            self.h = h
-            self.nl = nl
-            self.nh = nh
+    Range = namedtuple('Range', ['l', 'h', 'nl', 'nh'])
 
     @staticmethod
     def apply(df, col, new_col, ranges):
         # def apply(df, col, new_col, l, h, nl=0, nh=1):
         for range in ranges:
-            m = interp1d([range.l, range.h], [range.nl, range.nh])
             rows = (df[col] >= range.l) & (df[col] <= range.h)
-            df.loc[rows, new_col] = m(df.loc[rows, col])
+            df.loc[rows, new_col] = clamped_linear(df.loc[rows, col], range.l, range.h, range.nl, range.nh)
         return df
 
 
@@ -91,7 +101,140 @@ def linear_map(df, col, new_col, l, h, nl=0, nh=1):
     :param nh: New High
     :return:
     """
-    m = interp1d([l, h], [nl, nh])
+    # Only rows inside [l, h] are written, use clamped_linear to also map the rows outside it
     rows = (df[col] >= l) & (df[col] <= h)
-    df.loc[rows, new_col] = m(df.loc[rows, col])
-    return df
\ No newline at end of file
+    df.loc[rows, new_col] = clamped_linear(df.loc[rows, col], l, h, nl, nh)
+    return df
+
+
+# Declarative score spec: an ordered list of (name, node) pairs, compiled into a ScoreEvaluator by compile_scores.
+# Nodes read input columns, or scores declared before them, by name. Names starting with _ aren't written out.
+# Linear maps of LinearMap.Range's, values under the first range become below and over the last one above (default nl and nh)
+Linear = namedtuple('Linear', ['col', 'ranges', 'below', 'above', 'decimals'], defaults=(None, None, 2))
+# value of the first (col, upper, value) condition where col < upper, default when none match
+Select = namedtuple('Select', ['conditions', 'default', 'decimals'], defaults=(0.0, 2))
+# Row-wise max/min skipping NaN, the OR/AND of scores
+Max = namedtuple('Max', ['cols', 'decimals'], defaults=(None,))
+Min = namedtuple('Min', ['cols', 'decimals'], defaults=(None,))
+# 1 if the cols add up to more than 0
+AnyPositive = namedtuple('AnyPositive', ['cols', 'decimals'], defaults=(None,))
+# sum(weight * col) / divisor * factor, NaN counts as 0
+Weighted = namedtuple('Weighted', ['weights', 'divisor', 'factor', 'decimals'], defaults=(1, 1, None))
+# col, with the rows where flag is set replaced by value or multiplied by factor
+Override = namedtuple('Override', ['col', 'flag', 'value', 'factor'], defaults=(None, None))
+
+
+def _linear(node, get):
+    x = get(node.col)
+    y = np.full(x.shape, np.nan)
+    for r in node.ranges:
+        rows = (x >= r.l) & (x <= r.h)
+        y[rows] = clamped_linear(x[rows], r.l, r.h, r.nl, r.nh)
+    first, last = node.ranges[0], node.ranges[-1]
+    y[x < first.l] = first.nl if node.below is None else node.below
+    y[x > last.h] = last.nh if node.above is None else node.above
+    return y
+
+
+def _select(node, get):
+    return np.select([get(col) < upper for col, upper, _ in node.conditions],
+                     [value for _, _, value in node.conditions], default=node.default)
+
+
+def _max(node, get):
+    return np.fmax.reduce([get(col) for col in node.cols])
+
+
+def _min(node, get):
+    return np.fmin.reduce([get(col) for col in node.cols])
+
+
+def _any_positive(node, get):
+    return (sum(get(col) for col in node.cols) > 0).astype(float)
+
+
+def _weighted(node, get):
+    total = sum(weight * np.nan_to_num(get(col)) for col, weight in node.weights.items())
+    return total / node.divisor * node.factor
+
+
+def _override(node, get):
+    y = get(node.col).copy()
+    rows = get(node.flag) > 0
+    if node.value is not None:
+        y[rows] = node.value
+    if node.factor is not None:
+        y[rows] *= node.factor
+    return y
+
+
+_NODES = {
+    Linear: (_linear, lambda node: [node.col]),
+    Select: (_select, lambda node: [col for col, _, _ in node.conditions]),
+    Max: (_max, lambda node: list(node.cols)),
+    Min: (_min, lambda node: list(node.cols)),
+    AnyPositive: (_any_positive, lambda node: list(node.cols)),
+    Weighted: (_weighted, lambda node: list(node.weights)),
+    Override: (_override, lambda node: [node.col, node.flag]),
+}
+
+
+class ScoreEvaluator:
+    def __init__(self, spec):
+        self.spec = list(spec)
+        self.names = list(dict.fromkeys(name for name, _ in self.spec))
+        self.outputs = [name for name in self.names if not name.startswith('_')]
+        self._index = {name: n for n, name in enumerate(self.names)}
+        self._steps = []
+        declared = set()
+        for name, node in self.spec:
+            if type(node) not in _NODES:
+                raise TypeError(f"{name}: unknown score node {node!r}")
+            fn, node_inputs = _NODES[type(node)]
+            # A score read before it is declared would silently come from the input frame instead
+            late = [col for col in node_inputs(node) if col in self._index and col not in declared]
+            if late:
+                raise ValueError(f"{name} reads {late} before they are declared")
+            declared.add(name)
+            self._steps.append((self._index[name], fn, node, getattr(node, 'decimals', None)))
+
+    def evaluate(self, df, **inputs):
+        """
+        Compute every score of the spec in one pass over preallocated float columns
+        :param df: frame holding the input columns
+        :param inputs: extra input arrays by name, e.g. flags that aren't columns of df
+        :return: float64 array of shape (len(df), len(self.names))
+        """
+        out = np.full((len(df), len(self.names)), np.nan)
+        columns = {}
+        done = set()
+
+        def get(name):
+            if name in done:
+                return out[:, self._index[name]]
+            if name not in columns:
+                values = pd.to_numeric(pd.Series(inputs[name] if name in inputs else df[name]), errors='coerce')
+                columns[name] = values.to_numpy(dtype=float, na_value=np.nan)
+            return columns[name]
+
+        for n, fn, node, decimals in self._steps:
+            y = fn(node, get)
+            out[:, n] = y if decimals is None else np.round(y, decimals)
+            done.add(self.names[n])
+        return out
+
+    def apply(self, df, **inputs):
+        """
+        :return: df with the output scores written as columns
+        """
+        out = self.evaluate(df, **inputs)
+        df[self.outputs] = out[:, [self._index[name] for name in self.outputs]]
+        return df
+
+
+def compile_scores(spec):
+    """
+    :param spec: list of (score name, node), a name can be declared again to post-process it (see Override)
+    :return: ScoreEvaluator
+    """
+    return ScoreEvaluator(spec)
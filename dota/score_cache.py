@@ -0,0 +1,153 @@
+import hashlib
+import json
+from logging import getLogger
+
+import pandas as pd
+
+from constants import FINAL_SCORE_COLS, FINAL_SCORE_WEIGHTS, TEAMS_I_LIKE, WHOLE_GAME_SCORE_COLS, SCORING_VERSION, \
+    STATISTICS_CACHE_COLS
+from database import MatchStatistics, bulk_upsert
+from dota.calculate_scores import STATISTICS_SCORES, calculate_recency_scores
+from dota.match_frame import compact_match_frame
+from dota.utils import time_ago
+
+logger = getLogger(__name__)
+
+# Keep IN (...) lists well below the SQLite variable limit
+QUERY_CHUNK_SIZE = 500
+# Explorer columns that stay empty until OpenDota has parsed the replay, statistics of such matches aren't cached so
+# they are calculated again once the replay is parsed
+REPLAY_COLS = ['radiant_gold_adv', 'teamfights', 'objectives']
+
+
+def scoring_config_hash():
+    # Any change to the scoring constants or the statistics score spec invalidates every cached row
+    # Note: team ranks aren't part of the hash, cached rows keep the ranks they were scored with
+    config = {
+        'version': SCORING_VERSION,
+        'final_score_cols': FINAL_SCORE_COLS,
+        'final_score_weights': FINAL_SCORE_WEIGHTS,
+        'whole_game_score_cols': WHOLE_GAME_SCORE_COLS,
+        'teams_i_like': TEAMS_I_LIKE,
+        'cached_cols': STATISTICS_CACHE_COLS,
+        'statistics_scores': STATISTICS_SCORES,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def _query_chunked(db, columns, match_ids, config_hash):
+    match_ids = list({str(m) for m in match_ids})
+    rows = []
+    for start in range(0, len(match_ids), QUERY_CHUNK_SIZE):
+        rows += (
+            db.query(*columns)
+            .filter(MatchStatistics.config_hash == config_hash)
+            .filter(MatchStatistics.match_id.in_(match_ids[start:start + QUERY_CHUNK_SIZE]))
+            .all()
+        )
+    return rows
+
+
+def load_match_statistics(db, match_ids, config_hash=None):
+    """
+    :param db: SQLAlchemy session
+    :param match_ids: match ids to look up
+    :param config_hash: defaults to the current scoring config
+    :return: dict of match_id (str) -> cached statistics dict
+    """
+    config_hash = config_hash or scoring_config_hash()
+    rows = _query_chunked(db, [MatchStatistics.match_id, MatchStatistics.statistics], match_ids, config_hash)
+    return {match_id: json.loads(statistics) for match_id, statistics in rows}
+
+
+def statistics_cached_ids(db, match_ids, config_hash=None):
+    """
+    :return: set of the match ids (str) that have statistics cached for the scoring config
+    """
+    config_hash = config_hash or scoring_config_hash()
+    return {match_id for (match_id,) in _query_chunked(db, [MatchStatistics.match_id], match_ids, config_hash)}
+
+
+def split_cached_matches(db, df, now=None):
+    """
+    Split a cleaned explorer frame into matches that already have cached statistics and matches that still need
+    calculate_all_game_statistics + calculate_statistics_scores.
+    Cached matches come back with their statistics filled in and recency scores recalculated.
+    :param now: reference time of days_ago, the same one the new matches are scored with
+    :return: (df_cached, df_new)
+    """
+    match_ids = df['match_id'].astype(str)
+    cached = load_match_statistics(db, match_ids)
+    is_cached = match_ids.isin(cached.keys())
+    df_new = df[~is_cached].copy()
+    df_cached = df[is_cached].copy()
+    if df_cached.empty:
+        return df_cached, df_new
+    df_cached = df_cached.rename(columns={"name": "tournament"})
+    df_stats = pd.DataFrame([cached[m] for m in match_ids[is_cached]], index=df_cached.index)
+    df_cached[df_stats.columns] = df_stats
+    df_cached['days_ago'] = time_ago(df_cached['date'], now)[0]
+    df_cached = calculate_recency_scores(df_cached)
+    logger.info(f"{len(df_cached)} matches loaded from statistics cache, {len(df_new)} to calculate")
+    return df_cached, df_new
+
+
+def _has_replay_value(v):
+    if isinstance(v, (list, dict)):
+        return len(v) > 0
+    if isinstance(v, str):
+        return v.strip() not in ('', '[]', '{}', 'null')
+    return v is not None and not pd.isna(v)
+
+
+def replay_parsed(df):
+    """
+    :return: bool Series, True for matches that have all of REPLAY_COLS
+    """
+    parsed = pd.Series(True, index=df.index)
+    for col in REPLAY_COLS:
+        if col not in df.columns:
+            return pd.Series(False, index=df.index)
+        parsed &= df[col].map(_has_replay_value).astype(bool)
+    return parsed
+
+
+def save_match_statistics(db, df):
+    """
+    Store the time independent statistics of freshly scored matches, matches whose replay isn't parsed yet are
+    skipped so they get scored again with the replay data
+    :param db: SQLAlchemy session, committed here
+    :param df: output of calculate_statistics_scores
+    :return: number of rows stored
+    """
+    if df.empty:
+        return 0
+    config_hash = scoring_config_hash()
+    df = df.drop_duplicates('match_id')
+    parsed = replay_parsed(df)
+    if not parsed.all():
+        logger.info(f"not caching statistics of {(~parsed).sum()} matches without a parsed replay")
+        df = df[parsed]
+    # Matches rescored only because a new game of their series came in are already cached
+    already_cached = {m for (m,) in _query_chunked(db, [MatchStatistics.match_id], df['match_id'], config_hash)}
+    df = df[~df['match_id'].astype(str).isin(already_cached)]
+    if df.empty:
+        return 0
+    cols = [c for c in STATISTICS_CACHE_COLS if c in df.columns]
+    records = json.loads(df[cols].to_json(orient='records'))
+    # Upsert, another worker may have cached the same matches in the meantime
+    saved = bulk_upsert(db, MatchStatistics, [
+        {'match_id': match_id, 'config_hash': config_hash, 'statistics': json.dumps(record)}
+        for match_id, record in zip(df['match_id'], records)
+    ], conflict_cols=('match_id', 'config_hash'))
+    db.commit()
+    return saved
+
+
+def merge_cached_matches(df_cached, df_new):
+    if df_cached.empty:
+        return df_new
+    if df_new.empty:
+        return compact_match_frame(df_cached)
+    # Categories of the two frames differ, concat falls back to object columns
+    return compact_match_frame(pd.concat([df_cached, df_new], ignore_index=True))
@@ -0,0 +1,70 @@
+from logging import getLogger
+
+import pandas as pd
+
+from database import SeriesGame, bulk_upsert
+
+logger = getLogger(__name__)
+
+QUERY_CHUNK_SIZE = 500
+# OpenDota series_type -> number of games
+BEST_OF = {0: 1, 1: 3, 2: 5}
+
+
+def _series_games(df):
+    # (match_id, series_id, series_type, start_time) of the games of df that are part of a series
+    if not {'series_id', 'start_time'} <= set(df.columns):
+        return pd.DataFrame(columns=['match_id', 'series_id', 'series_type', 'start_time'])
+    games = pd.DataFrame({
+        'match_id': df['match_id'].astype(str),
+        'series_id': pd.to_numeric(df['series_id'], errors='coerce'),
+        'series_type': df['series_type'] if 'series_type' in df.columns else None,
+        'start_time': pd.to_numeric(df['start_time'], errors='coerce'),
+    })
+    return games[games['series_id'].notna() & (games['series_id'] != 0)].drop_duplicates('match_id')
+
+
+def index_series_games(db, df):
+    """
+    Add the series games of a cleaned explorer frame to the series index and number the games of their series,
+    only the series in df are read and ranked.
+    :param db: SQLAlchemy session, committed here
+    :return: DataFrame indexed by match_id (str) with game_num and best_of of every indexed game of those series
+    """
+    games = _series_games(df)
+    if games.empty:
+        return pd.DataFrame(columns=['game_num', 'best_of'])
+    bulk_upsert(db, SeriesGame, games.to_dict('records'))
+    db.commit()
+
+    series_ids = [int(s) for s in games['series_id'].unique()]
+    rows = []
+    for start in range(0, len(series_ids), QUERY_CHUNK_SIZE):
+        rows += (
+            db.query(SeriesGame.match_id, SeriesGame.series_id, SeriesGame.series_type, SeriesGame.start_time)
+            .filter(SeriesGame.series_id.in_(series_ids[start:start + QUERY_CHUNK_SIZE]))
+            .all()
+        )
+    indexed = pd.DataFrame(rows, columns=['match_id', 'series_id', 'series_type', 'start_time'])
+    indexed['game_num'] = indexed.groupby('series_id')['start_time'].rank('min')
+    indexed['best_of'] = indexed.groupby('series_id')['series_type'].transform('max').map(BEST_OF)
+    return indexed.set_index('match_id')[['game_num', 'best_of']]
+
+
+def apply_game_numbers(df, numbers):
+    """
+    :param numbers: output of index_series_games
+    :return: df with game_num and best_of taken from the series index where it has them
+    """
+    if df.empty or numbers.empty:
+        return df
+    match_ids = df['match_id'].astype(str)
+    for col in ['game_num', 'best_of']:
+        indexed = match_ids.map(numbers[col])
+        df[col] = indexed.fillna(df[col]) if col in df.columns else indexed
+    return df
+
+
+def prune_series_games(db, cutoff):
+    # Drop games that started before cutoff (unix seconds), the caller commits
+    return db.query(SeriesGame).filter(SeriesGame.start_time < cutoff).delete(synchronize_session=False)
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+from logging import getLogger
+
+import pandas as pd
+
+from database import SessionLocal, Team, bulk_upsert, utc_now
+from dota.api import get_team_names_and_ranks_from_api
+
+logger = getLogger(__name__)
+
+# Team ranks move slowly, older teams are still served while they are refreshed in the background
+TEAMS_TTL_HOURS = 6
+# Wait this long before calling the teams endpoint again after a failed refresh
+TEAMS_RETRY_SECONDS = 300
+
+TeamInfo = namedtuple("TeamInfo", ["name", "rank"])
+
+# team_id -> TeamInfo, and when the teams endpoint was called for them
+_teams = {}
+_fetched_at = None
+_lock = threading.Lock()
+# Held while a background refresh runs, one per process
+_refreshing = threading.Lock()
+_retry_after = 0.0
+
+
+def teams_from_df(df_teams):
+    """
+    :param df_teams: output of get_team_names_and_ranks_from_api, rank is the position in the API response
+    :return: dict of team_id -> TeamInfo
+    """
+    ranks = df_teams.index + 1
+    return {int(team_id): TeamInfo(name, int(rank))
+            for team_id, name, rank in zip(df_teams['team_id'], df_teams['name'], ranks)}
+
+
+def _is_stale(fetched_at, now=None):
+    now = now or utc_now()
+    return fetched_at is None or now - fetched_at > timedelta(hours=TEAMS_TTL_HOURS)
+
+
+def _set_teams(teams, fetched_at):
+    global _teams, _fetched_at
+    with _lock:
+        _teams, _fetched_at = teams, fetched_at
+    return teams, fetched_at
+
+
+def load_teams(session_factory=SessionLocal):
+    # Read the registry table into memory, another worker may have refreshed it
+    db = session_factory()
+    try:
+        rows = db.query(Team.team_id, Team.name, Team.rank, Team.updated_at).all()
+    finally:
+        db.close()
+    teams = {team_id: TeamInfo(name, rank) for team_id, name, rank, _ in rows}
+    fetched_at = max((updated_at for *_, updated_at in rows if updated_at is not None), default=None)
+    return _set_teams(teams, fetched_at)
+
+
+def refresh_teams(session_factory=SessionLocal):
+    """
+    Fetch the teams endpoint and replace the registry table with it, blocking
+    :return: dict of team_id -> TeamInfo
+    """
+    df_teams = get_team_names_and_ranks_from_api()
+    teams = teams_from_df(df_teams)
+    now = utc_now()
+    db = session_factory()
+    try:
+        bulk_upsert(db, Team, [
+            {'team_id': team_id, 'name': name, 'rating': rating, 'rank': teams[int(team_id)].rank, 'updated_at': now}
+            for team_id, name, rating in zip(df_teams['team_id'], df_teams['name'], df_teams['rating'])
+        ], conflict_cols=('team_id',))
+        # Teams no longer returned by the endpoint would keep their old rank
+        db.query(Team).filter(Team.updated_at < now).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    logger.info(f"team registry refreshed, {len(teams)} teams")
+    return _set_teams(teams, now)[0]
+
+
+def _refresh_in_background(session_factory):
+    global _retry_after
+    if time.monotonic() < _retry_after or not _refreshing.acquire(blocking=False):
+        return None
+
+    def run():
+        global _retry_after
+        try:
+            _, fetched_at = load_teams(session_factory)
+            if _is_stale(fetched_at):
+                refresh_teams(session_factory)
+        except Exception:
+            _retry_after = time.monotonic() + TEAMS_RETRY_SECONDS
+            logger.exception("refreshing the team registry failed, keeping the stale teams")
+        finally:
+            _refreshing.release()
+
+    thread = threading.Thread(target=run, name="refresh-teams", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_teams(session_factory=SessionLocal):
+    """
+    Team names and ranks for scoring. Only blocks on the teams endpoint while the registry is still empty,
+    stale teams are returned while a background thread refreshes them.
+    :return: dict of team_id -> TeamInfo
+    """
+    with _lock:
+        teams, fetched_at = _teams, _fetched_at
+    if not teams:
+        teams, fetched_at = load_teams(session_factory)
+        if not teams:
+            return refresh_teams(session_factory)
+    if _is_stale(fetched_at):
+        _refresh_in_background(session_factory)
+    return teams
+
+
+def teams_frame(teams):
+    # team_id indexed name and rank columns, for Series.map lookups
+    return pd.DataFrame.from_dict(teams, orient='index', columns=list(TeamInfo._fields))
+
+
+def invalidate_teams():
+    # Forget the in-memory teams, the next get_teams reads the registry table again
+    global _retry_after
+    _retry_after = 0.0
+    _set_teams({}, None)
@@ -2,6 +2,7 @@ import json
 from datetime import datetime
 from logging import getLogger
 
+import numpy as np
 import pandas as pd
 
 pd.options.display.width = 0
@@ -106,22 +107,22 @@ def update_df_watched():
     df_watched['times_watched'] = df_watched['times_watched'].fillna(1)
     df_watched.to_csv(ALREADY_WATCHED_FILE, index=False, header=True)
 
-def format_days_ago_pretty(days_ago, date_val):
-    try:
-        days = abs(float(days_ago))
-    except Exception:
-        return None
-    if days < 1:
-        try:
-            delta_hours = int(max(1, round(abs((datetime.now() - date_val).total_seconds()) / 3600)))
-        except Exception:
-            delta_hours = 0
-        return f"{delta_hours} hour{'s' if delta_hours != 1 else ''} ago" if delta_hours else "today"
-    if days < 7:
-        d = int(round(days))
-        return f"{d} day{'s' if d != 1 else ''} ago"
-    if days < 30:
-        weeks = int(round(days / 7))
-        return f"{weeks} week{'s' if weeks != 1 else ''} ago"
-    months = int(round(days / 30))
-    return f"{months} month{'s' if months != 1 else ''} ago"
+def time_ago(dates, now=None):
+    """
+    Bucket dates relative to one reference time, e.g. '5 hours ago', '3 days ago', '2 weeks ago', '4 months ago'
+    :param dates: datetime-like Series
+    :param now: reference time, defaults to datetime.now() once for all rows
+    :return: (days_ago, pretty) Series, days_ago is (date - now).days (negative for the past), pretty is None for NaT
+    """
+    now = pd.Timestamp(now or datetime.now())
+    delta = pd.to_datetime(pd.Series(dates)) - now
+    days_ago = delta.dt.days
+    days = days_ago.abs().to_numpy(dtype=float, na_value=np.nan)
+    missing = np.isnan(days)
+    days = np.where(missing, 0, days)
+    hours = np.maximum(1, np.round(np.abs(delta.dt.total_seconds().fillna(0).to_numpy()) / 3600))
+    buckets = [days < 1, days < 7, days < 30]
+    count = np.select(buckets, [hours, np.round(days), np.round(days / 7)], np.round(days / 30)).astype(int)
+    unit = np.select(buckets, ['hour', 'day', 'week'], 'month')
+    pretty = (pd.Series(count, index=delta.index).astype(str) + ' ' + unit + np.where(count != 1, 's', '') + ' ago')
+    return days_ago, pretty.astype(object).where(~missing, None)
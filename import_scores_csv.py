@@ -1,11 +1,14 @@
 import os
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from database import engine, SessionLocal, CachedMatch
-from dota.utils import format_days_ago_pretty
+from constants import FINAL_SCORE_WEIGHTS
+from database import engine, SessionLocal, CachedMatch, bulk_upsert
+from dota.calculate_scores import calculate_recency_scores, calculate_static_score
+from dota.utils import time_ago
 
 load_dotenv()
 
@@ -20,6 +23,38 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
 	return df
 
 
+def add_start_time_and_static_score(df: pd.DataFrame) -> pd.DataFrame:
+	# The refresh prunes cached rows without a start_time, the rescore job ages final_score from static_score
+	if 'start_time' in df.columns:
+		df['start_time'] = pd.to_numeric(df['start_time'], errors='coerce')
+	elif 'date' in df.columns:
+		df['start_time'] = (df['date'] - pd.Timestamp(0)).dt.total_seconds()
+	else:
+		df['start_time'] = np.nan
+	missing = df['start_time'].isna()
+	if missing.any():
+		print(f"Warning: skipping {int(missing.sum())} rows without a start_time")
+	df = df[~missing].copy()
+	df['start_time'] = df['start_time'].astype('int64')
+	if 'days_ago' not in df.columns:
+		df['days_ago'] = time_ago(pd.to_datetime(df['start_time'], unit='s'))[0]
+
+	# static_score is final_score without the recency part it had when the csv was written
+	if 'final_score_total' in df.columns:
+		df['final_score_total'] = pd.to_numeric(df['final_score_total'], errors='coerce')
+	else:
+		# Undo the scaling of final_score, see rescore_recency
+		final_score = pd.to_numeric(df['final_score'], errors='coerce') if 'final_score' in df.columns else np.nan
+		df['final_score_total'] = final_score / 100 * sum(FINAL_SCORE_WEIGHTS.values())
+	if 'days_ago_score' in df.columns:
+		df['days_ago_score'] = pd.to_numeric(df['days_ago_score'], errors='coerce')
+	else:
+		# The csv files have days_ago with either sign, both count back
+		recency = pd.DataFrame({'days_ago': -pd.to_numeric(df['days_ago'], errors='coerce').abs()}, index=df.index)
+		df['days_ago_score'] = calculate_recency_scores(recency)['days_ago_score']
+	return calculate_static_score(df)
+
+
 def import_csv(csv_path: str, days_limit: int):
 	print(f"Loading CSV from {csv_path} ...")
 	df = pd.read_csv(csv_path, low_memory=False)
@@ -35,7 +70,8 @@ def import_csv(csv_path: str, days_limit: int):
 	if 'days_ago' in df.columns:
 		try:
 			df['days_ago'] = pd.to_numeric(df['days_ago'], errors='coerce')
-			df = df[(df['days_ago'] >= 0) & (df['days_ago'] <= days_limit)]
+			# Either sign, both count back from when the csv was written
+			df = df[df['days_ago'].abs() <= days_limit]
 		except Exception:
 			pass
 	elif 'date' in df.columns:
@@ -45,14 +81,22 @@ def import_csv(csv_path: str, days_limit: int):
 		except Exception:
 			pass
 
+	df = add_start_time_and_static_score(df)
+
 	# Compute pretty days-ago
 	if 'days_ago_pretty' not in df.columns:
-		df['days_ago_pretty'] = df.apply(lambda r: format_days_ago_pretty(r.get('days_ago'), r.get('date')), axis=1)
+		now = datetime.now()
+		if 'date' in df.columns:
+			dates = pd.to_datetime(df['date'], errors='coerce')
+		else:
+			# The csv files have days_ago with either sign, both count back from now
+			dates = now - pd.to_timedelta(pd.to_numeric(df['days_ago'], errors='coerce').abs(), unit='D')
+		df['days_ago_pretty'] = time_ago(dates, now)[1]
 
 	# Select columns we care about
 	cols = [
-		'match_id', 'title', 'final_score', 'days_ago', 'days_ago_pretty', 'tournament',
-		'radiant_team_name', 'dire_team_name', 'duration_min'
+		'match_id', 'title', 'start_time', 'final_score', 'static_score', 'days_ago', 'days_ago_pretty',
+		'tournament', 'radiant_team_name', 'dire_team_name', 'duration_min'
 	]
 	missing = [c for c in cols if c not in df.columns]
 	if missing:
@@ -74,37 +118,10 @@ def import_csv(csv_path: str, days_limit: int):
 	except Exception:
 		pass
 
-	# Upsert into database
+	# Upsert into database, one INSERT ... ON CONFLICT per chunk of rows
 	session: Session = SessionLocal()
-	upserted = 0
 	try:
-		for _, row in df_small.iterrows():
-			mid = str(row['match_id']) if pd.notna(row['match_id']) else None
-			if not mid:
-				continue
-			existing = session.query(CachedMatch).filter(CachedMatch.match_id == mid).first()
-			if existing:
-				existing.title = row['title'] if pd.notna(row['title']) else existing.title
-				existing.final_score = row['final_score'] if pd.notna(row['final_score']) else existing.final_score
-				existing.days_ago = row['days_ago'] if pd.notna(row['days_ago']) else existing.days_ago
-				existing.days_ago_pretty = row['days_ago_pretty'] if pd.notna(row['days_ago_pretty']) else existing.days_ago_pretty
-				existing.tournament = row['tournament'] if pd.notna(row['tournament']) else existing.tournament
-				existing.radiant_team_name = row['radiant_team_name'] if pd.notna(row['radiant_team_name']) else existing.radiant_team_name
-				existing.dire_team_name = row['dire_team_name'] if pd.notna(row['dire_team_name']) else existing.dire_team_name
-				existing.duration_min = int(row['duration_min']) if pd.notna(row['duration_min']) else existing.duration_min
-			else:
-				session.add(CachedMatch(
-					match_id=mid,
-					title=row['title'] if pd.notna(row['title']) else None,
-					final_score=row['final_score'] if pd.notna(row['final_score']) else None,
-					days_ago=row['days_ago'] if pd.notna(row['days_ago']) else None,
-					days_ago_pretty=row['days_ago_pretty'] if pd.notna(row['days_ago_pretty']) else None,
-					tournament=row['tournament'] if pd.notna(row['tournament']) else None,
-					radiant_team_name=row['radiant_team_name'] if pd.notna(row['radiant_team_name']) else None,
-					dire_team_name=row['dire_team_name'] if pd.notna(row['dire_team_name']) else None,
-					duration_min=int(row['duration_min']) if pd.notna(row['duration_min']) else None,
-				))
-			upserted += 1
+		upserted = bulk_upsert(session, CachedMatch, df_small.to_dict('records'))
 		session.commit()
 	except Exception as e:
 		session.rollback()
@@ -1,7 +1,10 @@
+import time
+
 import pandas as pd
-import requests
 
-from constants import LAST_RUN_FILE, HISTORIC_FILE
+from constants_old import LAST_RUN_FILE, HISTORIC_FILE, HISTORIC_STORE_DIR
+from dota.api import PRO_MATCHES, explorer_query, fetch_dota_data_from_api
+from dota.match_store import MatchStore, import_csv_if_empty
 from dota.run_tracker import RunTracker
 
 run_tracker = RunTracker(LAST_RUN_FILE)
@@ -11,37 +14,35 @@ run_tracker = RunTracker(LAST_RUN_FILE)
 # Well...Could subtract the times from the previous times and find the largest time gap
 have_these_games_time = 1765736521
 
-df = pd.read_csv(HISTORIC_FILE)
-min_start_time = df[df['start_time'] > have_these_games_time]["start_time"].min()
-print(f"start time is {int(min_start_time)}")
+
+def earliest_stored_start_time(store):
+    # Oldest match after have_these_games_time, now when there isn't one yet so the whole gap is fetched
+    df = store.read(columns=['start_time'], since=have_these_games_time)
+    min_start_time = df[df['start_time'] > have_these_games_time]["start_time"].min()
+    return int(time.time()) if pd.isna(min_start_time) else int(min_start_time)
+
+
+store = MatchStore(HISTORIC_STORE_DIR)
+import_csv_if_empty(store, HISTORIC_FILE)
+min_start_time = earliest_stored_start_time(store)
+print(f"start time is {min_start_time}")
 while min_start_time > have_these_games_time:
     # the while loop doesn't exist because the min start time was already specified
-    sql_query = f"""SELECT * 
-        FROM matches
-        JOIN leagues using(leagueid)
-        WHERE name not like '%Division II%'
-        AND leagues.TIER in ('professional','premium') 
-        AND start_time < {int(min_start_time)}
-        AND start_time > {have_these_games_time}
-        ORDER BY matches.start_time DESC
-        LIMIT 4000"""
+    sql_query = explorer_query(PRO_MATCHES + [f"matches.start_time < {min_start_time}",
+                                              f"matches.start_time > {have_these_games_time}"], limit=4000)
     update_data = True
     if update_data:
         pass
     try:
-        url = f"""https://api.opendota.com/api/explorer?sql={sql_query}"""
-        r = requests.get(url, timeout=45)
-        if r.status_code != 200:
-            print(r.text)
+        # Not trimmed to the fields scoring reads, the store keeps the nested columns whole
+        df_new = fetch_dota_data_from_api(sql_query, nested_fields={})
     except ConnectionError:
         # if there's a timeout
         continue
-    matches = r.json()['rows']
-    df_new = pd.DataFrame(matches)
-    df_raw = pd.read_csv(HISTORIC_FILE)
-    df = pd.concat([df_new, df_raw])
-    df = df.drop_duplicates('match_id')
-    df.to_csv(HISTORIC_FILE, index=False, header=True)
-    min_start_time = df[df['start_time'] > 1721937466]["start_time"].min()
-    print(f"start time is {int(min_start_time)}")
+    if df_new.empty:
+        # Nothing left between have_these_games_time and the oldest stored match
+        break
+    store.append(df_new)
+    min_start_time = earliest_stored_start_time(store)
+    print(f"start time is {min_start_time}")
 print("finished")
@@ -27,7 +27,7 @@ def test_api_matches_happy_path(monkeypatch):
     df = pd.DataFrame([
         {
             "match_id": 123456,
-            "title": "Radiant vs Dire",
+            "game_num": 1,
             "days_ago": 0.5,
             "date": now - dt.timedelta(hours=12),
             # Inputs used to compute 'interesting_score'
@@ -52,7 +52,7 @@ def test_api_matches_happy_path(monkeypatch):
     # Patch heavy functions to make the pipeline a pass-through
     monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda: df)
     monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
-    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", lambda d, now=None: d)
     monkeypatch.setattr(app_mod, "calculate_statistics_scores", lambda d: d)
 
     resp = client.get("/api/matches")
@@ -64,7 +64,7 @@ def test_api_matches_happy_path(monkeypatch):
     item = data[0]
     # Persisted match_id is stored as string in the DB model
     assert item["match_id"] == "123456"
-    assert item["title"] == "Radiant vs Dire"
+    assert item["title"] == "Radiant vs Dire game 1 Test Cup"
     # Endpoint computes pretty time and final score
     assert item["days_ago_pretty"] is not None
     assert item["final_score"] is not None
@@ -79,19 +79,18 @@ def test_api_matches_happy_path(monkeypatch):
         rows = s.query(LatestMatch).all()
         assert len(rows) == 1
         assert rows[0].match_id == "123456"
-        assert rows[0].title == "Radiant vs Dire"
+        assert rows[0].title == "Radiant vs Dire game 1 Test Cup"
     finally:
         s.close()
 
 
-@pytest.mark.xfail(reason="Duplicate match_id currently triggers unique constraint until dedupe is implemented")
 def test_api_matches_duplicate_ids(monkeypatch):
     """Edge-case: two rows with the same match_id should result in a single persisted item."""
     now = dt.datetime.now()
     df = pd.DataFrame([
         {
             "match_id": 222222,
-            "title": "Game A",
+            "game_num": 1,
             "days_ago": 1.0,
             "date": now - dt.timedelta(days=1),
             "lead_is_small_score": 0.3,
@@ -110,7 +109,7 @@ def test_api_matches_duplicate_ids(monkeypatch):
         },
         {
             "match_id": 222222,
-            "title": "Game A (dup)",
+            "game_num": 1,
             "days_ago": 1.0,
             "date": now - dt.timedelta(days=1),
             "lead_is_small_score": 0.6,
@@ -131,7 +130,7 @@ def test_api_matches_duplicate_ids(monkeypatch):
 
     monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda: df)
     monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
-    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", lambda d, now=None: d)
     monkeypatch.setattr(app_mod, "calculate_statistics_scores", lambda d: d)
 
     resp = client.get("/api/matches")
@@ -0,0 +1,98 @@
+import sys
+import pathlib
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+
+from dota.batch_stats import pack_ragged, gold_adv_statistics, batch_max_gold_swing
+from dota.calcs import calc_min_in_lead, calc_max_gold_swing, calc_gold_lead_is_small, calc_gold_adv_stats
+
+
+def _random_games(n_games=300, seed=7):
+    rng = np.random.default_rng(seed)
+    games = []
+    for _ in range(n_games):
+        length = int(rng.integers(0, 80))
+        steps = rng.normal(0, 1500, size=length).round().astype(int)
+        games.append(list(np.cumsum(steps)))
+    # Hand written edge cases: too short, one team ahead the whole game, exact zeros
+    games += [[], [0], [100], [0, 0, 0], [-1, -2, -3], list(range(0, 30000, 1000)),
+              [0, 6000, -6000] * 10, [0] * 12 + [5000, -5000, 5000]]
+    return games
+
+
+def _reference_max_gold_swing(radiant_gold_adv, window=10, skip_first_x_minutes=10):
+    # The original per-minute slice scan, kept as the reference for the sliding window version
+    max_swing = 0
+    for j in range(skip_first_x_minutes, len(radiant_gold_adv) - 1):
+        end = len(radiant_gold_adv) if window is None else j + 1 + window
+        val = radiant_gold_adv[j]
+        if abs(val) < 5000:
+            continue
+        if val > 0:
+            swing = val - max(min(radiant_gold_adv[j + 1:end]), 0)
+        else:
+            swing = val - min(max(radiant_gold_adv[j + 1:end]), 0)
+        max_swing = max(max_swing, abs(swing))
+    return max_swing
+
+
+def _per_row(games, radiant_win):
+    df = pd.DataFrame({'radiant_win': radiant_win})
+    for i, gold_adv in enumerate(games):
+        df = calc_min_in_lead(df, i, gold_adv)
+        df = calc_max_gold_swing(df, i, gold_adv)
+        df = calc_gold_lead_is_small(df, i, gold_adv)
+    return df
+
+
+def test_batch_gold_adv_statistics_match_per_row_functions():
+    games = _random_games()
+    radiant_win = [[True, False, None][i % 3] for i in range(len(games))]
+    df_expected = _per_row(games, radiant_win)
+
+    values, offsets = pack_ragged(games)
+    stats = gold_adv_statistics(values, offsets, radiant_win)
+
+    np.testing.assert_array_equal(stats['min_in_lead'], df_expected['min_in_lead'].astype(int))
+    np.testing.assert_array_equal(stats['swing'], [_reference_max_gold_swing(g) for g in games])
+    np.testing.assert_array_equal(stats['lead_is_small'], df_expected['lead_is_small'].astype(float))
+
+
+def test_calc_gold_adv_stats_handles_strings_and_missing_data():
+    games = [[0, 1000, 6000, 12000] + [-8000] * 20, [], None, np.nan]
+    df = pd.DataFrame({
+        'radiant_gold_adv': [str(games[0]), games[1], games[2], games[3]],
+        'radiant_win': [False, True, True, False],
+    })
+    df = calc_gold_adv_stats(df)
+    expected = _per_row(games[:1], [False])
+    assert df.loc[0, 'min_in_lead'] == expected.loc[0, 'min_in_lead']
+    assert df.loc[0, 'swing'] == expected.loc[0, 'swing']
+    assert df.loc[0, 'lead_is_small'] == expected.loc[0, 'lead_is_small']
+    # Games without gold data keep the defaults from calculate_all_game_statistics
+    assert df['min_in_lead'].tolist()[1:] == [100, 100, 100]
+    assert df['swing'].tolist()[1:] == [0, 0, 0]
+    assert df['lead_is_small'].tolist()[1:] == [0, 0, 0]
+
+
+def test_batch_max_gold_swing_window_and_skip_minutes():
+    games = _random_games(seed=11)
+    values, offsets = pack_ragged(games)
+    for window, skip in [(10, 10), (1, 0), (3, 5), (25, 10), (None, 10), (None, 0)]:
+        expected = [_reference_max_gold_swing(g, window, skip) for g in games]
+        np.testing.assert_array_equal(batch_max_gold_swing(values, offsets, window, skip), expected)
+
+
+def test_calc_max_gold_swing_single_game():
+    gold_adv = [0] * 10 + [8000, 9000, 2000, -3000] + [-6000] * 10 + [4000]
+    df = pd.DataFrame({'swing': [0]})
+    df = calc_max_gold_swing(df, 0, gold_adv)
+    assert df.loc[0, 'swing'] == _reference_max_gold_swing(gold_adv) == 9000
+    df = calc_max_gold_swing(df, 0, gold_adv, window=None)
+    assert df.loc[0, 'swing'] == _reference_max_gold_swing(gold_adv, None) == 9000
@@ -0,0 +1,132 @@
+"""
+Round-trip benchmark for the bulk upsert used by cached_matches/latest_matches.
+
+Usage:
+    pytest tests/test_bulk_upsert.py -v -s
+"""
+
+import os
+import sys
+import pathlib
+from contextlib import contextmanager
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_bulk_upsert.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+from sqlalchemy import event
+
+from database import SessionLocal, CachedMatch, engine, bulk_upsert, init_db, upsert_chunk_size
+
+N_MATCHES = 1000
+
+init_db()
+
+
+@contextmanager
+def count_round_trips():
+    counter = {"statements": 0}
+
+    def before_cursor_execute(*args):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _matches(start_id):
+    return pd.DataFrame({
+        "match_id": range(start_id, start_id + N_MATCHES),
+        "title": [f"Game {i}" for i in range(N_MATCHES)],
+        "final_score": [float(i % 100) for i in range(N_MATCHES)],
+        "days_ago": [1.5] * N_MATCHES,
+        "days_ago_pretty": ["1 day ago"] * N_MATCHES,
+        "tournament": ["Bench Cup"] * N_MATCHES,
+        "radiant_team_name": ["R"] * N_MATCHES,
+        "dire_team_name": ["D"] * N_MATCHES,
+        "duration_min": [40.0] * N_MATCHES,
+    })
+
+
+def _per_row_upsert(session, df):
+    # The query + flush per row pattern bulk_upsert replaced
+    for _, row in df.iterrows():
+        mid = str(row["match_id"])
+        existing = session.query(CachedMatch).filter(CachedMatch.match_id == mid).first()
+        if existing:
+            existing.final_score = float(row["final_score"])
+        else:
+            session.add(CachedMatch(match_id=mid, title=row["title"], final_score=float(row["final_score"]),
+                                    duration_min=int(row["duration_min"])))
+        session.flush()
+
+
+def _clear(session, start_id):
+    ids = [str(i) for i in range(start_id, start_id + N_MATCHES)]
+    session.query(CachedMatch).filter(CachedMatch.match_id.in_(ids)).delete(synchronize_session=False)
+    session.commit()
+
+
+def test_bulk_upsert_round_trips():
+    session = SessionLocal()
+    try:
+        _clear(session, 5_000_000)
+        _clear(session, 6_000_000)
+
+        with count_round_trips() as before:
+            _per_row_upsert(session, _matches(5_000_000))
+            session.commit()
+        with count_round_trips() as after:
+            bulk_upsert(session, CachedMatch, _matches(6_000_000).to_dict("records"))
+            session.commit()
+        print(f"\n{N_MATCHES} matches: per-row upsert {before['statements']} statements, "
+              f"bulk upsert {after['statements']} statements")
+
+        assert before["statements"] >= 2 * N_MATCHES
+        # 9 columns per row, chunked so each statement stays under SQLite's 999 parameters
+        chunk_size = upsert_chunk_size(engine.dialect.name, 9)
+        assert chunk_size * 9 <= 999
+        assert upsert_chunk_size("postgresql", 12) == 500
+        assert after["statements"] == -(-N_MATCHES // chunk_size)
+    finally:
+        _clear(session, 5_000_000)
+        _clear(session, 6_000_000)
+        session.close()
+
+
+def test_bulk_upsert_updates_and_keeps_existing_values():
+    session = SessionLocal()
+    try:
+        _clear(session, 7_000_000)
+        rows = _matches(7_000_000).head(3).to_dict("records")
+        assert bulk_upsert(session, CachedMatch, rows) == 3
+        session.commit()
+
+        # Same key twice in one batch: last one wins, None doesn't wipe the stored title
+        updates = [
+            {"match_id": 7_000_000, "title": "first", "final_score": 10.0},
+            {"match_id": 7_000_000, "title": None, "final_score": float("nan")},
+            {"match_id": 7_000_001, "title": "Renamed", "final_score": 99.0},
+        ]
+        assert bulk_upsert(session, CachedMatch, updates) == 2
+        session.commit()
+
+        by_id = {m.match_id: m for m in session.query(CachedMatch).filter(
+            CachedMatch.match_id.in_(["7000000", "7000001", "7000002"]))}
+        assert by_id["7000000"].title == "Game 0"
+        assert by_id["7000000"].final_score == 0.0
+        assert by_id["7000001"].title == "Renamed"
+        assert by_id["7000001"].final_score == 99.0
+        assert by_id["7000001"].duration_min == 40
+        assert by_id["7000002"].title == "Game 2"
+    finally:
+        _clear(session, 7_000_000)
+        session.close()
@@ -0,0 +1,199 @@
+import os
+import re
+import sys
+import time
+import pathlib
+import datetime as dt
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_cached_matches.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+import app as app_mod
+import database
+from database import SessionLocal, CachedMatch, JobRun, MatchStatistics
+from dota.calculate_scores import calculate_recency_scores
+from dota.score_cache import scoring_config_hash
+
+
+def _scored_matches(days_ago):
+    now = int(time.time())
+    return pd.DataFrame([
+        {
+            "match_id": 8000 + i,
+            "game_num": 1,
+            "start_time": now - days * app_mod.SECONDS_PER_DAY - 60,
+            "lead_is_small_score": 0.5,
+            "min_in_lead_score": 0.5,
+            "swing_score": 0.5,
+            "barracks_comeback_score": 0.0,
+            "good_team_playing_score": 0.5,
+            "aegis_steals_score": 0.0,
+            "fight_%_of_game_score": 0.5,
+            "radiant_team_name": f"Team {i}",
+            "dire_team_name": "Other",
+            "duration_min": 40,
+            "tournament": "Cache Cup",
+        }
+        for i, days in enumerate(days_ago)
+    ])
+
+
+def _patch_pipeline(monkeypatch, df, scored=None):
+    def score(d, db, now=None):
+        if scored is not None:
+            scored.append(d["match_id"].tolist())
+        d = d.copy()
+        d["date"] = pd.to_datetime(d["start_time"], unit="s")
+        d["days_ago"] = (d["date"] - dt.datetime.now()).dt.days
+        return calculate_recency_scores(d)
+
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda sql_query=None: df)
+    monkeypatch.setattr(app_mod, "_score_matches", score)
+
+
+def _clear(db):
+    db.query(CachedMatch).filter(CachedMatch.match_id.like("80%")).delete(synchronize_session=False)
+    db.query(JobRun).filter(JobRun.key == app_mod.cache_refresh_job.key).delete(synchronize_session=False)
+    db.commit()
+
+
+def test_refresh_stores_start_time_and_ranks_by_recency(monkeypatch):
+    _patch_pipeline(monkeypatch, _scored_matches([1, 20, 150]))
+    db = SessionLocal()
+    try:
+        _clear(db)
+        db.add(CachedMatch(match_id="8099", title="Legacy row", final_score=99, days_ago=-1))
+        db.commit()
+
+        assert app_mod._refresh_cached_matches(100) == 2
+        rows = {r.match_id: r for r in db.query(CachedMatch).filter(CachedMatch.match_id.like("80%"))}
+        # The 150 day old match and the legacy row without a start_time are pruned
+        assert sorted(rows) == ["8000", "8001"]
+        assert rows["8000"].static_score is not None
+        assert rows["8000"].final_score > rows["8001"].final_score
+
+        items = [i for i in app_mod._read_cached_matches(100) if i["match_id"].startswith("80")]
+        assert [i["match_id"] for i in items] == ["8000", "8001"]
+        assert items[0]["days_ago"] == -2
+        assert items[0]["days_ago_pretty"] == "2 days ago"
+
+        # Thirty days later the newer match has lost recency, only changed rows are written
+        score_before = rows["8000"].final_score
+        later = dt.datetime.now() + dt.timedelta(days=30)
+        assert app_mod._rescore_cached_matches(db, later) >= 2
+        db.commit()
+        db.expire_all()
+        assert rows["8000"].final_score < score_before
+        assert app_mod._rescore_cached_matches(db, later) == 0
+    finally:
+        _clear(db)
+        db.close()
+
+
+def test_refresh_only_scores_matches_newer_than_the_watermark(monkeypatch):
+    queries, scored = [], []
+    fetched = _scored_matches([1, 2])
+    _patch_pipeline(monkeypatch, fetched, scored)
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda sql_query: queries.append(sql_query) or fetched)
+    db = SessionLocal()
+    try:
+        _clear(db)
+        assert app_mod._refresh_cached_matches(100) == 2
+        watermark, match_id = app_mod.cache_refresh_job.watermark(db)
+        assert (watermark, match_id) == (fetched["start_time"].max(), "8000")
+
+        # A new match finished, the explorer returns it with the ones already cached
+        new = _scored_matches([0]).assign(match_id=8002)
+        fetched = pd.concat([new, _scored_matches([1, 2])], ignore_index=True)
+        assert app_mod._refresh_cached_matches(100) == 1
+        assert scored == [[8000, 8001], [8002]]
+        assert f"matches.start_time > {watermark - app_mod.WATERMARK_OVERLAP_SECONDS}" in queries[-1]
+        assert app_mod.cache_refresh_job.watermark(db) == (new["start_time"].max(), "8002")
+
+        # Nothing new, nothing is scored
+        assert app_mod._refresh_cached_matches(100) == 0
+        assert len(scored) == 2
+    finally:
+        _clear(db)
+        db.close()
+
+
+def _explorer(df):
+    # Answers the refresh queries from df like the explorer, newest first with the start_time bounds and LIMIT
+    def fetch(sql_query):
+        rows = df.sort_values("start_time", ascending=False)
+        for op, value in re.findall(r"matches\.start_time (>|<=|<) (\d+)", sql_query):
+            value = int(value)
+            rows = rows[{">": rows["start_time"] > value, "<=": rows["start_time"] <= value,
+                         "<": rows["start_time"] < value}[op]]
+        return rows.head(int(re.search(r"LIMIT (\d+)", sql_query).group(1))).reset_index(drop=True)
+    return fetch
+
+
+def test_refresh_pages_back_to_the_watermark_after_an_outage(monkeypatch):
+    scored = []
+    _patch_pipeline(monkeypatch, None, scored)
+    monkeypatch.setattr(app_mod, "REFRESH_LIMIT", 2)
+    # Five matches since the last refresh, two share a start time across the page boundary
+    fetched = _scored_matches([1, 1, 1, 1, 1]).assign(start_time=lambda d: d["start_time"] - [0, 10, 20, 20, 30])
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", _explorer(fetched))
+    db = SessionLocal()
+    try:
+        _clear(db)
+        assert app_mod._refresh_cached_matches(100) == 5
+        assert sorted(m for page in scored for m in page) == [8000, 8001, 8002, 8003, 8004]
+        assert app_mod.cache_refresh_job.watermark(db) == (fetched["start_time"].max(), "8000")
+    finally:
+        _clear(db)
+        db.close()
+
+
+def test_matches_cached_unparsed_are_rescored_once_parsed(monkeypatch):
+    scored = []
+    _patch_pipeline(monkeypatch, None, scored)
+    unparsed = _scored_matches([1, 1]).assign(radiant_gold_adv=None, teamfights=None, objectives=None)
+    parsed = unparsed.assign(radiant_gold_adv="[0, 500]", teamfights='[{"start": 600}]',
+                              objectives='[{"type": "CHAT_MESSAGE_FIRSTBLOOD"}]')
+    fetched = unparsed
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda sql_query: fetched)
+    db = SessionLocal()
+    try:
+        db.query(MatchStatistics).filter(MatchStatistics.match_id.in_(["8000", "8001"])).delete()
+        _clear(db)
+        assert app_mod._refresh_cached_matches(100) == 2
+        # Still unparsed, nothing to rescore
+        assert app_mod._refresh_cached_matches(100) == 0
+
+        # 8000 was parsed since, 8001 was already rescored with its replay by another worker
+        fetched = parsed
+        db.add(MatchStatistics(match_id="8001", config_hash=scoring_config_hash(), statistics="{}"))
+        db.commit()
+        assert app_mod._refresh_cached_matches(100) == 1
+        assert scored[-1] == [8000]
+    finally:
+        db.query(MatchStatistics).filter(MatchStatistics.match_id.in_(["8000", "8001"])).delete()
+        _clear(db)
+        db.close()
+
+
+def test_add_missing_columns_migrates_existing_cache_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE cached_matches (id INTEGER PRIMARY KEY, match_id VARCHAR NOT NULL, "
+                          "title VARCHAR, final_score FLOAT, days_ago FLOAT)"))
+    database.add_missing_columns(engine)
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("cached_matches")}
+    assert {"start_time", "static_score", "tournament"} <= columns
+    indexes = {i["name"]: i["column_names"] for i in inspector.get_indexes("cached_matches")}
+    assert indexes["ix_cached_matches_final_score_start_time"] == ["final_score", "start_time"]
+    # Running it again is a no-op
+    database.add_missing_columns(engine)
@@ -0,0 +1,113 @@
+import sys
+import warnings
+import pathlib
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+
+from constants import KNOWN_OBJECTIVES
+from dota.calcs import add_total_objectives_cols, calc_teamfight_stats, objectives_table, teamfights_table
+from dota.decode import decode_gold_adv, decode_objectives, decode_teamfights, parse_nested_column, ragged_row
+
+
+def test_parse_nested_column_handles_csv_and_api_values():
+    values = [
+        "[{'start': 60, 'end': 90, 'ok': True, 'x': None}]",  # str() of a python list, like the csv files
+        '[{"start": 1, "end": 2, "ok": false}]',  # JSON
+        "[{'unit': \"Tiny's Toss\"}]",  # not valid JSON after the quote swap
+        [{"start": 5, "end": 6}],  # already parsed by the API client
+        np.nan,
+        None,
+    ]
+    assert parse_nested_column(values) == [
+        [{"start": 60, "end": 90, "ok": True, "x": None}],
+        [{"start": 1, "end": 2, "ok": False}],
+        [{"unit": "Tiny's Toss"}],
+        [{"start": 5, "end": 6}],
+        None,
+        None,
+    ]
+
+
+def test_parse_nested_column_leaves_json_text_alone():
+    # Quotes and True/False/None inside JSON strings would be changed by the python literal rewrite
+    values = ['[{"key": "True Sight", "unit": "it\'s"}]', "[{'key': None}]"]
+    assert parse_nested_column(values) == [[{"key": "True Sight", "unit": "it's"}], [{"key": None}]]
+    assert parse_nested_column(values[:1]) == [[{"key": "True Sight", "unit": "it's"}]]
+
+
+def test_decoded_arrays_feed_the_stats_functions():
+    teamfights = decode_teamfights([
+        "[{'start': 600, 'end': 660, 'deaths': 4}, {'start': 300, 'end': 330, 'deaths': 2}]",
+        np.nan,
+        "[]",
+    ])
+    assert teamfights.start.dtype == np.int64
+    assert teamfights.start.tolist() == [600, 300]
+    assert teamfights.offsets.tolist() == [0, 2, 2, 2]
+    assert teamfights.missing.tolist() == [False, True, False]
+
+    objectives = decode_objectives([
+        [{"type": "building_kill"}, {"type": "CHAT_MESSAGE_AEGIS"}, {"type": "building_kill"}],
+        None,
+    ])
+    assert objectives.categories == ["CHAT_MESSAGE_AEGIS", "building_kill"]
+    assert objectives.codes[ragged_row(objectives.offsets, 0)].tolist() == [1, 0, 1]
+    assert objectives.missing.tolist() == [False, True]
+
+    gold = decode_gold_adv(["[0, 100, -200]", [], np.nan, [5]])
+    assert gold.values.tolist() == [0, 100, -200, 5]
+    assert gold.offsets.tolist() == [0, 3, 3, 3, 4]
+    assert gold.missing.tolist() == [False, True, True, False]
+
+
+def test_teamfight_stats_from_the_long_table():
+    df = pd.DataFrame({
+        "match_id": [1, 2, 3, 4],
+        "duration": [2100, 2000, 1800, 1500],
+        "teamfights": [
+            "[{'start': 600, 'end': 660, 'deaths': 4}, {'start': 300, 'end': 330, 'deaths': 2}]",
+            np.nan,
+            "[]",
+            [{"start": 125, "end": 145, "deaths": 3}],
+        ],
+    })
+    fights = teamfights_table(df)
+    assert fights["match_id"].tolist() == [1, 1, 4]
+    assert fights["length"].tolist() == [60, 30, 20]
+
+    df = calc_teamfight_stats(df, fights)
+    assert df["first_fight_at"].fillna("none").tolist() == ["5:0", "none", "none", "2:5"]
+    assert df["first_fight_secs"].fillna(-1).tolist() == [300, -1, -1, 125]
+    assert df["fight_%_of_game"].tolist() == [90 / 1800, 0, 0, 20 / 1375]
+    assert df["avg_fight_length"].tolist() == [45, 0, 0, 20]
+    assert df["fight_%_of_game"].dtype == np.float64
+    assert df["avg_fight_length"].dtype == np.float64
+
+
+def test_objective_counts_pivot_into_the_known_columns(caplog):
+    df = pd.DataFrame({
+        "match_id": [1, 2, 3],
+        "objectives": [
+            "[{'type': 'building_kill'}, {'type': 'CHAT_MESSAGE_AEGIS'}, {'type': 'building_kill'}]",
+            None,
+            [{"type": "CHAT_MESSAGE_NEW_THING"}, {"type": "CHAT_MESSAGE_AEGIS_STOLEN"}],
+        ],
+    })
+    with caplog.at_level("WARNING"), warnings.catch_warnings():
+        # No pandas deprecation warnings on the scoring path
+        warnings.simplefilter("error")
+        df = add_total_objectives_cols(df, objectives_table(df))
+    assert "CHAT_MESSAGE_NEW_THING" in caplog.text
+    assert "CHAT_MESSAGE_NEW_THING" not in df.columns
+    assert df["building_kill"].tolist() == [2, 0, 0]
+    assert df["CHAT_MESSAGE_AEGIS"].tolist() == [1, 0, 0]
+    assert df["CHAT_MESSAGE_AEGIS_STOLEN"].tolist() == [0, 0, 1]
+    # Every declared column exists, even when no match has that objective
+    assert df["CHAT_MESSAGE_MINIBOSS_KILL"].tolist() == [0, 0, 0]
+    assert set(KNOWN_OBJECTIVES) <= set(df.columns)
@@ -0,0 +1,69 @@
+import json
+import sqlite3
+import sys
+import pathlib
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from dota.api import DEFAULT_QUERY, match_query, pipeline_columns
+
+# Columns of the explorer matches table that the pipeline never reads, with sizes like real matches
+UNUSED_BLOBS = {
+    'chat': json.dumps([{'time': t, 'type': 'chat', 'unit': 'player', 'key': 'gg wp'} for t in range(40)]),
+    'cosmetics': json.dumps({str(n): n % 10 for n in range(300)}),
+    'picks_bans': json.dumps([{'is_pick': n % 2 == 0, 'hero_id': n, 'team': n % 2, 'order': n} for n in range(24)]),
+    'draft_timings': json.dumps([{'order': n, 'pick': True, 'total_time_taken': 30} for n in range(24)]),
+    'radiant_xp_adv': json.dumps(list(range(0, 40000, 1000))),
+}
+
+
+def _explorer_db():
+    db = sqlite3.connect(':memory:')
+    db.execute("""CREATE TABLE matches (match_id, start_time, duration, radiant_score, dire_score, radiant_win,
+        series_id, series_type, radiant_team_id, dire_team_id, barracks_status_radiant, barracks_status_dire,
+        teamfights, objectives, radiant_gold_adv, leagueid, first_blood_time, """ + ', '.join(UNUSED_BLOBS) + ")")
+    db.execute("CREATE TABLE leagues (leagueid, name, tier, ticket, banner)")
+    db.executemany("INSERT INTO leagues VALUES (?, ?, ?, '', '')",
+                   [(1, 'DreamLeague', 'premium'), (2, 'DreamLeague Division II', 'professional'),
+                    (3, 'Amateur Cup', 'amateur')])
+    for match_id in range(1, 31):
+        db.execute("INSERT INTO matches VALUES (" + ', '.join('?' * (17 + len(UNUSED_BLOBS))) + ")", (
+            match_id, 1_750_000_000 + match_id * 600, 2400 + match_id * 15, 20, 25, True,
+            100 + match_id // 3, 1, 1, 2, 63, 0,
+            json.dumps([{'start': 600, 'end': 640, 'deaths': 5}]),
+            json.dumps([{'time': 300, 'type': 'CHAT_MESSAGE_FIRSTBLOOD'}]),
+            json.dumps(list(range(-2000, 2000, 100))),
+            match_id % 3 + 1, 120, *UNUSED_BLOBS.values()))
+    return db
+
+
+def _rows(db, sql_query):
+    cursor = db.execute(sql_query)
+    names = [c[0] for c in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def test_query_selects_pipeline_columns_and_computes_derived_ones():
+    db = _explorer_db()
+    rows = _rows(db, DEFAULT_QUERY)
+    # Division II and amateur leagues are filtered out
+    assert len(rows) == 10
+    assert list(rows[0]) == pipeline_columns() + ['total_kills', 'duration_min']
+    assert rows[0]['match_id'] == 30 and rows[0]['total_kills'] == 45
+    # 2850 seconds is 47.5 minutes, rounded half away from zero
+    assert rows[0]['duration'] == 2850 and rows[0]['duration_min'] == 48
+
+    series = _rows(db, match_query(30))
+    assert sorted(row['match_id'] for row in series) == [30]
+    assert sorted(row['match_id'] for row in _rows(db, match_query(4))) == [3, 4, 5]
+
+
+def test_projected_payload_is_a_fraction_of_select_star():
+    db = _explorer_db()
+    select_star = 'SELECT *' + DEFAULT_QUERY[DEFAULT_QUERY.index('\n    FROM matches'):]
+    projected = len(json.dumps(_rows(db, DEFAULT_QUERY)))
+    full = len(json.dumps(_rows(db, select_star)))
+    assert projected < full / 3
@@ -0,0 +1,92 @@
+import json
+import sys
+import pathlib
+import tracemalloc
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dota.decode import decode_objectives, decode_teamfights
+from dota.explorer_stream import read_explorer_frame
+
+
+def _row(match_id, radiant_team_id=7):
+    return {
+        "match_id": 8_000_000_000 + match_id,
+        "start_time": 1_750_000_000 + match_id,
+        "duration_min": 40.5 if match_id == 2 else 40,
+        "radiant_win": match_id % 2 == 0,
+        "radiant_team_id": radiant_team_id,
+        "name": "Liga Española",
+        "teamfights": [{"start": 600, "end": 640, "deaths": 5,
+                        "players": [{"damage": n, "gold_delta": n, "ability_uses": {"nevermore_shadowraze1": 2}}
+                                    for n in range(10)]}] * 8,
+        "objectives": [{"time": 300, "type": "CHAT_MESSAGE_FIRSTBLOOD", "slot": 3, "key": 4}],
+        "radiant_gold_adv": [0, 150, -300],
+    }
+
+
+def _body(rows):
+    # Keys before and after rows like the explorer sends them
+    yield '{"command": "SELECT", "rowCount": %d, "rows": [' % len(rows)
+    for n, row in enumerate(rows):
+        yield (',' if n else '') + json.dumps(row, ensure_ascii=False)
+    yield '], "fields": [{"name": "match_id"}]}'
+
+
+def _chunks(rows, size):
+    # Small chunks split numbers, strings and multi-byte characters between reads
+    body = ''.join(_body(rows)).encode()
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_streamed_frame_matches_the_parsed_rows():
+    rows = [_row(1, radiant_team_id=None), _row(2), _row(3)]
+    df = read_explorer_frame(_chunks(rows, 7))
+    expected = pd.DataFrame(rows)
+
+    assert list(df.columns) == list(expected.columns)
+    assert df["match_id"].dtype == np.int64 and df["match_id"].tolist() == expected["match_id"].tolist()
+    assert df["duration_min"].tolist() == [40.0, 40.5, 40.0]
+    assert df["radiant_team_id"].isna().tolist() == [True, False, False]
+    assert df["radiant_win"].tolist() == [False, True, False]
+    assert df["name"].tolist() == ["Liga Española"] * 3
+
+    # Nested columns are JSON text of the fields the decoders read, they decode the same
+    assert json.loads(df["teamfights"][0]) == [{"start": 600, "end": 640, "deaths": 5}] * 8
+    for decode, col in [(decode_teamfights, "teamfights"), (decode_objectives, "objectives")]:
+        for streamed, parsed in zip(decode(df[col]), decode(expected[col])):
+            assert np.array_equal(streamed, parsed)
+    assert json.loads(df["radiant_gold_adv"][2]) == [0, 150, -300]
+
+
+def test_error_responses_and_empty_results():
+    with pytest.raises(KeyError):
+        read_explorer_frame([b'{"err": "syntax error at or near \\"FROM\\""}'])
+    assert read_explorer_frame([b'{"command": "SELECT", "rows": []}']).empty
+
+
+def test_peak_memory_follows_the_frame_not_the_payload():
+    rows = [_row(n) for n in range(300)]
+    payload = sum(len(part.encode()) for part in _body(rows))
+
+    def chunks():
+        # Encoded as it is read, like a download
+        for part in _body(rows):
+            yield part.encode()
+
+    tracemalloc.start()
+    try:
+        df = read_explorer_frame(chunks())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(df) == 300
+    assert peak < 3 * df.memory_usage(deep=True).sum()
+    assert peak < payload / 5
@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import pathlib
+import time
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from dota.http_cache import ResponseCache, cache_key
+
+EXPLORER = "https://api.opendota.com/api/explorer"
+TEAMS = "https://api.opendota.com/api/teams"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.text = body.decode()
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    # Answers like OpenDota, 304 when the ETag sent matches
+    def __init__(self, body, etag='W/"1"', status_code=200):
+        self.body = body
+        self.etag = etag
+        self.status_code = status_code
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None, headers=None, stream=False):
+        self.requests.append((url, params, headers or {}))
+        if self.etag and (headers or {}).get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(self.status_code, self.body, {"ETag": self.etag} if self.etag else {})
+
+
+def _rows(n):
+    return json.dumps({"rows": [{"match_id": m} for m in range(n)]}).encode()
+
+
+def test_repeated_queries_are_served_from_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    session = FakeSession(_rows(3))
+    first = cache.json(session, EXPLORER, {"sql": "SELECT *\n    FROM matches LIMIT 3\n"})
+    # Line breaks differ, same query
+    second = cache.json(session, EXPLORER, {"sql": "SELECT * FROM matches LIMIT 3"})
+    assert first == second == {"rows": [{"match_id": 0}, {"match_id": 1}, {"match_id": 2}]}
+    assert len(session.requests) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidated": 0, "evictions": 0}
+
+
+def test_only_formatting_whitespace_is_normalized():
+    indented = "SELECT *\n        FROM matches\n    WHERE name = 'The International'  \n"
+    assert cache_key(EXPLORER, {"sql": indented}) == \
+        cache_key(EXPLORER, {"sql": "SELECT * FROM matches WHERE name = 'The International'"})
+    # Inside a string literal whitespace is part of the query
+    assert cache_key(EXPLORER, {"sql": "SELECT * FROM leagues WHERE name = 'ESL  One'"}) != \
+        cache_key(EXPLORER, {"sql": "SELECT * FROM leagues WHERE name = 'ESL One'"})
+
+
+def test_stale_entries_are_revalidated_with_the_etag(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttls={"/explorer": 0, "/teams": 3600})
+    session = FakeSession(_rows(2))
+    assert cache.json(session, EXPLORER, {"sql": "SELECT 1"})["rows"][1] == {"match_id": 1}
+    assert cache.json(session, EXPLORER, {"sql": "SELECT 1"})["rows"][1] == {"match_id": 1}
+    assert session.requests[1][2] == {"If-None-Match": 'W/"1"'}
+    assert cache.stats()["revalidated"] == 1
+
+    # The teams endpoint has a longer TTL
+    teams = FakeSession(b'[{"team_id": 1}]', etag=None)
+    cache.json(teams, TEAMS)
+    cache.json(teams, TEAMS)
+    assert len(teams.requests) == 1
+
+
+def test_bodies_evicted_by_another_worker_are_fetched_again(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttls={"/explorer": 0})
+    session = FakeSession(_rows(2))
+    assert cache.json(session, EXPLORER, {"sql": "SELECT 1"})["rows"][1] == {"match_id": 1}
+
+    def evict_all():
+        for name in os.listdir(tmp_path):
+            if name.endswith(".body"):
+                os.remove(tmp_path / name)
+
+    # Evicted between reading the metadata and the 304, the body is fetched again unconditionally
+    get = session.get
+
+    def get_then_evict(url, params=None, timeout=None, headers=None, stream=False):
+        evict_all()
+        return get(url, params, timeout, headers, stream)
+
+    monkeypatch.setattr(session, "get", get_then_evict)
+    assert cache.json(session, EXPLORER, {"sql": "SELECT 1"})["rows"][1] == {"match_id": 1}
+    assert [headers for _, _, headers in session.requests[1:]] == [{"If-None-Match": 'W/"1"'}, {}]
+
+    # Evicted right after it was stored, the response is still served
+    store = cache._store
+    monkeypatch.setattr(session, "get", get)
+    monkeypatch.setattr(cache, "_store", lambda *args: (store(*args), evict_all()))
+    assert cache.json(session, EXPLORER, {"sql": "SELECT 2"})["rows"][0] == {"match_id": 0}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    body = _rows(50)
+    cache = ResponseCache(str(tmp_path), max_bytes=2 * len(body))
+    session = FakeSession(body)
+    for sql in ["SELECT 1", "SELECT 2"]:
+        cache.json(session, EXPLORER, {"sql": sql})
+    # SELECT 1 is used again so SELECT 2 is the oldest when SELECT 3 arrives
+    old = time.time() - 100
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (old, old))
+    cache.json(session, EXPLORER, {"sql": "SELECT 1"})
+    cache.json(session, EXPLORER, {"sql": "SELECT 3"})
+    assert cache.stats()["evictions"] == 1
+
+    requests_before = len(session.requests)
+    cache.json(session, EXPLORER, {"sql": "SELECT 1"})
+    assert len(session.requests) == requests_before
+    cache.json(session, EXPLORER, {"sql": "SELECT 2"})
+    assert len(session.requests) == requests_before + 1
+
+
+def test_error_responses_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    session = FakeSession(b'{"err": "timeout"}', status_code=500)
+    assert cache.json(session, EXPLORER, {"sql": "SELECT 1"}) == {"err": "timeout"}
+    cache.json(session, EXPLORER, {"sql": "SELECT 1"})
+    assert len(session.requests) == 2
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import pathlib
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_import_scores_csv.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+
+import app as app_mod
+from database import SessionLocal, CachedMatch, JobRun, init_db
+from import_scores_csv import import_csv
+
+
+def _clear(db):
+    db.query(CachedMatch).filter(CachedMatch.match_id.like("60%")).delete(synchronize_session=False)
+    db.query(JobRun).filter(JobRun.key == app_mod.cache_refresh_job.key).delete(synchronize_session=False)
+    db.commit()
+
+
+def test_imported_rows_survive_the_refresh_and_get_rescored(tmp_path, monkeypatch):
+    init_db()
+    now = int(time.time())
+    csv_path = tmp_path / "scores_all_cols.csv"
+    pd.DataFrame({
+        "match_id": [6001, 6002, 6003],
+        "title": ["Recent", "Older", "Out of range"],
+        "start_time": [now - 2 * 86400, now - 10 * 86400, now - 90 * 86400],
+        "final_score": [80, 70, 60],
+        "days_ago": [-2, -10, -90],
+        "tournament": ["Csv Cup"] * 3,
+    }).to_csv(csv_path, index=False)
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda sql_query: pd.DataFrame())
+
+    db = SessionLocal()
+    try:
+        _clear(db)
+        import_csv(str(csv_path), 30)
+        rows = {r.match_id: r for r in db.query(CachedMatch).filter(CachedMatch.match_id.like("60%"))}
+        assert sorted(rows) == ["6001", "6002"]
+        assert rows["6001"].start_time == now - 2 * 86400
+        assert rows["6001"].static_score is not None
+
+        # Nothing new from OpenDota, the refresh keeps the imported rows
+        assert app_mod._refresh_cached_matches(100) == 0
+        db.expire_all()
+        assert db.query(CachedMatch).filter(CachedMatch.match_id.like("60%")).count() == 2
+        # Rescoring now gives back the score they were imported with
+        app_mod._rescore_cached_matches(db)
+        db.commit()
+        db.expire_all()
+        assert [db.get(CachedMatch, rows[m].id).final_score for m in ["6001", "6002"]] == [80, 70]
+    finally:
+        _clear(db)
+        db.close()
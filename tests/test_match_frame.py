@@ -0,0 +1,48 @@
+import sys
+import pathlib
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+
+from dota.calcs import create_title
+from dota.match_frame import clean_names, compact_match_frame, contains_any
+
+
+def _matches():
+    return pd.DataFrame({
+        "match_id": [1, 2, 3],
+        "radiant_team_name": ["Team Liquid", None, "Tundra Esports"],
+        "dire_team_name": ["Team Spirit", "Team Spirit", "Team Falcons"],
+        "tournament": ["DreamLeague presented by Foo", "DreamLeague powered by Bar", None],
+        "game_num": [1.0, 2.0, 1.0],
+        "duration": [2400, 1800, 3000],
+        "radiant_team_rank": [3.0, np.nan, 8.0],
+        "swing_score": [0.25, 0.5, 1.0],
+    })
+
+
+def test_compact_frame_encodes_names_once():
+    df = compact_match_frame(clean_names(_matches()))
+    assert isinstance(df["dire_team_name"].dtype, pd.CategoricalDtype)
+    assert df["dire_team_name"].cat.categories.size == 3  # two teams and ???
+    assert df["tournament"].tolist() == ["DreamLeague", "DreamLeague", "???"]
+    assert df["duration"].dtype == np.int32
+    assert df["radiant_team_rank"].dtype == np.float32
+    # Scores keep float64
+    assert df["swing_score"].dtype == np.float64
+
+    assert contains_any(df["radiant_team_name"], ["team liquid", "Falcons"]).tolist() == [True, False, False]
+    assert contains_any(_matches()["radiant_team_name"], ["Tundra"]).tolist() == [False, False, True]
+
+
+def test_titles_are_built_for_the_selected_rows_only():
+    df = compact_match_frame(clean_names(_matches()))
+    top = create_title(df.head(2).copy())
+    assert top["title"].tolist() == ["Team Liquid vs Team Spirit game 1 DreamLeague",
+                                     "??? vs Team Spirit game 2 DreamLeague"]
+    assert "title" not in df.columns
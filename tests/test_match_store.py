@@ -0,0 +1,99 @@
+import json
+import sys
+import pathlib
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import dota.api as api
+from dota.match_store import MatchStore, import_csv_if_empty
+
+JAN = 1735732800  # 2025-01-01 12:00 UTC
+FEB = 1738411200  # 2025-02-01 12:00 UTC
+
+
+def _matches(match_ids, start_time):
+    return pd.DataFrame({
+        "match_id": match_ids,
+        "start_time": [start_time + i for i in range(len(match_ids))],
+        "radiant_win": [True] * len(match_ids),
+        # CSV style stringified lists and API style parsed lists both end up as native list columns
+        "radiant_gold_adv": ["[0, 100, -200]"] + [[0, 50]] * (len(match_ids) - 1),
+        "teamfights": [[{"start": 60, "end": 90, "deaths": 3}]] * len(match_ids),
+        "objectives": [[{"type": "CHAT_MESSAGE_FIRSTBLOOD", "key": 5}],
+                       [{"type": "building_kill", "key": "npc_dota_goodguys_tower1_mid"}]][:len(match_ids)],
+    })
+
+
+def test_append_partitions_by_month_and_skips_stored_matches(tmp_path):
+    store = MatchStore(str(tmp_path))
+    assert store.append(_matches([1, 2], JAN)) == 2
+    assert store.append(_matches([2, 3], FEB)) == 1
+    assert store.months() == ["2025-01", "2025-02"]
+    assert store.match_ids() == {1, 2, 3}
+    assert store.max_start_time() == FEB + 1
+
+    df = store.read().sort_values("match_id")
+    assert df["radiant_gold_adv"].tolist() == [[0, 100, -200], [0, 50], [0, 50]]
+    assert df["teamfights"].iloc[0] == [{"start": 60, "end": 90, "deaths": 3}]
+    # objectives 'key' is a number or a building name, stored as a string in every part file
+    assert df["objectives"].tolist() == [
+        [{"type": "CHAT_MESSAGE_FIRSTBLOOD", "key": "5"}],
+        [{"type": "building_kill", "key": "npc_dota_goodguys_tower1_mid"}],
+        [{"type": "building_kill", "key": "npc_dota_goodguys_tower1_mid"}],
+    ]
+
+
+def test_read_projects_columns_and_prunes_months(tmp_path):
+    store = MatchStore(str(tmp_path))
+    store.append(_matches([1, 2], JAN))
+    store.append(_matches([3], FEB).assign(radiant_gold_adv=[None]))
+
+    df = store.read(columns=["match_id", "radiant_gold_adv"], since=FEB)
+    assert list(df.columns) == ["match_id", "radiant_gold_adv"]
+    assert df["match_id"].tolist() == [3]
+    assert df["radiant_gold_adv"].tolist() == [None]
+
+    store.drop_before(FEB)
+    assert store.months() == ["2025-02"]
+
+
+def test_old_csv_is_imported_once_into_an_empty_store(tmp_path):
+    csv_path = tmp_path / "historic.csv"
+    # to_csv writes the nested columns as python literals, like the old historic files
+    _matches([1, 2], JAN).to_csv(csv_path, index=False)
+    store = MatchStore(str(tmp_path / "store"))
+    assert import_csv_if_empty(store, str(tmp_path / "missing.csv")) == 0
+    assert import_csv_if_empty(store, str(csv_path), chunk_rows=1) == 2
+
+    df = store.read().sort_values("match_id")
+    assert df["radiant_gold_adv"].tolist() == [[0, 100, -200], [0, 50]]
+    assert df["teamfights"].iloc[1] == [{"start": 60, "end": 90, "deaths": 3}]
+    assert df["objectives"].iloc[0] == [{"type": "CHAT_MESSAGE_FIRSTBLOOD", "key": "5"}]
+
+    # The store isn't empty any more, the CSV is left alone
+    assert import_csv_if_empty(store, str(csv_path)) == 0
+    assert store.match_ids() == {1, 2}
+
+
+def test_historic_update_stores_nested_columns_whole(tmp_path, monkeypatch):
+    teamfight = {"start": 600, "end": 640, "deaths": 5, "players": [{"damage": 100, "gold_delta": 50}]}
+    objective = {"time": 300, "type": "CHAT_MESSAGE_FIRSTBLOOD", "slot": 3}
+    body = json.dumps({"rows": [{"match_id": 1, "start_time": JAN, "teamfights": [teamfight],
+                                 "objectives": [objective]}]}).encode()
+    monkeypatch.setattr(api.http_cache, "chunks", lambda *args: iter([body]))
+    monkeypatch.setattr(api, "HISTORIC_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(api, "HISTORIC_FILE", str(tmp_path / "missing.csv"))
+
+    api.update_historic_file()
+    df = MatchStore(str(tmp_path / "store")).read()
+    # Scoring only reads start/end/deaths and type, the store keeps every field
+    assert df["teamfights"].iloc[0] == [teamfight]
+    assert df["objectives"].iloc[0] == [objective]
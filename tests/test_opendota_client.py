@@ -0,0 +1,108 @@
+import sys
+import json
+import pathlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pytest
+
+import dota.api as api
+from dota.http_cache import ResponseCache
+
+
+class StubOpenDota(BaseHTTPRequestHandler):
+    # Responses to hand out before answering normally, shared by all requests to the stub
+    failures = []
+    requests = []
+    connections = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        StubOpenDota.requests.append(url.path)
+        StubOpenDota.connections.add(self.client_address)
+        if StubOpenDota.failures:
+            self._send(StubOpenDota.failures.pop(0), {"error": "try again"})
+        elif url.path == "/api/explorer":
+            sql = parse_qs(url.query)["sql"][0]
+            self._send(200, {"rows": [{"match_id": 1, "sql": sql}]})
+        elif url.path == "/api/teams":
+            self._send(200, [
+                {"team_id": 1, "name": "Low", "rating": 1000, "match_id": 10},
+                {"team_id": 2, "name": "High", "rating": 2000, "match_id": 11},
+                {"team_id": 3, "name": "Gone", "rating": 3000, "match_id": None},
+            ])
+        else:
+            self._send(404, {})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(tmp_path, monkeypatch):
+    StubOpenDota.protocol_version = "HTTP/1.1"
+    StubOpenDota.failures = []
+    StubOpenDota.requests = []
+    StubOpenDota.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenDota)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # Fresh session and response cache pointed at the stub, short backoff
+    monkeypatch.setattr(api, "OPENDOTA_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/api")
+    monkeypatch.setattr(api, "session", api._create_session(backoff_factor=0.01))
+    monkeypatch.setattr(api, "http_cache", ResponseCache(str(tmp_path)))
+    yield tmp_path
+    server.shutdown()
+    server.server_close()
+
+
+def test_explorer_retries_rate_limit_and_server_errors(stub_server):
+    StubOpenDota.failures = [429, 503]
+    df = api.fetch_dota_data_from_api("SELECT 1")
+    assert df.to_dict("records") == [{"match_id": 1, "sql": "SELECT 1"}]
+    assert StubOpenDota.requests == ["/api/explorer"] * 3
+
+
+def test_explorer_gives_up_after_max_retries(stub_server, monkeypatch):
+    monkeypatch.setattr(api, "session", api._create_session(retries=2, backoff_factor=0.01))
+    StubOpenDota.failures = [500] * 5
+    # The error body has no rows
+    with pytest.raises(KeyError):
+        api.fetch_dota_data_from_api("SELECT 1")
+    assert len(StubOpenDota.requests) == 3
+    # Nothing is cached, the next call asks again
+    assert list(stub_server.iterdir()) == []
+
+
+def test_client_errors_are_not_retried(stub_server):
+    StubOpenDota.failures = [400]
+    with pytest.raises(KeyError):
+        api.fetch_dota_data_from_api("SELECT 1", stream=False)
+    assert len(StubOpenDota.requests) == 1
+
+
+def test_requests_share_a_kept_alive_connection_and_the_cache(stub_server):
+    df = api.fetch_dota_data_from_api("SELECT 2")
+    df_teams = api.get_team_names_and_ranks_from_api()
+    assert df["sql"].tolist() == ["SELECT 2"]
+    assert df_teams["name"].tolist() == ["High", "Low"]
+
+    # Served from the response cache
+    assert api.fetch_dota_data_from_api("SELECT 2", stream=False)["sql"].tolist() == ["SELECT 2"]
+    api.get_team_names_and_ranks_from_api()
+    assert StubOpenDota.requests == ["/api/explorer", "/api/teams"]
+    assert len(StubOpenDota.connections) == 1
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import asyncio
+import pathlib
+import threading
+import datetime as dt
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_pipeline_executor.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import httpx
+import pandas as pd
+
+import app as app_mod
+from database import init_db, SessionLocal, CachedMatch
+
+
+def _scored_matches():
+    return pd.DataFrame([{
+        "match_id": 333333,
+        "game_num": 1,
+        "days_ago": 0.5,
+        "date": dt.datetime.now() - dt.timedelta(hours=12),
+        "lead_is_small_score": 0.5,
+        "min_in_lead_score": 0.5,
+        "swing_score": 0.5,
+        "barracks_comeback_score": 0.0,
+        "days_ago_score": 0.9,
+        "good_team_playing_score": 0.5,
+        "aegis_steals_score": 0.0,
+        "fight_%_of_game_score": 0.5,
+        "radiant_team_name": "Coalesced",
+        "dire_team_name": "Requests",
+        "duration_min": 40,
+        "first_fight_at": "00:05",
+        "tournament": "Executor Cup",
+    }])
+
+
+def _patch_pipeline(monkeypatch, fetch):
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", fetch)
+    monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", lambda d, now=None: d)
+    monkeypatch.setattr(app_mod, "calculate_statistics_scores", lambda d: d)
+    monkeypatch.setattr(app_mod, "split_cached_matches", lambda db, d, now=None: (pd.DataFrame(), d))
+    monkeypatch.setattr(app_mod, "save_match_statistics", lambda db, d: 0)
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app_mod.app), base_url="http://test")
+
+
+def test_simultaneous_matches_requests_share_one_computation(monkeypatch):
+    calls = []
+
+    def slow_fetch():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.3)
+        return _scored_matches()
+
+    _patch_pipeline(monkeypatch, slow_fetch)
+
+    async def run():
+        async with _client() as client:
+            return await asyncio.gather(*(client.get("/api/matches") for _ in range(5)))
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 5
+    assert all(r.json()[0]["match_id"] == "333333" for r in responses)
+    # One fetch for all five requests, run off the event loop
+    assert len(calls) == 1
+    assert calls[0].startswith("pipeline")
+
+    # Once finished, the next request computes again
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_health_responds_while_pipeline_is_busy(monkeypatch):
+    started = threading.Event()
+
+    def slow_fetch():
+        started.set()
+        time.sleep(1)
+        return _scored_matches()
+
+    _patch_pipeline(monkeypatch, slow_fetch)
+
+    async def run():
+        async with _client() as client:
+            matches = asyncio.ensure_future(client.get("/api/matches"))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            start = time.monotonic()
+            health = await client.get("/api/health")
+            health_seconds = time.monotonic() - start
+            await matches
+            return health, health_seconds
+
+    health, health_seconds = asyncio.run(run())
+    assert health.status_code == 200
+    assert health_seconds < 0.5
+
+
+def test_ratings_respond_while_every_pipeline_worker_is_busy():
+    init_db()
+    db = SessionLocal()
+    db.query(CachedMatch).filter(CachedMatch.match_id == "333334").delete()
+    # A cached row, an empty cache falls back to a refresh on the pipeline
+    db.add(CachedMatch(match_id="333334", title="Busy Pool", final_score=1, start_time=int(time.time())))
+    db.commit()
+    release = threading.Event()
+    busy = [app_mod.pipeline_executor.submit(release.wait, 5) for _ in range(app_mod.PIPELINE_WORKERS)]
+
+    async def run():
+        async with _client() as client:
+            start = time.monotonic()
+            ratings = await client.get("/api/ratings")
+            cached = await client.get("/api/matches_cached?limit=1")
+            return ratings, cached, time.monotonic() - start
+
+    try:
+        ratings, cached, seconds = asyncio.run(run())
+    finally:
+        release.set()
+        for future in busy:
+            future.result()
+        db.query(CachedMatch).filter(CachedMatch.match_id == "333334").delete()
+        db.commit()
+        db.close()
+    assert ratings.status_code == 200
+    assert cached.status_code == 200
+    assert seconds < 1
@@ -0,0 +1,191 @@
+import os
+import sys
+import time
+import pathlib
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_ratings.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import app as app_mod
+from database import SessionLocal, MatchRating, CachedMatch, MatchStatistics, engine, init_db
+import dota.etags as etags
+from dota.etags import invalidate_generation
+from dota.ratings import get_ratings, invalidate_ratings
+
+client = TestClient(app_mod.app)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def _seed(db, ratings):
+    db.query(MatchRating).filter(MatchRating.match_id.in_(list(ratings))).delete()
+    db.add_all(MatchRating(match_id=m, score=s, title=f"title {m}") for m, s in ratings.items())
+    db.commit()
+
+
+def test_only_requested_ratings_are_queried_and_cached():
+    init_db()
+    invalidate_ratings()
+    db = SessionLocal()
+    try:
+        _seed(db, {"7001": 8, "7002": 3, "7003": 5})
+
+        with StatementCounter() as counter:
+            ratings = get_ratings(db, [7001, 7002, 7999])
+        assert sorted(ratings) == ["7001", "7002"]
+        assert ratings["7001"].score == 8
+        assert ratings["7002"].title == "title 7002"
+        assert len(counter.statements) == 1
+        assert "IN" in counter.statements[0]
+
+        # Second lookup, including the unrated match, is served from the cache
+        with StatementCounter() as counter:
+            assert sorted(get_ratings(db, ["7001", "7002", "7999"])) == ["7001", "7002"]
+        assert counter.statements == []
+
+        # Changed ratings are picked up after invalidation
+        db.query(MatchRating).filter(MatchRating.match_id == "7001").update({"score": 1})
+        db.commit()
+        invalidate_ratings(7001)
+        with StatementCounter() as counter:
+            assert get_ratings(db, ["7001", "7002"])["7001"].score == 1
+        assert len(counter.statements) == 1
+    finally:
+        db.query(MatchRating).filter(MatchRating.match_id.in_(["7001", "7002", "7003"])).delete()
+        db.commit()
+        db.close()
+        invalidate_ratings()
+
+
+def test_rate_match_resolves_title_without_scoring_the_match_list(monkeypatch):
+    queries = []
+
+    def fetch(sql_query):
+        queries.append(sql_query)
+        return pd.DataFrame([{"match_id": 7102, "series_id": 0, "radiant_team_name": "Fetched", "dire_team_name": "Single",
+                              "game_num": 1, "tournament": "Cup"}])
+
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", fetch)
+    monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", lambda d, now=None: d)
+    monkeypatch.setattr(app_mod, "calculate_statistics_scores", lambda d: d)
+
+    db = SessionLocal()
+    ids = ["7101", "7102"]
+    try:
+        for model in (MatchRating, CachedMatch, MatchStatistics):
+            db.query(model).filter(model.match_id.in_(ids)).delete()
+        db.add(CachedMatch(match_id="7101", title="Cached vs Stored"))
+        db.commit()
+
+        # Title of a stored match, no OpenDota request
+        assert client.post("/api/rate_match", json={"match_id": 7101, "score": 7}).status_code == 200
+        assert queries == []
+
+        # Unknown match, only that match is fetched and scored
+        assert client.post("/api/rate_match", json={"match_id": 7102, "score": 4}).status_code == 200
+        assert len(queries) == 1
+        assert "matches.match_id = 7102" in queries[0]
+        assert "LIMIT 1000" not in queries[0]
+
+        db.expire_all()
+        titles = dict(db.query(MatchRating.match_id, MatchRating.title).filter(MatchRating.match_id.in_(ids)).all())
+        assert titles == {"7101": "Cached vs Stored", "7102": "Fetched vs Single game 1 Cup"}
+    finally:
+        for model in (MatchRating, CachedMatch, MatchStatistics):
+            db.query(model).filter(model.match_id.in_(ids)).delete()
+        db.commit()
+        db.close()
+        invalidate_ratings()
+
+
+def test_read_endpoints_answer_304_without_querying(monkeypatch):
+    db = SessionLocal()
+    try:
+        db.query(CachedMatch).filter(CachedMatch.match_id == "7201").delete()
+        db.add(CachedMatch(match_id="7201", title="Etag vs Cache", final_score=60, start_time=int(time.time()) - 3600))
+        db.commit()
+        invalidate_generation()
+
+        for path in ["/api/matches_cached", "/api/ratings"]:
+            resp = client.get(path)
+            assert resp.status_code == 200
+            etag = resp.headers["etag"]
+            assert etag.startswith('"') and "stale-while-revalidate" in resp.headers["cache-control"]
+
+            with StatementCounter() as counter:
+                resp = client.get(path, headers={"If-None-Match": etag})
+            assert resp.status_code == 304
+            assert resp.headers["etag"] == etag
+            assert counter.statements == []
+
+        # A new rating changes the ETag of both endpoints
+        etags = {path: client.get(path).headers["etag"] for path in ["/api/matches_cached", "/api/ratings"]}
+        assert client.post("/api/rate_match", json={"match_id": 7201, "score": 9}).status_code == 200
+        for path, etag in etags.items():
+            resp = client.get(path, headers={"If-None-Match": etag})
+            assert resp.status_code == 200
+            assert resp.headers["etag"] != etag
+        assert "7201" in [r["match_id"] for r in resp.json()]
+        # The limit is part of the ETag
+        assert client.get("/api/ratings?limit=1").headers["etag"] != resp.headers["etag"]
+    finally:
+        for model in (MatchRating, CachedMatch):
+            db.query(model).filter(model.match_id == "7201").delete()
+        db.commit()
+        db.close()
+        invalidate_ratings()
+        invalidate_generation()
+
+
+def test_rating_from_another_worker_is_not_served_under_a_new_etag(monkeypatch):
+    # Every request reloads the generation, like one after the TTL
+    monkeypatch.setattr(etags, "GENERATION_TTL_SECONDS", 0)
+    db = SessionLocal()
+    try:
+        db.query(CachedMatch).filter(CachedMatch.match_id == "7301").delete()
+        db.add(CachedMatch(match_id="7301", title="Other Worker", final_score=99, start_time=int(time.time()) - 3600))
+        db.commit()
+        invalidate_generation()
+
+        def user_score():
+            resp = client.get("/api/matches_cached?limit=1000")
+            return resp.headers["etag"], next(r["user_score"] for r in resp.json() if r["match_id"] == "7301")
+
+        etag, score = user_score()
+        assert score is None
+        # Another worker rates the match, this worker's ratings cache knows nothing about it
+        db.add(MatchRating(match_id="7301", title="Other Worker", score=7))
+        db.commit()
+        new_etag, score = user_score()
+        assert new_etag != etag
+        assert score == 7
+    finally:
+        for model in (MatchRating, CachedMatch):
+            db.query(model).filter(model.match_id == "7301").delete()
+        db.commit()
+        db.close()
+        invalidate_ratings()
+        invalidate_generation()
@@ -0,0 +1,161 @@
+import os
+import sys
+import asyncio
+import time
+import pathlib
+import threading
+import datetime as dt
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_scheduler.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi.testclient import TestClient
+
+import app as app_mod
+from database import SessionLocal, JobRun, CachedMatch, utc_now
+from dota.etags import invalidate_generation
+from dota.run_tracker import is_due
+from dota.scheduler import ScheduledJob, wait_until_idle
+
+client = TestClient(app_mod.app)
+
+
+def _clear_job(key):
+    db = SessionLocal()
+    db.query(JobRun).filter(JobRun.key == key).delete()
+    db.commit()
+    db.close()
+
+
+def test_only_one_worker_runs_a_due_job():
+    key = "test_single_flight"
+    _clear_job(key)
+    runs = []
+
+    def refresh():
+        runs.append(threading.current_thread().name)
+        time.sleep(0.3)
+
+    # Separate instances stand in for separate uvicorn workers sharing the database
+    workers = [ScheduledJob(key, refresh, run_every_x_hours=1) for _ in range(4)]
+    results = []
+    threads = [threading.Thread(target=lambda w=w: results.append(w.run())) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(runs) == 1
+    assert sorted(results) == [False, False, False, True]
+
+    # Not due again until the interval has passed, unless forced
+    assert workers[0].run() is False
+    assert workers[1].run(force=True) is True
+    assert len(runs) == 2
+
+    db = SessionLocal()
+    try:
+        status = workers[0].status(db)
+        assert status["running"] is False
+        assert status["last_duration_seconds"] >= 0.3
+        assert status["last_error"] is None
+    finally:
+        db.close()
+    _clear_job(key)
+
+
+def test_expired_lease_is_taken_over_and_failures_are_recorded():
+    key = "test_lease"
+    _clear_job(key)
+
+    def fail():
+        raise RuntimeError("opendota down")
+
+    crashed = ScheduledJob(key, fail, run_every_x_hours=0, lease_seconds=60)
+    db = SessionLocal()
+    try:
+        # A worker took the lock and died, nobody can run until the lease expires
+        assert crashed.try_acquire(db, force=True)
+        other = ScheduledJob(key, fail, run_every_x_hours=0, lease_seconds=60)
+        assert other.run(force=True) is False
+
+        later = utc_now() + dt.timedelta(seconds=61)
+        assert other.try_acquire(db, force=True, now=later)
+        other.release(db, 0.1, "RuntimeError('opendota down')")
+        assert other.status(db)["last_error"] == "RuntimeError('opendota down')"
+    finally:
+        db.close()
+    _clear_job(key)
+
+
+def test_cached_reads_do_not_trigger_refreshes(monkeypatch):
+    fetched = []
+    monkeypatch.setattr(app_mod, "fetch_dota_data_from_api", lambda: fetched.append(1))
+    db = SessionLocal()
+    try:
+        db.query(CachedMatch).filter(CachedMatch.match_id == "8500").delete()
+        db.add(CachedMatch(match_id="8500", title="Warm vs Cache", final_score=50,
+                           start_time=int(time.time()) - 3600))
+        db.commit()
+
+        for _ in range(3):
+            resp = client.get("/api/matches_cached")
+            assert resp.status_code == 200
+            assert "8500" in [m["match_id"] for m in resp.json()]
+        assert fetched == []
+
+        health = client.get("/api/health").json()
+        assert set(health["cache_refresh"]) >= {"last_started_at", "last_duration_seconds", "running"}
+    finally:
+        db.query(CachedMatch).filter(CachedMatch.match_id == "8500").delete()
+        db.commit()
+        db.close()
+
+
+def test_failing_fallback_refresh_is_logged(monkeypatch, caplog):
+    def broken_refresh(force=False):
+        raise RuntimeError("explorer is down")
+
+    monkeypatch.setattr(app_mod, "_read_cached_matches", lambda limit: [])
+    monkeypatch.setattr(app_mod.cache_refresh_job, "run", broken_refresh)
+    invalidate_generation()
+    with caplog.at_level("ERROR"):
+        resp = client.get("/api/matches_cached?limit=7")
+    assert resp.status_code == 200
+    assert resp.json() == []
+    assert "refreshing the empty match cache failed" in caplog.text
+    assert "explorer is down" in caplog.text
+
+
+def test_due_check_uses_the_exact_interval():
+    last = dt.datetime(2026, 1, 1, 12, 0)
+    # 13 minutes rounds to 0.2 hours, still past a 12 minute interval
+    assert is_due(last, 0.2, last + dt.timedelta(minutes=13)) == (True, 0.2)
+    assert is_due(last, 0.25, last + dt.timedelta(minutes=14, seconds=50))[0] is False
+    assert is_due(last, 0.25, last + dt.timedelta(minutes=15, seconds=10))[0] is True
+
+
+def test_forced_run_can_wait_for_another_worker():
+    key = "test_wait_until_idle"
+    _clear_job(key)
+    holder = ScheduledJob(key, lambda: None, run_every_x_hours=1, lease_seconds=60)
+    waiter = ScheduledJob(key, lambda: None, run_every_x_hours=1, lease_seconds=60)
+
+    async def run_blocking(fn):
+        return fn()
+
+    db = SessionLocal()
+    try:
+        assert holder.try_acquire(db, force=True)
+        assert waiter.run(force=True) is False
+        assert asyncio.run(wait_until_idle(waiter, run_blocking, 0.2, poll_seconds=0.05)) is False
+
+        holder.release(db, 0.1)
+        assert asyncio.run(wait_until_idle(waiter, run_blocking, 0.2, poll_seconds=0.05)) is True
+    finally:
+        db.close()
+    _clear_job(key)
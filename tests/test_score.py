@@ -0,0 +1,63 @@
+import sys
+import pathlib
+import subprocess
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dota.score import LinearMap, Linear, Max, Override, Select, Weighted, clamped_linear, compile_scores, linear_map
+
+
+def test_clamped_linear_maps_and_clamps_in_one_pass():
+    x = [0, 45, 55, 65, 80, np.nan]
+    assert np.allclose(clamped_linear(x, 45, 65, 0, 0.9), [0, 0, 0.45, 0.9, 0.9, np.nan], equal_nan=True)
+    # Values outside the range can map somewhere other than the ends
+    assert np.allclose(clamped_linear(x, 45, 65, 0, 0.9, above=1), [0, 0, 0.45, 0.9, 1, np.nan], equal_nan=True)
+    # Decreasing maps
+    assert clamped_linear([-50, -36, 13.5, 63], -36, 63, 0.8, 0, below=1).tolist() == [1, 0.8, 0.4, 0]
+
+
+def test_linear_map_only_writes_rows_in_range():
+    df = pd.DataFrame({"swing": [5000, 9500, 15000]})
+    df = linear_map(df, "swing", "swing_score", 7000, 12000)
+    assert df["swing_score"].tolist()[1] == 0.5
+    assert df["swing_score"].isna().tolist() == [True, False, True]
+
+
+def test_compiled_spec_scores_in_one_matrix():
+    evaluator = compile_scores([
+        ('swing_score', Linear('swing', [LinearMap.Range(7000, 12000, 0, 1)])),
+        ('swing_score', Override('swing_score', 'comeback', value=1)),
+        ('_best_rank', Max(['rank'])),
+        ('rank_score', Select([('_best_rank', 6, 1.0), ('_best_rank', 14, 0.5)])),
+        ('total', Weighted({'swing_score': 2, 'rank_score': 1}, divisor=3, decimals=2)),
+    ])
+    df = pd.DataFrame({"swing": [5000, 9500, 15000, np.nan], "rank": [1, 10, 30, np.nan]})
+    assert evaluator.evaluate(df, comeback=[False, False, False, True]).shape == (4, 4)
+
+    df = evaluator.apply(df, comeback=[False, False, False, True])
+    assert df["swing_score"].tolist() == [0, 0.5, 1, 1]
+    assert df["rank_score"].tolist() == [1, 0.5, 0, 0]
+    assert df["total"].tolist() == [0.33, 0.5, 0.67, 0.67]
+    # Intermediate scores aren't written out
+    assert "_best_rank" not in df.columns
+
+
+def test_spec_rejects_scores_read_before_they_are_declared():
+    with pytest.raises(ValueError):
+        compile_scores([
+            ('total', Weighted({'swing_score': 1})),
+            ('swing_score', Linear('swing', [LinearMap.Range(7000, 12000, 0, 1)])),
+        ])
+
+
+def test_scoring_does_not_import_scipy():
+    code = "import sys; import dota.calculate_scores; print('scipy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
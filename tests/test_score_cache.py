@@ -0,0 +1,178 @@
+import os
+import sys
+import pathlib
+import datetime as dt
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_score_cache.db")
+
+# Ensure the project root (containing app.py) is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+
+import app as app_mod
+import dota.score_cache as score_cache
+from database import SessionLocal, MatchStatistics, SeriesGame
+
+
+def _explorer_rows(match_ids, series_ids, parsed=True):
+    now = dt.datetime.now()
+
+    def replay(value):
+        # Unparsed matches come without their replay columns
+        return [value if parsed else None] * len(match_ids)
+
+    return pd.DataFrame({
+        "match_id": match_ids,
+        "series_id": series_ids,
+        "series_type": [1] * len(match_ids),
+        # Later match ids start later
+        "start_time": [int(now.timestamp()) - 2 * 86400 + m for m in match_ids],
+        "date": [now - dt.timedelta(days=2)] * len(match_ids),
+        "name": ["Test Cup"] * len(match_ids),
+        "radiant_gold_adv": replay([0, 500, 1500]),
+        "teamfights": replay([{"start": 600, "end": 640, "deaths": 5}]),
+        "objectives": replay([{"time": 300, "type": "CHAT_MESSAGE_FIRSTBLOOD"}]),
+    })
+
+
+def _fake_statistics(df):
+    df = df.rename(columns={"name": "tournament"})
+    df["game_num"] = 1
+    df["swing"] = 9000
+    df["days_ago"] = (df["date"] - dt.datetime.now()).dt.days
+    return df
+
+
+def _fake_scores(df):
+    df["swing_score"] = 0.4
+    df["days_ago_score"] = 0.5
+    return df
+
+
+def _clear(db, match_ids):
+    for model in (MatchStatistics, SeriesGame):
+        db.query(model).filter(model.match_id.in_([str(m) for m in match_ids])).delete()
+    db.commit()
+
+
+def test_score_matches_only_calculates_new_matches(monkeypatch):
+    calculated = []
+
+    def fake_statistics(df, now=None):
+        calculated.append(sorted(df["match_id"].tolist()))
+        return _fake_statistics(df)
+
+    monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", fake_statistics)
+    monkeypatch.setattr(app_mod, "calculate_statistics_scores", _fake_scores)
+
+    db = SessionLocal()
+    try:
+        _clear(db, [901, 902, 903, 904])
+        df = app_mod._score_matches(_explorer_rows([901, 902, 903], [0, 50, 0]), db)
+        assert calculated == [[901, 902, 903]]
+        assert len(df) == 3
+
+        # 904 is a new game in series 50, the series index numbers it without rescoring 902
+        df = app_mod._score_matches(_explorer_rows([901, 902, 903, 904], [0, 50, 0, 50]), db)
+        assert calculated[-1] == [904]
+        assert sorted(df["match_id"].tolist()) == [901, 902, 903, 904]
+        series = df[df["series_id"] == 50].set_index("match_id")
+        assert series.loc[[902, 904], "game_num"].tolist() == [1, 2]
+        assert series["best_of"].tolist() == [3, 3]
+        cached = df[df["match_id"] == 901].iloc[0]
+        assert cached["tournament"] == "Test Cup"
+        assert cached["swing"] == 9000
+        assert cached["swing_score"] == 0.4
+        # Recency is recalculated for cached matches
+        assert cached["days_ago"] == -3
+        assert round(cached["days_ago_score"], 2) == 0.97
+        assert db.query(MatchStatistics).filter(MatchStatistics.match_id.in_(["902", "904"])).count() == 2
+
+        # Nothing new, nothing calculated
+        app_mod._score_matches(_explorer_rows([901, 902, 903, 904], [0, 50, 0, 50]), db)
+        assert len(calculated) == 2
+
+        # A later fetch without the rest of the series still numbers 905 after the indexed games
+        df = app_mod._score_matches(_explorer_rows([905], [50]), db)
+        assert df["game_num"].tolist() == [3]
+    finally:
+        _clear(db, [901, 902, 903, 904, 905])
+        db.close()
+
+
+def test_cached_and_new_matches_count_days_from_one_now(monkeypatch):
+    monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics",
+                        lambda d, now=None: _fake_statistics(d).assign(days_ago=lambda f: (f["date"] - now).dt.days))
+    monkeypatch.setattr(app_mod, "calculate_statistics_scores", _fake_scores)
+
+    db = SessionLocal()
+    try:
+        _clear(db, [931, 932])
+        app_mod._score_matches(_explorer_rows([931], [0]), db)
+        # Days later 931 comes from the cache and 932 is new
+        rows = _explorer_rows([931, 932], [0, 0])
+        later = rows["date"].iloc[0] + dt.timedelta(days=12, hours=1)
+        df = app_mod._score_matches(rows, db, later).set_index("match_id")
+        assert df.loc[931, "days_ago"] == df.loc[932, "days_ago"] == -13
+    finally:
+        _clear(db, [931, 932])
+        db.close()
+
+
+def test_scoring_config_change_invalidates_cache(monkeypatch):
+    db = SessionLocal()
+    try:
+        _clear(db, [911])
+        df = _fake_scores(_fake_statistics(_explorer_rows([911], [0])))
+        assert score_cache.save_match_statistics(db, df) == 1
+        assert score_cache.save_match_statistics(db, df) == 0
+        assert set(score_cache.load_match_statistics(db, [911])) == {"911"}
+
+        monkeypatch.setattr(score_cache, "TEAMS_I_LIKE", ["Some Other Team"])
+        assert score_cache.load_match_statistics(db, [911]) == {}
+        df_cached, df_new = score_cache.split_cached_matches(db, _explorer_rows([911], [0]))
+        assert df_cached.empty
+        assert df_new["match_id"].tolist() == [911]
+    finally:
+        _clear(db, [911])
+        db.close()
+
+
+def test_unparsed_matches_are_scored_again_once_parsed(monkeypatch):
+    calculated = []
+
+    def fake_statistics(df, now=None):
+        calculated.append(sorted(df["match_id"].tolist()))
+        df = _fake_statistics(df)
+        # Like calc_gold_adv_stats, no gold data gives a swing of 0
+        df["swing"] = [9000 if g else 0 for g in df["radiant_gold_adv"]]
+        return df
+
+    monkeypatch.setattr(app_mod, "clean_df_and_fill_nas", lambda d: d)
+    monkeypatch.setattr(app_mod, "calculate_all_game_statistics", fake_statistics)
+    monkeypatch.setattr(app_mod, "calculate_statistics_scores", _fake_scores)
+
+    db = SessionLocal()
+    try:
+        _clear(db, [921])
+        df = app_mod._score_matches(_explorer_rows([921], [0], parsed=False), db)
+        assert df["swing"].tolist() == [0]
+        assert score_cache.load_match_statistics(db, [921]) == {}
+
+        # Still unparsed, calculated again
+        app_mod._score_matches(_explorer_rows([921], [0], parsed=False), db)
+        # The replay got parsed, the statistics use it and are cached from now on
+        df = app_mod._score_matches(_explorer_rows([921], [0]), db)
+        assert df["swing"].tolist() == [9000]
+        assert calculated == [[921], [921], [921]]
+        app_mod._score_matches(_explorer_rows([921], [0]), db)
+        assert len(calculated) == 3
+    finally:
+        _clear(db, [921])
+        db.close()
@@ -0,0 +1,66 @@
+import os
+import sys
+import pathlib
+from datetime import timedelta
+
+# Force local SQLite DB for tests before importing app/database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_teams.db")
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+import pytest
+
+import dota.teams as teams_mod
+from database import SessionLocal, Team, init_db, utc_now
+from dota.calcs import get_team_names_and_ranks
+from dota.teams import TeamInfo, get_teams, invalidate_teams
+
+
+@pytest.fixture
+def api(monkeypatch):
+    init_db()
+    db = SessionLocal()
+    db.query(Team).delete()
+    db.commit()
+    db.close()
+    invalidate_teams()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return pd.DataFrame({"team_id": [7, 9], "name": ["Spirit", "Liquid"], "rating": [1500.0, 1400.0]})
+
+    monkeypatch.setattr(teams_mod, "get_team_names_and_ranks_from_api", fetch)
+    return calls
+
+
+def test_registry_only_calls_the_teams_endpoint_when_empty(api):
+    assert get_teams() == {7: TeamInfo("Spirit", 1), 9: TeamInfo("Liquid", 2)}
+    df = get_team_names_and_ranks(pd.DataFrame({"radiant_team_id": [9.0, None], "dire_team_id": [7, 12]}))
+    assert df["radiant_team_name"].tolist()[0] == "Liquid"
+    assert df["dire_team_rank"].fillna(-1).tolist() == [1, -1]
+    # Another worker starts with an empty memory but a warm table
+    invalidate_teams()
+    get_teams()
+    assert len(api) == 1
+
+
+def test_stale_teams_are_served_while_refreshing(api, monkeypatch):
+    get_teams()
+    db = SessionLocal()
+    db.query(Team).update({Team.updated_at: utc_now() - timedelta(hours=teams_mod.TEAMS_TTL_HOURS + 1)})
+    db.commit()
+    db.close()
+    invalidate_teams()
+
+    threads = []
+    refresh = teams_mod._refresh_in_background
+    monkeypatch.setattr(teams_mod, "_refresh_in_background", lambda f: threads.append(refresh(f)))
+    assert get_teams()[7] == TeamInfo("Spirit", 1)
+    threads[0].join(timeout=5)
+    assert len(api) == 2
+    assert not teams_mod._is_stale(teams_mod._fetched_at)
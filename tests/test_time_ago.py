@@ -0,0 +1,27 @@
+import sys
+import pathlib
+from datetime import datetime, timedelta
+
+# Ensure the project root is on the path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+
+from dota.utils import time_ago
+
+
+def test_time_ago_buckets_against_one_reference_time():
+    now = datetime(2026, 3, 1, 12, 0)
+    dates = pd.Series([
+        now + timedelta(hours=5),  # clock skew, a start time slightly in the future
+        now - timedelta(hours=19),
+        now - timedelta(days=2, hours=1),
+        now - timedelta(days=15),
+        now - timedelta(days=45),
+        pd.NaT,
+    ])
+    days_ago, pretty = time_ago(dates, now)
+    assert days_ago.tolist()[:5] == [0, -1, -3, -15, -45]
+    assert pretty.tolist() == ["5 hours ago", "1 day ago", "3 days ago", "2 weeks ago", "2 months ago", None]